@@ -1,9 +1,17 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session as _SesionORM
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from fastapi import Request
+import asyncio
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from servicios.instrumentacion import AsyncQueuePoolMedido, QueuePoolMedido, instrumentar, registrar_pool
+
 load_dotenv()
 
 # Formato de Railway para MySQL
@@ -13,13 +21,335 @@ DATABASE_URL = os.getenv("DATABASE_URL", "mysql://root:xCJhHTKkZujUpKSFPQdCvLSlm
 if DATABASE_URL.startswith("mysql://"):
     DATABASE_URL = DATABASE_URL.replace("mysql://", "mysql+pymysql://", 1)
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=3600)
-Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Mismo servidor con driver asíncrono (aiomysql; aiosqlite para el sustituto local de pruebas)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", DATABASE_URL
+                               .replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+                               .replace("sqlite://", "sqlite+aiosqlite://", 1))
+
+# Réplicas de solo lectura, separadas por comas (mismo formato que DATABASE_URL).
+# Sin réplicas, las dependencias de lectura usan el primario: nada cambia.
+URLS_LECTURA = [u.strip().replace("mysql://", "mysql+pymysql://", 1)
+                for u in os.getenv("DATABASE_LECTURA_URLS", "").split(",") if u.strip()]
+
+# Tras un commit que toca datos de un usuario, sus lecturas van al primario
+# durante este tiempo (debe cubrir el retraso de replicación). 0 lo desactiva.
+LECTURA_PEGAJOSA_SEGUNDOS = float(os.getenv("DB_LECTURA_PEGAJOSA_SEGUNDOS", "5"))
+
+# Conexiones por pool que abre calentar() antes de aceptar tráfico (0 lo desactiva)
+CALENTAR_CONEXIONES = int(os.getenv("CALENTAR_CONEXIONES", "2"))
+
+
+def _config_pool() -> dict:
+    """
+    Tamaño de cada pool *por worker*. Con DB_MAX_CONEXIONES (conexiones que la app
+    puede usar en cada servidor) se reparte entre los WEB_CONCURRENCY workers y sus
+    dos pools (sync y async): 2/3 fijas y el resto como desborde. DB_POOL_SIZE y
+    DB_MAX_OVERFLOW, si están, mandan.
+    """
+    workers = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+    maximo = int(os.getenv("DB_MAX_CONEXIONES", "0"))
+    tamano, desborde = 5, 10  # valores por defecto de SQLAlchemy
+    if maximo > 0:
+        por_pool = max(maximo // (workers * 2), 1)
+        tamano = max((por_pool * 2) // 3, 1)
+        desborde = por_pool - tamano
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", tamano)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", desborde)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_pre_ping": True,
+        "pool_recycle": 3600,
+    }
+
+
+def _a_async(url: str) -> str:
+    # Mismo servidor con driver asíncrono (aiomysql; aiosqlite para el sustituto local de pruebas)
+    return url.replace("mysql+pymysql://", "mysql+aiomysql://", 1).replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+def _crear_engine(url: str, nombre: str):
+    # Pool que mide la espera por conexión y hooks que cuentan sentencias (ver /metrics)
+    nuevo = create_engine(url, poolclass=QueuePoolMedido, **_config_pool())
+    instrumentar(nuevo)
+    registrar_pool(nombre, nuevo)
+    return nuevo
+
+
+def _crear_async_engine(url: str, nombre: str):
+    nuevo = create_async_engine(url, poolclass=AsyncQueuePoolMedido, **_config_pool())
+    instrumentar(nuevo.sync_engine)
+    registrar_pool(nombre, nuevo.sync_engine)
+    return nuevo
+
+
+# Los engines se crean en el primer uso (sesión, `engine`/`async_engine` o calentar()),
+# no al importar: importar la app no abre conexiones ni carga los drivers.
+_engine = None
+_async_engine = None
+_lectura = None
+_lectura_async = None
+_lock = threading.Lock()
+_turno = itertools.count()
+
+
+def obtener_engine():
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = _crear_engine(DATABASE_URL, "escritura_sync")
+    return _engine
+
+
+def obtener_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                _async_engine = _crear_async_engine(ASYNC_DATABASE_URL, "escritura_async")
+    return _async_engine
+
+
+def _engines_lectura() -> list:
+    global _lectura
+    if _lectura is None:
+        with _lock:
+            if _lectura is None:
+                _lectura = [_crear_engine(url, f"lectura_sync_{i}") for i, url in enumerate(URLS_LECTURA)]
+    return _lectura
+
+
+def _async_engines_lectura() -> list:
+    global _lectura_async
+    if _lectura_async is None:
+        with _lock:
+            if _lectura_async is None:
+                _lectura_async = [_crear_async_engine(_a_async(url), f"lectura_async_{i}")
+                                  for i, url in enumerate(URLS_LECTURA)]
+    return _lectura_async
+
+
+def __getattr__(nombre):
+    # `from DB.conexion import engine` sigue funcionando; crea el engine en ese momento
+    if nombre == "engine":
+        return obtener_engine()
+    if nombre == "async_engine":
+        return obtener_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+# ---------------- Escrituras confirmadas por usuario ----------------
+
+# Marca de una escritura que afecta a todos los usuarios (p. ej. una categoría de sistema)
+TODOS = "*"
+
+_suscriptores = []
+
+
+def al_confirmar_escrituras(funcion):
+    """
+    Registra `funcion(usuarios)`, llamada tras cada commit con los usuario_id cuyos
+    datos tocó la transacción (o TODOS). Solo ve las escrituras de este proceso.
+    """
+    _suscriptores.append(funcion)
+    return funcion
+
+
+def marcar_escritura(db, *usuarios):
+    """Anota usuarios escritos con SQL que los hooks no ven (UPDATE sin usuario_id en los parámetros); sin argumentos, TODOS."""
+    db.info.setdefault("usuarios_escritos", set()).update(usuarios or (TODOS,))
+
+
+def _usuarios_de_parametros(parametros):
+    if isinstance(parametros, dict):
+        parametros = [parametros]
+    for fila in parametros or ():
+        if isinstance(fila, dict) and fila.get("usuario_id") is not None:
+            yield fila["usuario_id"]
+
+
+def _anotar_flush(sesion, contexto):
+    # En after_flush new/dirty/deleted todavía muestran lo que se escribió
+    escritos = sesion.info.setdefault("usuarios_escritos", set())
+    for objeto in itertools.chain(sesion.new, sesion.dirty, sesion.deleted):
+        tabla = type(objeto).__tablename__
+        usuario_id = objeto.id if tabla == "usuarios" else getattr(objeto, "usuario_id", None)
+        if usuario_id is not None:
+            escritos.add(usuario_id)
+        elif tabla == "categorias":
+            escritos.add(TODOS)
+
+
+def _anotar_ejecucion(estado):
+    # INSERT/UPDATE/DELETE enviados con session.execute (inserciones masivas, Core)
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        estado.session.info.setdefault("usuarios_escritos", set()).update(
+            _usuarios_de_parametros(estado.parameters))
+
+
+def _confirmar_escrituras(sesion):
+    escritos = sesion.info.pop("usuarios_escritos", None)
+    if escritos:
+        for funcion in _suscriptores:
+            funcion(escritos)
+
+
+def _descartar_escrituras(sesion, *args):
+    sesion.info.pop("usuarios_escritos", None)
+
+
+# Sobre la clase Session: cubre las sesiones sync y las que usa AsyncSession por dentro
+event.listen(_SesionORM, "after_flush", _anotar_flush)
+event.listen(_SesionORM, "do_orm_execute", _anotar_ejecucion)
+event.listen(_SesionORM, "after_commit", _confirmar_escrituras)
+event.listen(_SesionORM, "after_soft_rollback", _descartar_escrituras)
+
+
+# ---------------- Lee-lo-que-escribiste ----------------
+
+# usuario_id -> instante (monotonic) hasta el que sus lecturas van al primario.
+# Es por proceso: otro worker no lo ve; el cliente puede forzar el primario con
+# la cabecera `X-Consistencia: fuerte`.
+_escrituras_recientes = {}
+
+
+def _marcar_pegajosos(usuarios):
+    ahora = time.monotonic()
+    hasta = ahora + LECTURA_PEGAJOSA_SEGUNDOS
+    for usuario_id in usuarios:
+        if usuario_id != TODOS:
+            _escrituras_recientes[int(usuario_id)] = hasta
+    if len(_escrituras_recientes) > 10000:
+        for usuario_id, limite in list(_escrituras_recientes.items()):
+            if limite < ahora:
+                _escrituras_recientes.pop(usuario_id, None)
+
+
+def escribio_hace_poco(usuario_id) -> bool:
+    if usuario_id is None:
+        return False
+    limite = _escrituras_recientes.get(int(usuario_id))
+    if limite is None:
+        return False
+    if limite < time.monotonic():
+        _escrituras_recientes.pop(int(usuario_id), None)
+        return False
+    return True
+
+
+if URLS_LECTURA and LECTURA_PEGAJOSA_SEGUNDOS > 0:
+    al_confirmar_escrituras(_marcar_pegajosos)
+
+
+def engine_lectura(usuario_id=None, primario: bool = False):
+    """Réplica siguiente (round-robin) o el primario si no hay réplicas o el usuario escribió hace poco."""
+    if not URLS_LECTURA or primario or escribio_hace_poco(usuario_id):
+        return obtener_engine()
+    replicas = _engines_lectura()
+    return replicas[next(_turno) % len(replicas)]
+
+
+def async_engine_lectura(usuario_id=None, primario: bool = False):
+    if not URLS_LECTURA or primario or escribio_hace_poco(usuario_id):
+        return obtener_async_engine()
+    replicas = _async_engines_lectura()
+    return replicas[next(_turno) % len(replicas)]
+
+
+# ---------------- Sesiones ----------------
+
+class _SessionPerezosa(sessionmaker):
+    """sessionmaker que se enlaza al engine al abrir la primera sesión."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=obtener_engine())
+        return super().__call__(**local_kw)
+
+
+class _AsyncSessionPerezosa(async_sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=obtener_async_engine())
+        return super().__call__(**local_kw)
+
+
+Session = _SessionPerezosa(autocommit=False, autoflush=False)
 Base = declarative_base()
 
+AsyncSession = _AsyncSessionPerezosa(autoflush=False, expire_on_commit=False)
+
+# Sin bind fijo: cada sesión de lectura recibe el engine elegido al abrirse
+_SessionLectura = sessionmaker(autocommit=False, autoflush=False)
+_AsyncSessionLectura = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def SessionLectura(usuario_id=None, primario: bool = False):
+    return _SessionLectura(bind=engine_lectura(usuario_id, primario))
+
+
+def AsyncSessionLectura(usuario_id=None, primario: bool = False):
+    return _AsyncSessionLectura(bind=async_engine_lectura(usuario_id, primario))
+
+
+def _origen_lectura(request: Request):
+    """usuario_id de la ruta o de la query, y si el cliente pidió leer del primario."""
+    usuario_id = request.path_params.get("usuario_id") or request.query_params.get("usuario_id")
+    try:
+        usuario_id = int(usuario_id) if usuario_id is not None else None
+    except ValueError:
+        usuario_id = None
+    return usuario_id, request.headers.get("x-consistencia", "").lower() == "fuerte"
+
+
 def get_db():
     db = Session()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSession() as db:
+        yield db
+
+
+# Solo para endpoints que no escriben: pueden ir a una réplica
+def get_db_lectura(request: Request):
+    db = SessionLectura(*_origen_lectura(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db_lectura(request: Request):
+    async with AsyncSessionLectura(*_origen_lectura(request)) as db:
+        yield db
+
+
+def _calentar_sync(n: int):
+    for motor in [obtener_engine(), *_engines_lectura()]:
+        conexiones = [motor.connect() for _ in range(n)]
+        for conexion in conexiones:
+            conexion.close()  # vuelve al pool abierta
+
+
+async def calentar(n: int = CALENTAR_CONEXIONES):
+    """Crea los engines (primario y réplicas) y deja `n` conexiones abiertas en cada pool."""
+    if n <= 0:
+        return
+    await asyncio.to_thread(_calentar_sync, n)
+    for motor in [obtener_async_engine(), *_async_engines_lectura()]:
+        conexiones = [await motor.connect().start() for _ in range(n)]
+        for conexion in conexiones:
+            await conexion.close()
+
+
+async def cerrar():
+    """Cierra las conexiones de todos los pools creados (shutdown de la app o fin de un script)."""
+    for motor in [_async_engine, *(_lectura_async or ())]:
+        if motor is not None:
+            await motor.dispose()
+    for motor in [_engine, *(_lectura or ())]:
+        if motor is not None:
+            motor.dispose()
@@ -0,0 +1,118 @@
+import importlib
+
+
+def _insert_de(dialecto):
+    # Solo se importa el dialecto en uso (postgresql arrastra asyncpg y su catálogo)
+    return importlib.import_module(f"sqlalchemy.dialects.{dialecto}").insert
+
+
+def nombre_dialecto(db) -> str:
+    return db.get_bind().dialect.name
+
+
+def upsert(db, tabla, claves, actualizar):
+    """
+    INSERT que actualiza la fila existente si ya hay una con las mismas claves.
+    `actualizar` recibe las columnas de la fila entrante (VALUES()/excluded)
+    y devuelve el diccionario {columna: expresión} a aplicar.
+    """
+    dialecto = nombre_dialecto(db)
+    if dialecto == "mysql":
+        stmt = _insert_de("mysql")(tabla)
+        return stmt.on_duplicate_key_update(actualizar(stmt.inserted))
+
+    stmt = _insert_de("postgresql" if dialecto == "postgresql" else "sqlite")(tabla)
+    return stmt.on_conflict_do_update(index_elements=claves, set_=actualizar(stmt.excluded))
+
+
+# Inicio de la cubeta que contiene una fecha (semanas de lunes a domingo)
+_TRUNCAR = {
+    "mysql": {
+        "dia": "{c}",
+        "semana": "DATE_SUB({c}, INTERVAL WEEKDAY({c}) DAY)",
+        "mes": "DATE_SUB({c}, INTERVAL DAYOFMONTH({c}) - 1 DAY)",
+        "anio": "MAKEDATE(YEAR({c}), 1)",
+    },
+    "sqlite": {
+        "dia": "date({c})",
+        "semana": "date({c}, '-' || ((CAST(strftime('%w', {c}) AS INTEGER) + 6) % 7) || ' days')",
+        "mes": "date({c}, 'start of month')",
+        "anio": "date({c}, 'start of year')",
+    },
+    "postgresql": {
+        "dia": "CAST({c} AS DATE)",
+        "semana": "CAST(date_trunc('week', {c}) AS DATE)",
+        "mes": "CAST(date_trunc('month', {c}) AS DATE)",
+        "anio": "CAST(date_trunc('year', {c}) AS DATE)",
+    },
+}
+
+# Inicio de la cubeta siguiente
+_SIGUIENTE = {
+    "mysql": {
+        "dia": "DATE_ADD({c}, INTERVAL 1 DAY)",
+        "semana": "DATE_ADD({c}, INTERVAL 1 WEEK)",
+        "mes": "DATE_ADD({c}, INTERVAL 1 MONTH)",
+        "anio": "DATE_ADD({c}, INTERVAL 1 YEAR)",
+    },
+    "sqlite": {
+        "dia": "date({c}, '+1 day')",
+        "semana": "date({c}, '+7 days')",
+        "mes": "date({c}, '+1 month')",
+        "anio": "date({c}, '+1 year')",
+    },
+    "postgresql": {
+        "dia": "CAST({c} + INTERVAL '1 day' AS DATE)",
+        "semana": "CAST({c} + INTERVAL '1 week' AS DATE)",
+        "mes": "CAST({c} + INTERVAL '1 month' AS DATE)",
+        "anio": "CAST({c} + INTERVAL '1 year' AS DATE)",
+    },
+}
+
+
+def como_fecha(dialecto: str, expresion: str) -> str:
+    # SQLite guarda las fechas como texto ISO; date() las normaliza
+    return f"date({expresion})" if dialecto == "sqlite" else f"CAST({expresion} AS DATE)"
+
+
+def truncar_fecha(dialecto: str, expresion: str, cubeta: str) -> str:
+    """SQL del primer día de la cubeta ('dia', 'semana', 'mes' o 'anio') que contiene `expresion`."""
+    return _TRUNCAR[dialecto][cubeta].format(c=expresion)
+
+
+def siguiente_cubeta(dialecto: str, expresion: str, cubeta: str) -> str:
+    return _SIGUIENTE[dialecto][cubeta].format(c=expresion)
+
+
+def insertar_sin_duplicados(db, tabla, claves):
+    """INSERT que omite las filas que chocan con el índice único de `claves` (sin error)."""
+    dialecto = nombre_dialecto(db)
+    if dialecto == "mysql":
+        # ON DUPLICATE KEY UPDATE sin efecto: a diferencia de INSERT IGNORE no oculta otros errores
+        stmt = _insert_de("mysql")(tabla)
+        return stmt.on_duplicate_key_update({claves[-1]: tabla.c[claves[-1]]})
+
+    stmt = _insert_de("postgresql" if dialecto == "postgresql" else "sqlite")(tabla)
+    return stmt.on_conflict_do_nothing(index_elements=claves)
+
+
+def insertar_con_ids(db, tabla, filas) -> list:
+    """
+    Inserta `filas` en un solo INSERT multi-fila y devuelve sus id en el mismo orden.
+
+    PostgreSQL los devuelve con RETURNING. MySQL y SQLite asignan ids consecutivos
+    a las filas de una misma sentencia (InnoDB reserva el bloque completo cuando el
+    número de filas se conoce de antemano, con auto_increment_increment = 1; SQLite
+    escribe con la base bloqueada), así que basta el lastrowid: el primero en MySQL,
+    el último en SQLite.
+    """
+    if not filas:
+        return []
+    dialecto = nombre_dialecto(db)
+    if dialecto == "postgresql":
+        stmt = tabla.insert().returning(tabla.c.id, sort_by_parameter_order=True)
+        return list(db.execute(stmt, filas).scalars())
+
+    ultimo = db.execute(tabla.insert().values(filas)).lastrowid
+    primero = ultimo if dialecto == "mysql" else ultimo - len(filas) + 1
+    return list(range(primero, primero + len(filas)))
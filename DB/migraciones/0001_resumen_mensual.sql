@@ -0,0 +1,21 @@
+-- Agregado mensual por usuario/categoría/tipo que alimenta /grafica.
+-- Lo mantienen al día los handlers de routers/transacciones.py.
+CREATE TABLE IF NOT EXISTS resumen_mensual (
+    usuario_id INT NOT NULL,
+    anio INT NOT NULL,
+    mes INT NOT NULL,
+    categoria_id INT NOT NULL,
+    tipo ENUM('ingreso', 'egreso', 'transferencia') NOT NULL,
+    total DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    num_transacciones INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (usuario_id, anio, mes, categoria_id, tipo),
+    CONSTRAINT fk_resumen_mensual_usuario FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE
+);
+
+DELETE FROM resumen_mensual;
+
+INSERT INTO resumen_mensual (usuario_id, anio, mes, categoria_id, tipo, total, num_transacciones)
+SELECT usuario_id, YEAR(fecha), MONTH(fecha), categoria_id, tipo, SUM(monto), COUNT(*)
+FROM transacciones
+WHERE categoria_id IS NOT NULL
+GROUP BY usuario_id, YEAR(fecha), MONTH(fecha), categoria_id, tipo;
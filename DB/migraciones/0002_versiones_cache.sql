@@ -0,0 +1,9 @@
+-- Contador de versión por conjunto cacheado en memoria (p. ej. 'categorias').
+-- Cada escritura lo incrementa en su transacción; los workers lo comparan para
+-- descartar su copia local.
+CREATE TABLE IF NOT EXISTS versiones_cache (
+    nombre VARCHAR(50) NOT NULL PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO versiones_cache (nombre, version) VALUES ('categorias', 0);
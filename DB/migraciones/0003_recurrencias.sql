@@ -0,0 +1,9 @@
+-- Materialización de pagos fijos y transacciones recurrentes (servicios/recurrentes.py).
+-- transacciones_recurrentes no tenía dónde guardar su siguiente ocurrencia.
+ALTER TABLE transacciones_recurrentes ADD COLUMN proxima_fecha DATE NULL AFTER fecha_fin;
+
+UPDATE transacciones_recurrentes SET proxima_fecha = fecha_inicio WHERE proxima_fecha IS NULL;
+
+CREATE INDEX ix_pagos_fijos_activo_proxima_fecha ON pagos_fijos (activo, proxima_fecha);
+
+CREATE INDEX ix_transacciones_recurrentes_activa_proxima_fecha ON transacciones_recurrentes (activa, proxima_fecha);
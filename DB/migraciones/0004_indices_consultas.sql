@@ -0,0 +1,9 @@
+-- Índices para las consultas de los routers (ver DB/planes.py).
+-- usuarios(correo_electronico) ya está cubierto por su índice UNIQUE.
+CREATE INDEX ix_transacciones_usuario_fecha ON transacciones (usuario_id, fecha, id);
+
+CREATE INDEX ix_transacciones_usuario_categoria_fecha ON transacciones (usuario_id, categoria_id, fecha);
+
+CREATE INDEX ix_presupuestos_usuario_periodo ON presupuestos (usuario_id, anio, mes, categoria_id);
+
+CREATE INDEX ix_pagos_fijos_usuario_activo ON pagos_fijos (usuario_id, activo);
@@ -0,0 +1,18 @@
+-- Alertas generadas por lotes (servicios/alertas.py).
+-- `clave` identifica la condición que originó cada alerta; el índice único hace
+-- que volver a evaluarla no inserte un duplicado. Las filas anteriores quedan en NULL.
+ALTER TABLE historial_alertas ADD COLUMN clave VARCHAR(150) NULL AFTER leida;
+
+CREATE UNIQUE INDEX uq_historial_alertas_usuario_clave ON historial_alertas (usuario_id, clave);
+
+CREATE INDEX ix_historial_alertas_usuario_leida ON historial_alertas (usuario_id, leida, id);
+
+-- Solo se reevalúan presupuestos y cuentas modificados desde la última corrida
+CREATE INDEX ix_presupuestos_actualizado_en ON presupuestos (actualizado_en);
+
+CREATE INDEX ix_cuentas_actualizado_en ON cuentas (actualizado_en);
+
+CREATE TABLE IF NOT EXISTS marcas_agua (
+    nombre VARCHAR(50) NOT NULL PRIMARY KEY,
+    marca TIMESTAMP NULL
+);
@@ -0,0 +1,24 @@
+-- Saldos de cuentas mantenidos desde el ledger (servicios/saldos.py).
+-- Saldo a una fecha: último corte + movimientos de la cuenta desde ese corte.
+CREATE INDEX ix_transacciones_cuenta_fecha ON transacciones (cuenta_id, fecha);
+
+CREATE TABLE IF NOT EXISTS saldos_corte (
+    cuenta_id INT NOT NULL,
+    fecha DATE NOT NULL,
+    saldo DECIMAL(15, 2) NOT NULL,
+    PRIMARY KEY (cuenta_id, fecha),
+    CONSTRAINT fk_saldos_corte_cuenta FOREIGN KEY (cuenta_id) REFERENCES cuentas (id) ON DELETE CASCADE
+);
+
+-- Saldo de apertura que no sale de ninguna transacción: saldo_actual = saldo_inicial + ledger
+ALTER TABLE cuentas ADD COLUMN saldo_inicial DECIMAL(15, 2) NOT NULL DEFAULT 0 AFTER saldo_actual;
+
+-- Hasta ahora nada mantenía saldo_actual: lo capturado se conserva como saldo
+-- inicial y se le suma el ledger. Ambos UPDATE confirman junto con la versión.
+UPDATE cuentas SET saldo_inicial = saldo_actual;
+
+UPDATE cuentas SET saldo_actual = saldo_inicial + (
+    SELECT COALESCE(SUM(CASE WHEN t.tipo = 'egreso' THEN -t.monto ELSE t.monto END), 0)
+    FROM transacciones t
+    WHERE t.cuenta_id = cuentas.id
+);
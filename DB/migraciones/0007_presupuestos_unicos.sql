@@ -0,0 +1,22 @@
+-- Un presupuesto por (usuario_id, categoria_id, mes, anio): clave de los upserts
+-- por lotes y de la clonación de meses (servicios/presupuestos.py).
+-- Si hay repetidos se conserva el de menor id y los demás se BORRAN. Antes se
+-- copian completos a presupuestos_duplicados_0007 para poder revisar qué ids se
+-- quitaron (y restaurar montos si hace falta); la tabla se puede borrar después.
+CREATE TABLE IF NOT EXISTS presupuestos_duplicados_0007 AS
+SELECT p.* FROM presupuestos p
+WHERE EXISTS (
+    SELECT 1 FROM presupuestos q
+    WHERE q.usuario_id = p.usuario_id AND q.categoria_id = p.categoria_id
+      AND q.anio = p.anio AND q.mes = p.mes AND q.id < p.id
+);
+
+DELETE p FROM presupuestos p
+JOIN presupuestos q
+  ON q.usuario_id = p.usuario_id AND q.categoria_id = p.categoria_id
+ AND q.anio = p.anio AND q.mes = p.mes AND q.id < p.id;
+
+CREATE UNIQUE INDEX uq_presupuestos_usuario_periodo ON presupuestos (usuario_id, anio, mes, categoria_id);
+
+-- Mismas columnas y orden que el índice único: ya no hace falta
+DROP INDEX ix_presupuestos_usuario_periodo ON presupuestos;
@@ -0,0 +1,4 @@
+-- Búsqueda por descripción (GET /transacciones/buscar): MATCH ... AGAINST en modo
+-- booleano con prefijos. InnoDB mantiene el índice en cada INSERT/UPDATE/DELETE.
+-- El sustituto SQLite usa una tabla FTS5 con triggers (models/modelsDB.py).
+CREATE FULLTEXT INDEX ft_transacciones_descripcion ON transacciones (descripcion);
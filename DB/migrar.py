@@ -0,0 +1,88 @@
+"""
+Aplica en orden los scripts de DB/migraciones que todavía no se han ejecutado.
+
+    python -m DB.migrar            # aplica las pendientes
+    python -m DB.migrar --estado   # solo lista aplicadas / pendientes
+
+MySQL confirma implícitamente cada DDL, así que un script que falla a la mitad
+deja aplicado lo anterior. Para poder reintentarlo, se omiten los ADD COLUMN,
+CREATE INDEX y DROP INDEX que el esquema ya refleja (consultado con el inspector,
+information_schema en MySQL); las tablas usan CREATE TABLE IF NOT EXISTS y los
+UPDATE/DELETE de datos se escriben de modo que repetirlos no cambie nada.
+"""
+import re
+import sys
+from pathlib import Path
+from sqlalchemy import inspect, text
+
+from DB.conexion import engine
+
+CARPETA = Path(__file__).resolve().parent / "migraciones"
+
+
+def _sentencias(sql: str):
+    for sentencia in sql.split(";\n"):
+        lineas = [l for l in sentencia.splitlines() if not l.strip().startswith("--")]
+        sentencia = "\n".join(lineas).strip().rstrip(";")
+        if sentencia:
+            yield sentencia
+
+
+_ADD_COLUMN = re.compile(r"ALTER\s+TABLE\s+`?(?P<tabla>\w+)`?\s+ADD\s+COLUMN\s+`?(?P<columna>\w+)`?", re.I)
+_CREATE_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+|FULLTEXT\s+)?INDEX\s+`?(?P<indice>\w+)`?\s+ON\s+`?(?P<tabla>\w+)`?", re.I)
+_DROP_INDEX = re.compile(r"DROP\s+INDEX\s+`?(?P<indice>\w+)`?\s+ON\s+`?(?P<tabla>\w+)`?", re.I)
+
+
+def _indices(conn, tabla) -> set:
+    inspector = inspect(conn)
+    return ({i["name"] for i in inspector.get_indexes(tabla)}
+            | {u["name"] for u in inspector.get_unique_constraints(tabla)})
+
+
+def _ya_aplicada(conn, sentencia: str) -> bool:
+    """True si la sentencia es un DDL cuyo efecto ya está en el esquema (reintento tras un fallo)."""
+    m = _ADD_COLUMN.match(sentencia)
+    if m:
+        return m["columna"] in {c["name"] for c in inspect(conn).get_columns(m["tabla"])}
+    m = _CREATE_INDEX.match(sentencia)
+    if m:
+        return m["indice"] in _indices(conn, m["tabla"])
+    m = _DROP_INDEX.match(sentencia)
+    if m:
+        return m["indice"] not in _indices(conn, m["tabla"])
+    return False
+
+
+def migrar(solo_estado: bool = False):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migraciones (
+                version VARCHAR(255) PRIMARY KEY,
+                aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        aplicadas = {r.version for r in conn.execute(text("SELECT version FROM schema_migraciones"))}
+
+    for archivo in sorted(CARPETA.glob("*.sql")):
+        version = archivo.stem
+        if version in aplicadas:
+            print(f"  aplicada   {version}")
+            continue
+        if solo_estado:
+            print(f"  pendiente  {version}")
+            continue
+
+        # MySQL confirma implícitamente el DDL: al reintentar se omite lo que ya quedó aplicado
+        with engine.begin() as conn:
+            for sentencia in _sentencias(archivo.read_text(encoding="utf-8")):
+                if _ya_aplicada(conn, sentencia):
+                    print(f"  omitida    {version}: {sentencia.splitlines()[0]}")
+                    continue
+                conn.execute(text(sentencia))
+            conn.execute(text("INSERT INTO schema_migraciones (version) VALUES (:v)"), {"v": version})
+        print(f"  aplicando  {version}")
+
+
+if __name__ == "__main__":
+    migrar(solo_estado="--estado" in sys.argv)
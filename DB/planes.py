@@ -0,0 +1,160 @@
+"""
+Revisa con EXPLAIN que las consultas calientes de la API usen índices.
+
+    python -m DB.planes              # exit 1 si alguna consulta recorre una tabla completa
+    python -m DB.planes --detalle    # imprime además el plan de cada consulta
+
+Las sentencias se importan de los routers y servicios, así que el plan revisado
+es el de la consulta que se ejecuta en producción. En MySQL se marca cualquier
+acceso `type` ALL o index (recorrido completo de tabla o de índice); en SQLite,
+cualquier paso SCAN de EXPLAIN QUERY PLAN. Cada consulta declara las tablas en
+las que un recorrido completo es aceptable.
+
+Con tablas vacías cualquier plan es trivial: si la base es SQLite se crea el
+esquema con los modelos, se llena con benchmarks.datos cuando no tiene usuarios
+y se corre ANALYZE para que el planificador vea cantidades reales.
+"""
+import argparse
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+
+from DB.conexion import Session, engine
+from models.modelsDB import Base, Usuario
+from routers.alertas import consulta_alertas
+from routers.dashboard import SQL_DASHBOARD
+from routers.grafica import SQL_GRAFICA, sql_serie
+from routers.PagosFijos import SQL_PAGOS_FIJOS_ACTIVOS, SQL_PRESUPUESTOS_HORIZONTE, SQL_PRESUPUESTOS_MES
+from routers.presupuestos import SQL_ALERTA_PRESUPUESTO
+from routers.transacciones import (
+    _COLUMNAS_TRANSACCION, _codificar_cursor, _codificar_cursor_busqueda, _filtrar_transacciones, consulta_busqueda,
+)
+from servicios.alertas import consulta_excesos, consulta_existentes, consulta_pagos_proximos, consulta_saldos_bajos
+from servicios.exportacion import SQL_EXPORTACION
+from servicios.presupuestos import _SQL_DELTA, consulta_clonar
+from servicios.saldos import _SQL_CORTES, _SQL_SALDO, consulta_corte, consulta_movimientos
+from servicios.sugerencias import consulta_historial
+
+
+def _listado(desde=None, hasta=None, cursor=None, categoria_id=None):
+    return _filtrar_transacciones(
+        select(*_COLUMNAS_TRANSACCION), 1, desde, hasta, None, categoria_id, cursor
+    ).limit(101)
+
+
+# (nombre, sentencia, parámetros, tablas/alias donde se acepta un recorrido completo)
+CONSULTAS = [
+    ("transacciones.listado", _listado(), {}, set()),
+    ("transacciones.rango", _listado(desde=date(2024, 1, 1), hasta=date(2024, 12, 31)), {}, set()),
+    ("transacciones.cursor", _listado(cursor=_codificar_cursor(date(2024, 6, 1), 1000)), {}, set()),
+    ("transacciones.categoria", _listado(categoria_id=1), {}, set()),
+    # El recorrido de la tabla virtual FTS5 es su propio índice de texto
+    ("transacciones.buscar", consulta_busqueda(engine.dialect.name, 1, ["oxx", "farm"]), {}, {"transacciones_fts"}),
+    ("transacciones.buscar_cursor",
+     consulta_busqueda(engine.dialect.name, 1, ["oxx"], _codificar_cursor_busqueda(0.5, 1000)), {}, {"transacciones_fts"}),
+    ("sugerencias.historial", consulta_historial(1), {}, set()),
+    ("usuarios.login", select(Usuario.id).where(Usuario.correo_electronico == "a@b.c"), {}, set()),
+    ("exportacion", SQL_EXPORTACION, {"usuario_id": 1}, set()),
+    ("grafica", SQL_GRAFICA, {"usuario_id": 1}, set()),
+    ("presupuestos.alerta", SQL_ALERTA_PRESUPUESTO, {"usuario_id": 1, "mes": 6, "anio": 2024}, set()),
+    ("presupuestos.delta", _SQL_DELTA, {"u": 1, "c": 1, "m": 6, "a": 2024, "delta": 10}, set()),
+    ("presupuestos.clonar", consulta_clonar(6, 2024, 7, 2024, usuario_id=1), {}, set()),
+    # Cierre de mes de todos los usuarios: un recorrido de presupuestos por job mensual
+    ("presupuestos.clonar_todos", consulta_clonar(6, 2024, 7, 2024), {}, {"origen"}),
+    ("pagos_fijos.activos", SQL_PAGOS_FIJOS_ACTIVOS, {"usuario_id": 1}, set()),
+    ("pagos_fijos.presupuestos_mes", SQL_PRESUPUESTOS_MES, {"usuario_id": 1, "mes": 6, "anio": 2024}, set()),
+    ("pagos_fijos.proyeccion", SQL_PRESUPUESTOS_HORIZONTE, {"usuario_id": 1, "inicio": 24288, "fin": 24300}, set()),
+    ("saldos.delta", _SQL_SALDO, {"c": 1, "delta": 10}, set()),
+    ("saldos.cortes_delta", _SQL_CORTES, {"c": 1, "f": date(2024, 6, 1), "delta": 10}, set()),
+    ("saldos.corte", consulta_corte(1, date(2024, 6, 30)), {}, set()),
+    ("saldos.movimientos", consulta_movimientos(1, date(2024, 5, 31), date(2024, 6, 30)), {}, set()),
+    ("alertas.listado", consulta_alertas(1, False, 1000, 51), {}, set()),
+    ("alertas.excesos", consulta_excesos(datetime(2024, 6, 1)), {}, set()),
+    ("alertas.saldos_bajos", consulta_saldos_bajos(datetime(2024, 6, 1)), {}, set()),
+    ("alertas.pagos_proximos", consulta_pagos_proximos(date(2024, 6, 1)), {}, set()),
+    ("alertas.existentes", consulta_existentes([(1, "pago:1:2024-06-01"), (2, "saldo:3:2024-06-01")]), {}, set()),
+    # Recorrer los CTE ya filtrados por usuario es lo esperado
+    ("grafica.serie", sql_serie(engine.dialect.name, "mes"),
+     {"usuario_id": 1, "desde": "2024-01-15", "hasta": "2024-12-31", "primera": "2024-01-01"}, {"cubetas", "b", "a", "m"}),
+    ("dashboard", SQL_DASHBOARD, {"usuario_id": 1, "mes": 6, "anio": 2024}, {"grafica", "presupuestos_mes", "pg", "pm"}),
+]
+
+
+def _sql(sentencia, parametros):
+    """SQL del dialecto y sus parámetros en el formato del driver (dict o tupla posicional)."""
+    # render_postcompile: las listas de IN (expanding) van como parámetros sueltos
+    compilada = sentencia.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    valores = compilada.construct_params(parametros)
+    # Conversiones de tipo que haría execute() (Decimal y datetime en SQLite, p. ej.)
+    for nombre, procesar in compilada._bind_processors.items():
+        if nombre in valores and valores[nombre] is not None:
+            valores[nombre] = procesar(valores[nombre])
+    if compilada.positional:
+        valores = tuple(valores[nombre] for nombre in compilada.positiontup)
+    return str(compilada), valores
+
+
+def _problemas_mysql(conn, sql, valores, permitidas):
+    filas = conn.exec_driver_sql("EXPLAIN " + sql, valores).mappings().all()
+    problemas = [
+        f"{f['table']}: type={f['type']} key={f['key']}"
+        for f in filas
+        if f["type"] in ("ALL", "index") and f["table"] not in permitidas
+    ]
+    return problemas, [f"{f['table']} {f['type']} {f['key']} rows={f['rows']}" for f in filas]
+
+
+def _problemas_sqlite(conn, sql, valores, permitidas):
+    detalles = [f.detail for f in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, valores).mappings().all()]
+    # SCAN CONSTANT ROW (ancla de un CTE) y SCAN (subquery-N) (ventanas) no leen tablas
+    problemas = [
+        d for d in detalles
+        if d.startswith("SCAN ") and d.split()[1] not in permitidas
+        and d.split()[1] != "CONSTANT" and not d.split()[1].startswith("(")
+    ]
+    return problemas, detalles
+
+
+def preparar_sqlite(usuarios: int = 20, transacciones: int = 500):
+    """Esquema, datos sintéticos (si no hay usuarios) y estadísticas del planificador."""
+    from benchmarks.datos import generar
+
+    Base.metadata.create_all(engine)
+    db = Session()
+    try:
+        if not db.execute(select(func.count()).select_from(Usuario)).scalar():
+            generar(db, usuarios, transacciones)
+            db.commit()
+    finally:
+        db.close()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def revisar(detalle: bool = False) -> int:
+    dialecto = engine.dialect.name
+    if dialecto == "sqlite":
+        preparar_sqlite()
+    problemas_de = _problemas_mysql if dialecto == "mysql" else _problemas_sqlite
+
+    fallidas = 0
+    with engine.connect() as conn:
+        for nombre, sentencia, parametros, permitidas in CONSULTAS:
+            problemas, plan = problemas_de(conn, *_sql(sentencia, parametros), permitidas)
+            print(f"  {'FALLA' if problemas else 'ok   '}  {nombre}")
+            for p in problemas:
+                print(f"           recorrido completo: {p}")
+            if detalle:
+                for linea in plan:
+                    print(f"           | {linea}")
+            fallidas += bool(problemas)
+    print(f"{fallidas} consultas sin índice")
+    return fallidas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revisa los planes de las consultas de la API")
+    parser.add_argument("--detalle", action="store_true")
+    args = parser.parse_args()
+    if revisar(args.detalle):
+        raise SystemExit(1)
@@ -0,0 +1,88 @@
+"""
+Presupuesto de arranque en frío: mide en procesos nuevos cuánto tarda
+`import main` + `crear_app()` y falla si se pasa del presupuesto o si el
+arranque crea engines / carga módulos que deberían ser perezosos.
+
+    python -m benchmarks.arranque                      # exit 1 si no se cumple
+    python -m benchmarks.arranque --presupuesto-ms 900 --repeticiones 7
+
+No abre conexiones: solo importa y arma la app, como hace cada worker de uvicorn
+antes de los handlers de startup (calentar).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Mediana máxima de import + crear_app; tests/test_arranque.py usa el mismo valor
+PRESUPUESTO_MS = float(os.getenv("ARRANQUE_PRESUPUESTO_MS", "1000"))
+
+# Módulos que solo deben cargarse al usarse (driver de la base, bcrypt, parquet, dialectos ajenos)
+PEREZOSOS = [
+    "pymysql", "aiomysql", "aiosqlite", "passlib", "bcrypt", "pyarrow",
+    "sqlalchemy.dialects.postgresql", "sqlalchemy.dialects.mysql",
+]
+
+_MEDIR = """
+import json, sys, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter()
+main.crear_app()
+armado = time.perf_counter()
+import DB.conexion as conexion
+print(json.dumps({
+    "importar_ms": (importado - inicio) * 1000,
+    "crear_app_ms": (armado - importado) * 1000,
+    "engines_creados": any(e is not None for e in (conexion._engine, conexion._async_engine,
+                                                   conexion._lectura, conexion._lectura_async)),
+    "cargados": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def medir_una_vez() -> dict:
+    salida = subprocess.run(
+        [sys.executable, "-c", _MEDIR % (PEREZOSOS,)],
+        capture_output=True, text=True, check=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir(repeticiones: int) -> dict:
+    medidas = [medir_una_vez() for _ in range(repeticiones)]
+    total = [m["importar_ms"] + m["crear_app_ms"] for m in medidas]
+    return {
+        "repeticiones": repeticiones,
+        "importar_ms": round(statistics.median(m["importar_ms"] for m in medidas), 1),
+        "crear_app_ms": round(statistics.median(m["crear_app_ms"] for m in medidas), 1),
+        "total_ms": round(statistics.median(total), 1),
+        "minimo_ms": round(min(total), 1),
+        "engines_creados": any(m["engines_creados"] for m in medidas),
+        "cargados": sorted({c for m in medidas for c in m["cargados"]}),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--presupuesto-ms", type=float, default=PRESUPUESTO_MS,
+                        help="Mediana máxima de import + crear_app (ARRANQUE_PRESUPUESTO_MS)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    resultado = medir(args.repeticiones)
+    print(json.dumps(resultado, indent=2))
+
+    fallas = []
+    if resultado["total_ms"] > args.presupuesto_ms:
+        fallas.append(f"arranque {resultado['total_ms']} ms > presupuesto {args.presupuesto_ms} ms")
+    if resultado["engines_creados"]:
+        fallas.append("el arranque creó un engine: debe crearse en calentar() o en la primera sesión")
+    if resultado["cargados"]:
+        fallas.append(f"módulos que deberían cargarse al usarse: {', '.join(resultado['cargados'])}")
+    for falla in fallas:
+        print(f"  FALLA  {falla}")
+    if fallas:
+        raise SystemExit(1)
@@ -0,0 +1,91 @@
+"""
+Compara el rendimiento del stack síncrono (Session en el threadpool de AnyIO)
+contra el asíncrono (AsyncSession en el event loop) con muchos clientes concurrentes.
+
+    DATABASE_URL=mysql://... python -m benchmarks.async_vs_sync --clientes 200 --peticiones 5000
+
+Ambos handlers ejecutan la misma consulta de /grafica contra la base configurada.
+Requiere httpx. Contra SQLite no hay latencia de red, así que la diferencia solo
+es representativa apuntando a un MySQL remoto.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from DB.conexion import async_engine, get_async_db, get_db
+
+SQL = text("""
+    SELECT c.nombre AS nombre, c.tipo AS tipo, SUM(r.total) AS total
+    FROM resumen_mensual r
+    JOIN categorias c ON r.categoria_id = c.id
+    WHERE r.usuario_id = :usuario_id
+    GROUP BY c.id, c.nombre, c.tipo
+""")
+
+app = FastAPI()
+
+
+@app.get("/sync/{usuario_id}")
+def handler_sync(usuario_id: int, db: Session = Depends(get_db)):
+    return [dict(r._mapping) for r in db.execute(SQL, {"usuario_id": usuario_id})]
+
+
+@app.get("/async/{usuario_id}")
+async def handler_async(usuario_id: int, db: AsyncSession = Depends(get_async_db)):
+    return [dict(r._mapping) for r in await db.execute(SQL, {"usuario_id": usuario_id})]
+
+
+async def medir(cliente, ruta, clientes, peticiones, usuarios):
+    pendientes = iter(range(peticiones))
+    latencias = []
+
+    async def trabajador():
+        for i in pendientes:
+            inicio = time.perf_counter()
+            r = await cliente.get(f"{ruta}/{usuarios[i % len(usuarios)]}")
+            r.raise_for_status()
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(clientes)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "peticiones_por_segundo": round(peticiones / duracion, 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 2),
+        "p99_ms": round(latencias[int(len(latencias) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def main(args):
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        usuarios = list(range(1, args.usuarios + 1))
+        # Calentar ambos pools antes de medir
+        await medir(cliente, "/sync", 10, 50, usuarios)
+        await medir(cliente, "/async", 10, 50, usuarios)
+        resultado = {
+            "clientes": args.clientes,
+            "peticiones": args.peticiones,
+            "sync": await medir(cliente, "/sync", args.clientes, args.peticiones, usuarios),
+            "async": await medir(cliente, "/async", args.clientes, args.peticiones, usuarios),
+        }
+    await async_engine.dispose()
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--peticiones", type=int, default=5000)
+    parser.add_argument("--usuarios", type=int, default=50, help="Rango de usuario_id a consultar")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,299 @@
+"""
+Ejercita cada endpoint de routers/ con concurrencia configurable y reporta
+throughput y latencias p50/p95/p99 en JSON.
+
+    DATABASE_URL=sqlite:////tmp/lana_bench.db python -m benchmarks.carga --salida base.json
+    DATABASE_URL=sqlite:////tmp/lana_bench.db python -m benchmarks.carga --comparar base.json
+
+Espera una base generada con benchmarks.datos. Por defecto monta la app en el
+mismo proceso (httpx.ASGITransport); con --url mide un servidor ya levantado
+(uvicorn main:app --workers N) que use la misma base. Cada endpoint se mide por
+separado, con las mismas peticiones en el mismo orden para una semilla dada.
+Las escrituras limpian lo que crean (crear -> actualizar -> eliminar), salvo
+/usuarios y /transacciones/bulk, que agregan filas; usa --solo-lectura o
+regenera la base para repetir corridas exactamente iguales.
+
+--comparar marca como regresión un endpoint cuyo p95 suba o cuyo throughput baje
+más de --tolerancia (15% por defecto) respecto al JSON base, y sale con código 1.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy import func, select
+
+from DB.conexion import Session, async_engine
+from models.modelsDB import Categoria, Presupuesto, Transaccion, Usuario
+from benchmarks.datos import CONTRASENA
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    metodo: str
+    # (i, rng, contexto) -> (ruta, kwargs de httpx)
+    peticion: Callable
+    escritura: bool = False
+    # Tope de peticiones (p. ej. login: bcrypt domina y satura el pool de hashing)
+    maximo: Optional[int] = None
+
+
+class Contexto:
+    """Rangos de ids de la base generada y lo que crean los escenarios de escritura."""
+
+    def __init__(self):
+        db = Session()
+        try:
+            self.usuarios = db.execute(select(func.count()).select_from(Usuario)).scalar()
+            self.max_transaccion = db.execute(select(func.max(Transaccion.id))).scalar() or 0
+            self.max_categoria = db.execute(select(func.max(Categoria.id))).scalar() or 0
+            self.max_presupuesto = db.execute(select(func.max(Presupuesto.id))).scalar() or 0
+        finally:
+            db.close()
+        if not self.usuarios:
+            raise SystemExit("La base no tiene datos: genera el conjunto con python -m benchmarks.datos")
+        self.hoy = date.today()
+        self.corrida = time.time_ns()
+        self.creados = {"transacciones": [], "categorias": [], "presupuestos": []}
+
+    def usuario(self, rng):
+        return rng.randint(1, self.usuarios)
+
+
+def _transaccion(rng, ctx):
+    u = ctx.usuario(rng)
+    # cuenta_id y categoria_id existentes para cualquier usuario del conjunto
+    return {"usuario_id": u, "cuenta_id": 1, "categoria_id": 2, "monto": f"{rng.uniform(1, 900):.2f}",
+            "tipo": "egreso", "descripcion": "benchmark", "fecha": (ctx.hoy - timedelta(days=rng.randrange(60))).isoformat()}
+
+
+def _csv_bulk(rng, ctx, filas=100):
+    lineas = ["usuario_id,cuenta_id,categoria_id,monto,tipo,descripcion,fecha"]
+    for _ in range(filas):
+        t = _transaccion(rng, ctx)
+        lineas.append(f"{t['usuario_id']},1,2,{t['monto']},egreso,bulk,{t['fecha']}")
+    return ("\n".join(lineas) + "\n").encode()
+
+
+def _siguiente(ctx, tipo, i):
+    """Respuesta de la i-ésima fila creada por el escenario "crear" del recurso."""
+    creados = ctx.creados[tipo]
+    return creados[i % len(creados)] if creados else {"id": 0}
+
+
+ESCENARIOS = [
+    # ---------------- Lecturas ----------------
+    Escenario("categorias.listar", "GET", lambda i, r, c: (f"/categorias?usuario_id={c.usuario(r)}", {})),
+    Escenario("categorias.arbol", "GET", lambda i, r, c: (f"/categorias/arbol?usuario_id={c.usuario(r)}", {})),
+    Escenario("categorias.obtener", "GET", lambda i, r, c: (f"/categorias/{r.randint(1, c.max_categoria)}", {})),
+    Escenario("transacciones.listar", "GET", lambda i, r, c: (f"/transacciones?usuario_id={c.usuario(r)}&limite=100", {})),
+    Escenario("transacciones.ndjson", "GET", lambda i, r, c: (f"/transacciones?usuario_id={c.usuario(r)}&formato=ndjson", {})),
+    Escenario("transacciones.obtener", "GET", lambda i, r, c: (f"/transacciones/{r.randint(1, c.max_transaccion)}", {})),
+    Escenario("presupuestos.listar", "GET", lambda i, r, c: ("/presupuestos", {}), maximo=50),
+    Escenario("presupuestos.obtener", "GET", lambda i, r, c: (f"/presupuestos/{r.randint(1, c.max_presupuesto)}", {})),
+    Escenario("presupuestos.alerta", "GET", lambda i, r, c: (f"/presupuesto-alerta/{c.usuario(r)}", {})),
+    Escenario("grafica", "GET", lambda i, r, c: (f"/grafica/{c.usuario(r)}", {})),
+    Escenario("grafica.serie", "GET", lambda i, r, c: (
+        f"/grafica/{c.usuario(r)}/serie?cubeta={r.choice(['dia', 'semana', 'mes'])}", {})),
+    Escenario("dashboard", "GET", lambda i, r, c: (f"/dashboard/{c.usuario(r)}", {})),
+    Escenario("pagos_fijos.validar", "GET", lambda i, r, c: (f"/pagos-fijos/validar-presupuesto/{c.usuario(r)}", {})),
+    Escenario("pagos_fijos.proyeccion", "GET",
+              lambda i, r, c: (f"/pagos-fijos/validar-presupuesto/{c.usuario(r)}?meses=12", {})),
+    Escenario("usuarios.exportar", "GET", lambda i, r, c: (f"/usuarios/{c.usuario(r)}/export?formato=csv", {})),
+    Escenario("hashing.metricas", "GET", lambda i, r, c: ("/hashing/metricas", {})),
+    Escenario("login", "POST", lambda i, r, c: ("/login", {"json": {
+        "correo_electronico": f"usuario{c.usuario(r)}@bench.lana", "contrasena_hash": CONTRASENA}}), maximo=100),
+
+    # ---------------- Escrituras (crear -> actualizar -> eliminar) ----------------
+    Escenario("transacciones.crear", "POST", lambda i, r, c: ("/transacciones", {"json": _transaccion(r, c)}),
+              escritura=True),
+    Escenario("transacciones.actualizar", "PUT", lambda i, r, c: (
+        f"/transacciones/{_siguiente(c, 'transacciones', i)['id']}", {"json": {"monto": f"{r.uniform(1, 900):.2f}"}}),
+              escritura=True),
+    Escenario("transacciones.eliminar", "DELETE", lambda i, r, c: (
+        f"/transacciones/{_siguiente(c, 'transacciones', i)['id']}", {}), escritura=True),
+    Escenario("transacciones.bulk", "POST", lambda i, r, c: ("/transacciones/bulk", {
+        "content": _csv_bulk(r, c), "headers": {"content-type": "text/csv"}}), escritura=True, maximo=50),
+    Escenario("categorias.crear", "POST", lambda i, r, c: ("/categorias", {"json": {
+        "nombre": f"bench {i}", "tipo": "egreso", "usuario_id": c.usuario(r), "categoria_padre_id": 1}}),
+              escritura=True),
+    Escenario("categorias.actualizar", "PUT", lambda i, r, c: (
+        f"/categorias/{_siguiente(c, 'categorias', i)['id']}", {"json": {"nombre": f"bench {i} editada"}}),
+              escritura=True),
+    Escenario("categorias.eliminar", "DELETE", lambda i, r, c: (
+        f"/categorias/{_siguiente(c, 'categorias', i)['id']}", {}), escritura=True),
+    Escenario("presupuestos.crear", "POST", lambda i, r, c: ("/presupuestos", {"json": {
+        # Periodos fuera del rango generado para no chocar con los existentes
+        "id": None, "usuario_id": c.usuario(r), "categoria_id": 1, "mes": i % 12 + 1, "anio": 3000 + i // 12,
+        "monto": "1000.00", "creado_en": None, "actualizado_en": None}}), escritura=True),
+    Escenario("presupuestos.actualizar", "PUT", lambda i, r, c: (
+        f"/presupuestos/{_siguiente(c, 'presupuestos', i)['id']}", {"json": {
+            **_siguiente(c, "presupuestos", i), "monto": f"{r.uniform(500, 5000):.2f}"}}),
+              escritura=True),
+    Escenario("presupuestos.eliminar", "DELETE", lambda i, r, c: (
+        f"/presupuestos/{_siguiente(c, 'presupuestos', i)['id']}", {}), escritura=True),
+    Escenario("usuarios.crear", "POST", lambda i, r, c: ("/usuarios", {"json": {
+        "nombre_completo": "Usuario Carga", "correo_electronico": f"carga{c.corrida}-{i}@bench.lana",
+        "telefono": None, "contrasena_hash": CONTRASENA, "creado_en": None, "actualizado_en": None}}),
+              escritura=True, maximo=100),
+]
+
+# Los escenarios "crear" guardan el id devuelto para actualizar/eliminar después
+_RECURSO_CREADO = {
+    "transacciones.crear": "transacciones",
+    "categorias.crear": "categorias",
+    "presupuestos.crear": "presupuestos",
+}
+
+
+def percentil(ordenadas, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenadas:
+        return None
+    indice = max(0, min(len(ordenadas) - 1, int(round(p / 100 * len(ordenadas) + 0.5)) - 1))
+    return ordenadas[indice]
+
+
+async def medir(cliente, escenario, contexto, concurrencia, peticiones, semilla):
+    if escenario.maximo is not None:
+        peticiones = min(peticiones, escenario.maximo)
+    # Misma secuencia de peticiones para la misma semilla, sin depender del hash del proceso
+    rng = random.Random(semilla ^ zlib.crc32(escenario.nombre.encode()))
+    if escenario.nombre.endswith(".eliminar"):
+        peticiones = min(peticiones, len(contexto.creados[escenario.nombre.split(".")[0]]))
+    lote = []
+    for i in range(peticiones):
+        ruta, kwargs = escenario.peticion(i, rng, contexto)
+        lote.append((i, ruta, kwargs))
+
+    pendientes = iter(lote)
+    latencias, errores = [], 0
+    recurso = _RECURSO_CREADO.get(escenario.nombre)
+
+    async def trabajador():
+        nonlocal errores
+        for i, ruta, kwargs in pendientes:
+            inicio = time.perf_counter()
+            r = await cliente.request(escenario.metodo, ruta, **kwargs)
+            latencias.append(time.perf_counter() - inicio)
+            if r.status_code >= 400:
+                errores += 1
+            elif recurso:
+                contexto.creados[recurso].append(r.json())
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "peticiones": len(latencias),
+        "errores": errores,
+        "peticiones_por_segundo": round(len(latencias) / duracion, 1) if duracion else None,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2) if latencias else None,
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2) if latencias else None,
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2) if latencias else None,
+    }
+
+
+def comparar(base, actual, tolerancia):
+    """Devuelve las regresiones de `actual` frente a `base` (dicts con la forma de la salida)."""
+    regresiones = []
+    for nombre, r in actual["resultados"].items():
+        b = base["resultados"].get(nombre)
+        if not b or not b.get("p95_ms") or not r.get("p95_ms"):
+            continue
+        if r["p95_ms"] > b["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {b['p95_ms']} ms -> {r['p95_ms']} ms")
+        if r["peticiones_por_segundo"] < b["peticiones_por_segundo"] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: {b['peticiones_por_segundo']} -> {r['peticiones_por_segundo']} peticiones/s")
+    return regresiones
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    contexto = Contexto()
+    escenarios = [e for e in ESCENARIOS if not (args.solo_lectura and e.escritura)]
+    if args.endpoints:
+        elegidos = set(args.endpoints.split(","))
+        escenarios = [e for e in escenarios if e.nombre in elegidos]
+
+    if args.url:
+        cliente = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from main import app
+        cliente = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    resultados = {}
+    async with cliente:
+        for escenario in escenarios:
+            if not escenario.escritura:
+                # Calentar pools y cachés antes de medir
+                await medir(cliente, escenario, contexto, min(args.concurrencia, 10), 20, args.semilla + 1)
+            resultados[escenario.nombre] = await medir(
+                cliente, escenario, contexto, args.concurrencia, args.peticiones, args.semilla
+            )
+            print(f"  {escenario.nombre:28} {json.dumps(resultados[escenario.nombre])}", flush=True)
+
+    if not args.url:
+        from servicios import hashing
+        hashing.cerrar()
+        await async_engine.dispose()
+
+    salida = {
+        "commit": _commit_actual(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {
+            "concurrencia": args.concurrencia,
+            "peticiones": args.peticiones,
+            "semilla": args.semilla,
+            "usuarios": contexto.usuarios,
+            "transacciones": contexto.max_transaccion,
+            "destino": args.url or "asgi",
+        },
+        "resultados": resultados,
+    }
+    texto = json.dumps(salida, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(json.load(f), salida, args.tolerancia)
+        for r in regresiones:
+            print(f"  REGRESIÓN  {r}")
+        print(f"{len(regresiones)} regresiones (tolerancia {args.tolerancia:.0%})")
+        if regresiones:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--peticiones", type=int, default=500, help="Peticiones por endpoint")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--endpoints", default=None, help="Lista separada por comas (por defecto, todos)")
+    parser.add_argument("--solo-lectura", action="store_true", help="Omite los endpoints que escriben")
+    parser.add_argument("--url", default=None, help="Servidor a medir en lugar de la app en proceso")
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados (stdout por defecto)")
+    parser.add_argument("--comparar", default=None, help="JSON base contra el cual detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.15)
+    asyncio.run(main(parser.parse_args()))
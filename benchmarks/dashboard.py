@@ -0,0 +1,80 @@
+"""
+Comprueba que /dashboard/{usuario_id} devuelve lo mismo que /grafica,
+/presupuesto-alerta y /pagos-fijos/validar-presupuesto por separado, y compara
+el tiempo de las tres peticiones contra la del dashboard (sin caché).
+
+    DATABASE_URL=sqlite:////tmp/lana_bench.db python -m benchmarks.dashboard --usuarios 20
+
+Sale con código 1 si algún usuario no coincide. Las listas se comparan sin
+importar el orden: los endpoints individuales no ordenan sus filas.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+
+SECCIONES = {
+    "grafica": "/grafica/{}",
+    "presupuesto_alerta": "/presupuesto-alerta/{}",
+    "pagos_fijos": "/pagos-fijos/validar-presupuesto/{}",
+}
+
+
+def _normalizar(valor):
+    if isinstance(valor, dict):
+        return {k: _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return sorted((_normalizar(v) for v in valor), key=lambda v: json.dumps(v, sort_keys=True))
+    return valor
+
+
+async def comprobar(usuarios: int) -> tuple:
+    from main import crear_app
+    from servicios import cache_usuario
+    from DB.conexion import cerrar
+
+    diferencias, separados, dashboard = [], 0.0, 0.0
+    transporte = httpx.ASGITransport(app=crear_app())
+    async with httpx.AsyncClient(transport=transporte, base_url="http://lana") as cliente:
+        for usuario_id in range(1, usuarios + 1):
+            inicio = time.perf_counter()
+            esperado = {}
+            for seccion, ruta in SECCIONES.items():
+                respuesta = await cliente.get(ruta.format(usuario_id))
+                respuesta.raise_for_status()
+                esperado[seccion] = respuesta.json()
+            separados += time.perf_counter() - inicio
+
+            cache_usuario.descartar([usuario_id])
+            inicio = time.perf_counter()
+            respuesta = await cliente.get(f"/dashboard/{usuario_id}")
+            dashboard += time.perf_counter() - inicio
+            respuesta.raise_for_status()
+
+            obtenido = respuesta.json()
+            for seccion in SECCIONES:
+                if _normalizar(obtenido[seccion]) != _normalizar(esperado[seccion]):
+                    diferencias.append((usuario_id, seccion, esperado[seccion], obtenido[seccion]))
+    await cerrar()
+    return diferencias, separados, dashboard
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=20, help="Revisa los usuarios 1..N")
+    args = parser.parse_args()
+
+    diferencias, separados, dashboard = asyncio.run(comprobar(args.usuarios))
+    print(json.dumps({
+        "usuarios": args.usuarios,
+        "tres_peticiones_ms": round(separados / args.usuarios * 1000, 2),
+        "dashboard_ms": round(dashboard / args.usuarios * 1000, 2),
+        "diferencias": len(diferencias),
+    }, indent=2))
+    for usuario_id, seccion, esperado, obtenido in diferencias:
+        print(f"  FALLA  usuario {usuario_id} {seccion}:\n    esperado {esperado}\n    obtenido {obtenido}")
+    if diferencias:
+        raise SystemExit(1)
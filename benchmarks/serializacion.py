@@ -0,0 +1,94 @@
+"""
+CPU por fila del camino de lectura: ORM + response_model de Pydantic + JSONResponse
+(el de antes) contra columnas de Core + servicios/serializacion.py (el actual).
+
+    DATABASE_URL=sqlite:////tmp/lana_bench.db python -m benchmarks.serializacion --filas 20000
+
+Espera una base generada con benchmarks.datos. Mide tiempo de CPU del proceso
+(time.process_time), toma el mejor de --repeticiones y comprueba que ambos
+caminos produzcan exactamente los mismos bytes. Reporta la consulta completa y
+solo la serialización (filas ya leídas).
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from DB.conexion import Session
+from models.modelsDB import Categoria, Presupuesto, Transaccion
+from modelsPydantic import Categoria as CategoriaOut, Presupuesto as PresupuestoOut, TransaccionOut
+from servicios.serializacion import Serializador
+
+CASOS = [
+    ("transacciones", Transaccion, TransaccionOut),
+    ("presupuestos", Presupuesto, PresupuestoOut),
+    ("categorias", Categoria, CategoriaOut),
+]
+
+
+def _mejor(funcion, repeticiones):
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = time.process_time()
+        resultado = funcion()
+        duracion = time.process_time() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def medir(db, modelo, esquema, filas, repeticiones):
+    adaptador = TypeAdapter(List[esquema])
+    serializador = Serializador(esquema)
+
+    def respuesta_modelo(objetos):
+        # Lo que hace FastAPI con response_model=List[...] y JSONResponse
+        return JSONResponse(content=adaptador.dump_python(
+            adaptador.validate_python(objetos, from_attributes=True), mode="json")).body
+
+    def anterior():
+        db.expunge_all()
+        return respuesta_modelo(db.execute(select(modelo).order_by(modelo.id).limit(filas)).scalars().all())
+
+    def actual():
+        return serializador.json(db.execute(
+            select(*serializador.columnas(modelo)).order_by(modelo.id).limit(filas)).all())
+
+    t_anterior, cuerpo_anterior = _mejor(anterior, repeticiones)
+    t_actual, cuerpo_actual = _mejor(actual, repeticiones)
+    if cuerpo_anterior != cuerpo_actual:
+        raise SystemExit(f"{modelo.__tablename__}: las respuestas difieren")
+
+    objetos = db.execute(select(modelo).order_by(modelo.id).limit(filas)).scalars().all()
+    tuplas = db.execute(select(*serializador.columnas(modelo)).order_by(modelo.id).limit(filas)).all()
+    s_anterior, _ = _mejor(lambda: respuesta_modelo(objetos), repeticiones)
+    s_actual, _ = _mejor(lambda: serializador.json(tuplas), repeticiones)
+
+    n = len(tuplas) or 1
+    return {
+        "filas": len(tuplas),
+        "bytes": len(cuerpo_actual),
+        "consulta_us_por_fila": {"anterior": round(t_anterior / n * 1e6, 2), "actual": round(t_actual / n * 1e6, 2),
+                                 "mejora": round(t_anterior / t_actual, 1) if t_actual else None},
+        "serializacion_us_por_fila": {"anterior": round(s_anterior / n * 1e6, 2),
+                                      "actual": round(s_actual / n * 1e6, 2),
+                                      "mejora": round(s_anterior / s_actual, 1) if s_actual else None},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    db = Session()
+    try:
+        resultado = {nombre: medir(db, modelo, esquema, args.filas, args.repeticiones)
+                     for nombre, modelo, esquema in CASOS}
+    finally:
+        db.close()
+    print(json.dumps(resultado, indent=2))
@@ -1,32 +1,73 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers.usuarios import routerUsuarios
-from routers.transacciones import routerTransacciones
-from routers.presupuestos import routerPresupuestos
-from routers.grafica import routerGrafica
-from routers.PagosFijos import routerPagosFijos
-from routers.categorias import routercategorias
-app = FastAPI(
-    title='API LANA APP',
-    description='API PARA LA APLICACION LANA APP',
-    version='1.0.1'
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"]
-)
-
-
-
-app.include_router(routerUsuarios)
-app.include_router(routerTransacciones)
-app.include_router(routerPresupuestos)
-
-app.include_router(routercategorias)
-app.include_router(routerGrafica)
-app.include_router(routerPagosFijos)
 
+
+def crear_app() -> FastAPI:
+    """
+    Arma la aplicación. Los routers (y con ellos modelos, pydantic y servicios) se
+    importan aquí y no al importar main; el engine y el pool de hashing se crean en
+    el arranque (calentar) o en la primera petición.
+
+        uvicorn main:crear_app --factory
+        uvicorn main:app                   # equivalente: `app` se crea al pedirla
+    """
+    from routers.usuarios import routerUsuarios
+    from routers.transacciones import routerTransacciones
+    from routers.presupuestos import routerPresupuestos
+    from routers.grafica import routerGrafica
+    from routers.dashboard import routerDashboard
+    from routers.alertas import routerAlertas
+    from routers.cuentas import routerCuentas
+    from routers.transferencias import routerTransferencias
+    from routers.PagosFijos import routerPagosFijos
+    from routers.categorias import routercategorias
+    from routers.metricas import routerMetricas
+    from DB.conexion import calentar, cerrar
+    from servicios import hashing
+    from servicios.instrumentacion import MiddlewareMetricas
+
+    app = FastAPI(
+        title='API LANA APP',
+        description='API PARA LA APLICACION LANA APP',
+        version='1.0.1'
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Sin esto el navegador no deja leer el cursor de paginación ni el ETag
+        expose_headers=["X-Siguiente-Cursor", "ETag"]
+    )
+
+    # Va por fuera de CORS: mide la petición completa (ver /metrics)
+    app.add_middleware(MiddlewareMetricas)
+
+    app.include_router(routerUsuarios)
+    app.include_router(routerTransacciones)
+    app.include_router(routerTransferencias)
+    app.include_router(routerPresupuestos)
+
+    app.include_router(routercategorias)
+    app.include_router(routerGrafica)
+    app.include_router(routerDashboard)
+    app.include_router(routerAlertas)
+    app.include_router(routerCuentas)
+    app.include_router(routerPagosFijos)
+    app.include_router(routerMetricas)
+
+    # uvicorn no acepta conexiones hasta que terminan los handlers de startup
+    app.add_event_handler("startup", calentar)
+    app.add_event_handler("startup", hashing.calentar)
+    app.add_event_handler("shutdown", hashing.cerrar)
+    app.add_event_handler("shutdown", cerrar)
+    return app
+
+
+def __getattr__(nombre):
+    if nombre == "app":
+        app = globals()["app"] = crear_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, Boolean, Date, Text, Enum, ForeignKey, TIMESTAMP, func
+from sqlalchemy import Column, Integer, String, DECIMAL, Boolean, Date, Text, Enum, ForeignKey, TIMESTAMP, Index, UniqueConstraint, DDL, event, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -44,12 +44,19 @@ class Cuenta(Base):
     nombre = Column(String(100), nullable=False)
     tipo = Column(Enum('efectivo', 'cuenta_bancaria', 'tarjeta_credito', 'tarjeta_debito', 'inversion', 'ahorro', 'otro'), nullable=False)
     saldo_actual = Column(DECIMAL(15, 2), nullable=False, default=0)
+    # Saldo de apertura sin transacciones que lo respalden; saldo_actual = saldo_inicial + ledger
+    saldo_inicial = Column(DECIMAL(15, 2), nullable=False, default=0)
     moneda = Column(String(3), default='MXN')
     creado_en = Column(TIMESTAMP, server_default=func.now())
     actualizado_en = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     usuario = relationship("Usuario", back_populates="cuentas")
 
+    __table_args__ = (
+        # Cuentas modificadas desde la última corrida de servicios/alertas.py
+        Index('ix_cuentas_actualizado_en', 'actualizado_en'),
+    )
+
 class Transaccion(Base):
     __tablename__ = 'transacciones'
 
@@ -67,6 +74,48 @@ class Transaccion(Base):
     cuenta = relationship("Cuenta")
     categoria = relationship("Categoria", backref="transacciones")
 
+    __table_args__ = (
+        # Listado paginado (fecha, id), exportación y filtros por rango de fechas
+        Index('ix_transacciones_usuario_fecha', 'usuario_id', 'fecha', 'id'),
+        # Recalculo de presupuestos por categoría y mes
+        Index('ix_transacciones_usuario_categoria_fecha', 'usuario_id', 'categoria_id', 'fecha'),
+        # Saldo a una fecha: movimientos de la cuenta posteriores al último corte
+        Index('ix_transacciones_cuenta_fecha', 'cuenta_id', 'fecha'),
+    )
+
+# GET /transacciones/buscar en MySQL. Va como DDL y no como Index(mysql_prefix=...):
+# ese argumento carga el dialecto MySQL al importar los modelos (ver benchmarks/arranque.py)
+event.listen(Transaccion.__table__, "after_create", DDL(
+    "CREATE FULLTEXT INDEX ft_transacciones_descripcion ON transacciones (descripcion)"
+).execute_if(dialect="mysql"))
+
+# Búsqueda de texto en SQLite (en lugar del FULLTEXT): tabla FTS5 sin contenido, mantenida por triggers. El
+# usuario va como token ('u12') para que la búsqueda por usuario cruce índices en
+# lugar de filtrar después; remove_diacritics iguala 'taqueria' y 'taquería'.
+_FTS_SQLITE = [
+    """CREATE VIRTUAL TABLE transacciones_fts USING fts5(
+        usuario, texto, content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER transacciones_fts_ai AFTER INSERT ON transacciones
+    WHEN new.descripcion IS NOT NULL BEGIN
+        INSERT INTO transacciones_fts (rowid, usuario, texto) VALUES (new.id, 'u' || new.usuario_id, new.descripcion);
+    END""",
+    """CREATE TRIGGER transacciones_fts_ad AFTER DELETE ON transacciones
+    WHEN old.descripcion IS NOT NULL BEGIN
+        INSERT INTO transacciones_fts (transacciones_fts, rowid, usuario, texto)
+        VALUES ('delete', old.id, 'u' || old.usuario_id, old.descripcion);
+    END""",
+    """CREATE TRIGGER transacciones_fts_au AFTER UPDATE OF usuario_id, descripcion ON transacciones BEGIN
+        INSERT INTO transacciones_fts (transacciones_fts, rowid, usuario, texto)
+        SELECT 'delete', old.id, 'u' || old.usuario_id, old.descripcion WHERE old.descripcion IS NOT NULL;
+        INSERT INTO transacciones_fts (rowid, usuario, texto)
+        SELECT new.id, 'u' || new.usuario_id, new.descripcion WHERE new.descripcion IS NOT NULL;
+    END""",
+]
+for _sentencia in _FTS_SQLITE:
+    event.listen(Transaccion.__table__, "after_create", DDL(_sentencia).execute_if(dialect="sqlite"))
+event.listen(Transaccion.__table__, "after_drop", DDL("DROP TABLE IF EXISTS transacciones_fts").execute_if(dialect="sqlite"))
+
 class Transferencia(Base):
     __tablename__ = 'transferencias'
 
@@ -97,6 +146,12 @@ class Presupuesto(Base):
     usuario = relationship("Usuario", backref="presupuestos")
     categoria = relationship("Categoria", backref="presupuestos")
 
+    __table_args__ = (
+        # Un presupuesto por usuario, categoría y mes: clave de los upserts de servicios/presupuestos
+        UniqueConstraint('usuario_id', 'anio', 'mes', 'categoria_id', name='uq_presupuestos_usuario_periodo'),
+        Index('ix_presupuestos_actualizado_en', 'actualizado_en'),
+    )
+
 class PagoFijo(Base):
     __tablename__ = 'pagos_fijos'
 
@@ -116,6 +171,11 @@ class PagoFijo(Base):
     cuenta = relationship("Cuenta")
     categoria = relationship("Categoria")
 
+    __table_args__ = (
+        Index('ix_pagos_fijos_usuario_activo', 'usuario_id', 'activo'),
+        Index('ix_pagos_fijos_activo_proxima_fecha', 'activo', 'proxima_fecha'),
+    )
+
 class Meta(Base):
     __tablename__ = 'metas'
 
@@ -144,12 +204,17 @@ class TransaccionRecurrente(Base):
     tipo_recurrencia = Column(Enum('diaria', 'semanal', 'mensual', 'anual'))
     fecha_inicio = Column(Date, nullable=False)
     fecha_fin = Column(Date)
+    proxima_fecha = Column(Date)
     activa = Column(Boolean, default=True)
 
     usuario = relationship("Usuario", backref="transacciones_recurrentes")
     categoria = relationship("Categoria")
     cuenta = relationship("Cuenta")
 
+    __table_args__ = (
+        Index('ix_transacciones_recurrentes_activa_proxima_fecha', 'activa', 'proxima_fecha'),
+    )
+
 class HistorialAlerta(Base):
     __tablename__ = 'historial_alertas'
 
@@ -159,5 +224,44 @@ class HistorialAlerta(Base):
     mensaje = Column(Text)
     fecha = Column(TIMESTAMP, server_default=func.now())
     leida = Column(Boolean, default=False)
+    # Identifica la condición que originó la alerta (p. ej. 'exceso:12:2024-06'); evita duplicados
+    clave = Column(String(150))
 
     usuario = relationship("Usuario", backref="historial_alertas")
+
+    __table_args__ = (
+        UniqueConstraint('usuario_id', 'clave', name='uq_historial_alertas_usuario_clave'),
+        # Listado de no leídas por usuario (GET /alertas)
+        Index('ix_historial_alertas_usuario_leida', 'usuario_id', 'leida', 'id'),
+    )
+
+class ResumenMensual(Base):
+    __tablename__ = 'resumen_mensual'
+
+    usuario_id = Column(Integer, ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True)
+    anio = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    categoria_id = Column(Integer, primary_key=True)
+    tipo = Column(Enum('ingreso', 'egreso', 'transferencia'), primary_key=True)
+    total = Column(DECIMAL(15, 2), nullable=False, default=0)
+    num_transacciones = Column(Integer, nullable=False, default=0)
+
+class VersionCache(Base):
+    __tablename__ = 'versiones_cache'
+
+    nombre = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class MarcaAgua(Base):
+    __tablename__ = 'marcas_agua'
+
+    nombre = Column(String(50), primary_key=True)
+    marca = Column(TIMESTAMP, nullable=True)
+
+class SaldoCorte(Base):
+    __tablename__ = 'saldos_corte'
+
+    # Saldo de la cuenta al cierre de `fecha` (incluye las transacciones de ese día)
+    cuenta_id = Column(Integer, ForeignKey('cuentas.id', ondelete='CASCADE'), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    saldo = Column(DECIMAL(15, 2), nullable=False)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, constr, condecimal
+from pydantic import BaseModel, ConfigDict, EmailStr, constr, condecimal, conint
 from typing import Optional, Literal
 from datetime import datetime, date
 
@@ -14,8 +14,7 @@ class Usuario(BaseModel):
     creado_en: Optional[datetime]
     actualizado_en: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UsuarioLogin(BaseModel):
     correo_electronico: EmailStr
@@ -33,19 +32,20 @@ class Categoria(BaseModel):
     es_sistema: Optional[bool] = False
     creado_en: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Input (crear)
 class CategoriaCreate(BaseModel):
     nombre: constr(strip_whitespace=True, min_length=1)
     tipo: Literal['ingreso', 'egreso']
+    usuario_id: Optional[int] = None
     categoria_padre_id: Optional[int] = None
 
 # Input (actualizar parcial)
 class CategoriaUpdate(BaseModel):
     nombre: Optional[constr(strip_whitespace=True, min_length=1)] = None
     tipo: Optional[Literal['ingreso', 'egreso']] = None
+    usuario_id: Optional[int] = None
     categoria_padre_id: Optional[int] = None
 
 # ---------------- Cuentas ----------------
@@ -56,12 +56,12 @@ class Cuenta(BaseModel):
     nombre: constr(min_length=1, strip_whitespace=True)
     tipo: Literal['efectivo', 'cuenta_bancaria', 'tarjeta_credito', 'tarjeta_debito', 'inversion', 'ahorro', 'otro']
     saldo_actual: condecimal(max_digits=15, decimal_places=2)
+    saldo_inicial: Optional[condecimal(max_digits=15, decimal_places=2)] = 0
     moneda: Optional[constr(min_length=3, max_length=3)] = 'MXN'
     creado_en: Optional[datetime]
     actualizado_en: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # ---------------- Transacciones ----------------
 
@@ -76,8 +76,7 @@ class Transaccion(BaseModel):
     fecha: date
     creado_en: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class Transferencia(BaseModel):
     id: Optional[int]
@@ -87,8 +86,16 @@ class Transferencia(BaseModel):
     monto: condecimal(max_digits=15, decimal_places=2)
     fecha: date
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Input (crear): genera las dos transacciones y la fila de transferencias
+class TransferenciaCreate(BaseModel):
+    usuario_id: Optional[int] = None
+    cuenta_origen_id: int
+    cuenta_destino_id: int
+    monto: condecimal(max_digits=15, decimal_places=2, gt=0)
+    descripcion: Optional[str] = None
+    fecha: Optional[date] = None               # opcional; backend usa hoy si no viene
 
 # ---------------- Presupuestos ----------------
 
@@ -103,8 +110,24 @@ class Presupuesto(BaseModel):
     creado_en: Optional[datetime]
     actualizado_en: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Input (upsert por lotes): clave (usuario_id, categoria_id, mes, anio)
+class PresupuestoLote(BaseModel):
+    usuario_id: int
+    categoria_id: int
+    mes: conint(ge=1, le=12)
+    anio: int
+    monto: condecimal(max_digits=15, decimal_places=2, ge=0)
+
+# Input (clonar un mes): sin usuario_id, todos los usuarios; sin destino, el mes siguiente
+class PresupuestoClonar(BaseModel):
+    usuario_id: Optional[int] = None
+    mes: conint(ge=1, le=12)
+    anio: int
+    mes_destino: Optional[conint(ge=1, le=12)] = None
+    anio_destino: Optional[int] = None
+    sobrescribir: bool = False
 
 # ---------------- Pagos Fijos ----------------
 
@@ -121,8 +144,7 @@ class PagoFijo(BaseModel):
     activo: Optional[bool] = True
     creado_en: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # ---------------- Metas ----------------
 
@@ -137,8 +159,7 @@ class Meta(BaseModel):
     completada: Optional[bool] = False
     creado_en: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # ---------------- Transacciones Recurrentes ----------------
 
@@ -153,10 +174,10 @@ class TransaccionRecurrente(BaseModel):
     tipo_recurrencia: Optional[Literal['diaria', 'semanal', 'mensual', 'anual']]
     fecha_inicio: date
     fecha_fin: Optional[date]
+    proxima_fecha: Optional[date] = None
     activa: Optional[bool] = True
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 # ---------- TRANSACCIONES ----------
 class TransaccionBase(BaseModel):
     usuario_id: Optional[int] = None           # ahora opcional (lo asignamos en el backend si no viene)
@@ -187,13 +208,12 @@ class TransaccionOut(BaseModel):
     cuenta_id: Optional[int]
     categoria_id: Optional[int]
     monto: condecimal(max_digits=15, decimal_places=2)
-    tipo: Literal['ingreso', 'egreso']
+    tipo: Literal['ingreso', 'egreso', 'transferencia']
     descripcion: Optional[str]
     fecha: date
     creado_en: Optional[datetime]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 # ---------------- Historial de Alertas ----------------
 
 class HistorialAlerta(BaseModel):
@@ -204,5 +224,4 @@ class HistorialAlerta(BaseModel):
     fecha: Optional[datetime]
     leida: Optional[bool] = False
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
@@ -1,40 +1,69 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, date
+import calendar
 from sqlalchemy import text
 
-from DB.conexion import get_db
+from DB.conexion import get_async_db_lectura
 from models.modelsDB import Presupuesto
 from modelsPydantic import Presupuesto as PresupuestoPydantic
+from servicios.cache_usuario import Cache, responder
+from servicios.recurrencia import conteo_por_mes
 
 routerPagosFijos = APIRouter()
 
+_cache_validacion = Cache("pagos_fijos_validacion")
+
+SQL_PAGOS_FIJOS_ACTIVOS = text("""
+    SELECT pf.id, c.nombre AS categoria, pf.monto, pf.categoria_id,
+           pf.tipo_recurrencia, pf.fecha_inicio, pf.proxima_fecha
+    FROM pagos_fijos pf
+    JOIN categorias c ON c.id = pf.categoria_id
+    WHERE pf.usuario_id = :usuario_id AND pf.activo = 1
+""")
+
+SQL_PRESUPUESTOS_MES = text("""
+    SELECT categoria_id, monto, monto_actual
+    FROM presupuestos
+    WHERE usuario_id = :usuario_id AND mes = :mes AND anio = :anio
+""")
+
+SQL_PRESUPUESTOS_HORIZONTE = text("""
+    SELECT categoria_id, anio, mes, monto, monto_actual
+    FROM presupuestos
+    WHERE usuario_id = :usuario_id
+      AND anio * 12 + mes - 1 BETWEEN :inicio AND :fin
+""")
+
 
 @routerPagosFijos.get("/pagos-fijos/validar-presupuesto/{usuario_id}", tags=["Presupuestos"])
-def validar_pagos_fijos_contra_presupuesto(usuario_id: int, db: Session = Depends(get_db)):
+async def validar_pagos_fijos_contra_presupuesto(
+    usuario_id: int,
+    meses: Optional[int] = Query(None, ge=1, le=60, description="Proyecta los pagos de los próximos N meses"),
+    db: AsyncSession = Depends(get_async_db_lectura),
+):
     now = datetime.now()
     mes = now.month
     anio = now.year
 
+    return await responder(_cache_validacion, usuario_id, (anio, mes, meses),
+                           lambda: _validar(db, usuario_id, anio, mes, meses))
+
+
+async def _validar(db, usuario_id, anio, mes, meses):
     # Obtener todos los pagos fijos del usuario
-    pagos = db.execute(text("""
-        SELECT pf.id, c.nombre AS categoria, pf.monto, pf.categoria_id
-        FROM pagos_fijos pf
-        JOIN categorias c ON c.id = pf.categoria_id
-        WHERE pf.usuario_id = :usuario_id AND pf.activo = 1
-    """), {"usuario_id": usuario_id}).fetchall()
+    pagos = (await db.execute(SQL_PAGOS_FIJOS_ACTIVOS, {"usuario_id": usuario_id})).fetchall()
 
     if not pagos:
         return {"mensaje": "No hay pagos fijos programados."}
 
+    if meses is not None:
+        return await _proyectar(db, usuario_id, pagos, anio, mes, meses)
+
     # Obtener presupuestos activos por categoría para el mes
-    presupuestos = db.execute(text("""
-        SELECT categoria_id, monto, monto_actual
-        FROM presupuestos
-        WHERE usuario_id = :usuario_id AND mes = :mes AND anio = :anio
-    """), {"usuario_id": usuario_id, "mes": mes, "anio": anio}).fetchall()
+    presupuestos = (await db.execute(SQL_PRESUPUESTOS_MES, {"usuario_id": usuario_id, "mes": mes, "anio": anio})).fetchall()
 
     presupuestos_dict = {p.categoria_id: p for p in presupuestos}
 
@@ -57,4 +86,58 @@ def validar_pagos_fijos_contra_presupuesto(usuario_id: int, db: Session = Depend
 
     return {
         "validacion_pagos_fijos": respuesta
-    }
\ No newline at end of file
+    }
+
+
+async def _proyectar(db, usuario_id, pagos, anio, mes, meses):
+    """
+    Expande cada pago fijo en sus ocurrencias pendientes (desde proxima_fecha) por mes
+    dentro del horizonte y compara el total por categoría y mes contra lo que queda
+    de cada presupuesto. Dos consultas en total, sin importar N.
+    """
+    inicio_indice = anio * 12 + mes - 1
+    fin_anio, fin_mes = divmod(inicio_indice + meses - 1, 12)
+    desde = date(anio, mes, 1)
+    hasta = date(fin_anio, fin_mes + 1, calendar.monthrange(fin_anio, fin_mes + 1)[1])
+
+    presupuestos = (await db.execute(SQL_PRESUPUESTOS_HORIZONTE, {"usuario_id": usuario_id, "inicio": inicio_indice, "fin": inicio_indice + meses - 1})).fetchall()
+    presupuestos_dict = {(p.categoria_id, p.anio, p.mes): p for p in presupuestos}
+
+    # (categoria_id, anio, mes) -> [categoria, ocurrencias, monto proyectado]
+    proyeccion = {}
+    for p in pagos:
+        conteo = conteo_por_mes(p.tipo_recurrencia, _fecha(p.proxima_fecha), desde, hasta, _fecha(p.fecha_inicio).day)
+        for (a, m), n in conteo.items():
+            acumulado = proyeccion.setdefault((p.categoria_id, a, m), [p.categoria, 0, 0])
+            acumulado[1] += n
+            acumulado[2] += p.monto * n
+
+    respuesta = []
+    for (categoria_id, a, m), (categoria, n, monto) in sorted(proyeccion.items(), key=lambda x: (x[0][1], x[0][2], x[1][0])):
+        presupuesto = presupuestos_dict.get((categoria_id, a, m))
+        item = {
+            "anio": a,
+            "mes": m,
+            "categoria": categoria,
+            "pagos_programados": n,
+            "monto_proyectado": float(monto),
+        }
+        if presupuesto:
+            restante = presupuesto.monto - (presupuesto.monto_actual or 0)
+            item["presupuesto_restante"] = float(restante)
+            item["estado"] = "cubierto" if restante >= monto else "excede presupuesto"
+        else:
+            item["presupuesto_restante"] = None
+            item["estado"] = "sin presupuesto definido"
+        respuesta.append(item)
+
+    return {
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "proyeccion_pagos_fijos": respuesta,
+    }
+
+
+def _fecha(valor):
+    # text() sobre SQLite devuelve las fechas como cadena
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor))
@@ -0,0 +1,50 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from DB.conexion import get_async_db_lectura
+from models.modelsDB import HistorialAlerta
+from modelsPydantic import HistorialAlerta as HistorialAlertaPydantic
+from servicios.serializacion import Serializador
+
+routerAlertas = APIRouter()
+
+LIMITE_MAXIMO = 200
+
+_serializador = Serializador(HistorialAlertaPydantic)
+_COLUMNAS_ALERTA = tuple(_serializador.columnas(HistorialAlerta))
+
+
+def consulta_alertas(usuario_id, todas, cursor, limite):
+    consulta = select(*_COLUMNAS_ALERTA).where(HistorialAlerta.usuario_id == usuario_id)
+    if not todas:
+        consulta = consulta.where(HistorialAlerta.leida.is_(False))
+    if cursor is not None:
+        consulta = consulta.where(HistorialAlerta.id < cursor)
+    return consulta.order_by(HistorialAlerta.id.desc()).limit(limite)
+
+
+# 🔹 Alertas de un usuario, de la más reciente a la más antigua (las genera servicios/alertas.py)
+@routerAlertas.get("/alertas/{usuario_id}", response_model=List[HistorialAlertaPydantic], tags=["Alertas"])
+async def listar_alertas(
+    usuario_id: int,
+    todas: bool = Query(False, description="Incluye también las ya leídas"),
+    cursor: Optional[int] = Query(None, description="Valor de X-Siguiente-Cursor de la página anterior"),
+    limite: int = Query(50, ge=1, le=LIMITE_MAXIMO, description="Tamaño de página"),
+    db: AsyncSession = Depends(get_async_db_lectura),
+):
+    """
+    Por defecto solo las no leídas. Si hay más, la cabecera X-Siguiente-Cursor trae
+    el cursor de la siguiente página (paginación por id, sobre ix_historial_alertas_usuario_leida).
+    """
+    try:
+        filas = (await db.execute(consulta_alertas(usuario_id, todas, cursor, limite + 1))).all()
+        cabeceras = {}
+        if len(filas) > limite:
+            filas = filas[:limite]
+            cabeceras["X-Siguiente-Cursor"] = str(filas[-1].id)
+        return Response(content=_serializador.json(filas), media_type="application/json", headers=cabeceras)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al listar alertas: {str(e)}")
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Literal
 from sqlalchemy import or_
 
-from DB.conexion import get_db
+from DB.conexion import get_db, get_db_lectura, get_async_db_lectura
+from servicios import cache_categorias, sugerencias
 
 # SQLAlchemy
-from models.modelsDB import Categoria as CategoriaDB
+from models.modelsDB import Categoria as CategoriaDB, ResumenMensual
 
 # Pydantic I/O
 from modelsPydantic import (
@@ -23,32 +25,85 @@ routercategorias = APIRouter()
 # 📌 Listar todas las categorías
 # ============================
 @routercategorias.get("/categorias", response_model=List[CategoriaOut], tags=["Categorias"])
-def listar_categorias(
-    db: Session = Depends(get_db),
+async def listar_categorias(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db_lectura),
     tipo: Optional[Literal["ingreso", "egreso"]] = Query(None, description="Filtra por tipo"),
+    usuario_id: Optional[int] = Query(None, description="Solo las del usuario y las de sistema"),
 ):
     """
-    Lista todas las categorías sin importar el usuario ni si es sistema.
-    Se puede filtrar opcionalmente por tipo: 'ingreso' o 'egreso'.
+    Sin usuario_id lista todas las categorías. Con usuario_id, solo las propias de ese
+    usuario más las de sistema y las globales (sin dueño). Se puede filtrar además por
+    tipo: 'ingreso' o 'egreso'.
+    Se sirve desde la caché en memoria. El ETag cambia con cada escritura de categorías
+    y con los filtros; si If-None-Match trae el vigente responde 304 sin cuerpo.
     """
     try:
-        query = db.query(CategoriaDB)
+        version = await cache_categorias.version_actual(db)
+        etag = cache_categorias.etag(version, tipo, usuario_id)
+        if cache_categorias.coincide(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
 
-        if tipo is not None:
-            query = query.filter(CategoriaDB.tipo == tipo)
-
-        return query.order_by(CategoriaDB.id.desc()).all()
+        entrada = await cache_categorias.obtener(db, tipo, usuario_id)
+        return Response(content=entrada.cuerpo, media_type="application/json", headers={"ETag": etag})
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al listar categorías: {str(e)}")
 
 
+# ============================
+# 📌 Árbol de categorías (padre / subcategorías)
+# ============================
+@routercategorias.get("/categorias/arbol", tags=["Categorias"])
+async def arbol_categorias(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db_lectura),
+    tipo: Optional[Literal["ingreso", "egreso"]] = Query(None, description="Filtra por tipo"),
+    usuario_id: Optional[int] = Query(None, description="Solo las del usuario y las de sistema"),
+):
+    try:
+        version = await cache_categorias.version_actual(db)
+        etag = cache_categorias.etag(version, tipo, usuario_id, recurso="arbol")
+        if cache_categorias.coincide(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        entrada = await cache_categorias.obtener(db, tipo, usuario_id)
+        return Response(content=entrada.cuerpo_arbol, media_type="application/json", headers={"ETag": etag})
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al armar árbol de categorías: {str(e)}")
+
+
+
+# ============================
+# 📌 Sugerir categoría para una descripción (antes de /categorias/{id})
+# ============================
+@routercategorias.get("/categorias/sugerir", tags=["Categorias"])
+async def sugerir_categoria(
+    usuario_id: int = Query(..., description="Usuario que captura la transacción"),
+    descripcion: str = Query("", description="Descripción escrita hasta ahora"),
+    tipo: Optional[Literal["ingreso", "egreso"]] = Query(None, description="Solo categorías usadas con este tipo"),
+    limite: int = Query(5, ge=1, le=20),
+    db: AsyncSession = Depends(get_async_db_lectura),
+):
+    """
+    Categorías ordenadas por lo que el usuario eligió antes para descripciones con
+    las mismas palabras, con su `confianza` (0 a 1). Sin palabras conocidas, sus
+    categorías más usadas con confianza 0. Se responde desde un índice en memoria por
+    usuario (servicios/sugerencias); solo se consulta la base si no está cargado.
+    """
+    try:
+        indice = await sugerencias.indice(db, usuario_id)
+        return {"sugerencias": indice.sugerir(descripcion, tipo, limite)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al sugerir categoría: {str(e)}")
+
 
 # ============================
 # 📌 Obtener categoría por ID
 # ============================
 @routercategorias.get("/categorias/{id}", response_model=CategoriaOut, tags=["Categorias"])
-def obtener_categoria(id: int, db: Session = Depends(get_db)):
+def obtener_categoria(id: int, db: Session = Depends(get_db_lectura)):
     try:
         cat = db.query(CategoriaDB).filter(CategoriaDB.id == id).first()
         if not cat:
@@ -74,7 +129,9 @@ def crear_categoria(data: CategoriaCreate, db: Session = Depends(get_db)):
             es_sistema=False,
         )
         db.add(nueva)
+        cache_categorias.incrementar_version(db)
         db.commit()
+        cache_categorias.descartar_local()
         db.refresh(nueva)
         return nueva
     except Exception as e:
@@ -101,7 +158,9 @@ def actualizar_categoria(id: int, data: CategoriaUpdate, db: Session = Depends(g
         if hasattr(data, "usuario_id") and data.usuario_id is not None:
             cat.usuario_id = data.usuario_id
 
+        cache_categorias.incrementar_version(db)
         db.commit()
+        cache_categorias.descartar_local()
         db.refresh(cat)
         return cat
     except HTTPException:
@@ -122,7 +181,11 @@ def eliminar_categoria(id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Categoría no encontrada")
 
         db.delete(cat)
+        # Las transacciones quedan sin categoría (SET NULL): sus agregados ya no aplican
+        db.query(ResumenMensual).filter(ResumenMensual.categoria_id == id).delete(synchronize_session=False)
+        cache_categorias.incrementar_version(db)
         db.commit()
+        cache_categorias.descartar_local()
         return JSONResponse(content={"message": "Categoría eliminada exitosamente"})
     except HTTPException:
         raise
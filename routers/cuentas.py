@@ -0,0 +1,43 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from DB.conexion import get_async_db_lectura
+from models.modelsDB import Cuenta
+from servicios.saldos import saldo_en
+
+routerCuentas = APIRouter()
+
+
+# 🔹 Saldo de una cuenta: el actual o al cierre de una fecha
+@routerCuentas.get("/cuentas/{cuenta_id}/saldo", tags=["Cuentas"])
+async def get_saldo(
+    cuenta_id: int,
+    fecha: Optional[date] = Query(None, description="Saldo al cierre de esta fecha (AAAA-MM-DD)"),
+    db: AsyncSession = Depends(get_async_db_lectura),
+):
+    """
+    Sin fecha devuelve saldo_actual. Con fecha parte del corte más cercano anterior
+    (saldos_corte) y suma solo los movimientos de la cuenta desde ese corte; `corte`
+    indica de cuál partió (null si no había ninguno).
+    """
+    try:
+        cuenta = (await db.execute(
+            select(Cuenta.saldo_actual, Cuenta.moneda).where(Cuenta.id == cuenta_id)
+        )).first()
+        if not cuenta:
+            raise HTTPException(status_code=404, detail="Cuenta no encontrada")
+
+        if fecha is None:
+            return {"cuenta_id": cuenta_id, "fecha": None, "saldo": cuenta.saldo_actual,
+                    "moneda": cuenta.moneda, "corte": None}
+        resultado = await saldo_en(db, cuenta_id, fecha)
+        return {"cuenta_id": cuenta_id, "fecha": fecha, "saldo": resultado["saldo"],
+                "moneda": cuenta.moneda, "corte": resultado["corte"]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener saldo: {str(e)}")
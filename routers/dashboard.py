@@ -0,0 +1,112 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from DB.conexion import get_async_db_lectura
+from servicios.cache_usuario import Cache, responder
+
+routerDashboard = APIRouter()
+
+_cache_dashboard = Cache("dashboard")
+
+# Lo mismo que /grafica, /presupuesto-alerta y /pagos-fijos/validar-presupuesto en
+# una sola sentencia: cada CTE es la consulta de ese endpoint y `seccion` indica a
+# cuál pertenece cada fila. `etiqueta` es el tipo (gráfica) o el estado (pagos fijos).
+SQL_DASHBOARD = text("""
+    WITH grafica AS (
+        SELECT c.id AS categoria_id, c.nombre AS categoria, c.tipo AS tipo, SUM(r.total) AS total
+        FROM resumen_mensual r
+        JOIN categorias c ON r.categoria_id = c.id
+        WHERE r.usuario_id = :usuario_id
+        GROUP BY c.id, c.nombre, c.tipo
+        HAVING SUM(r.num_transacciones) > 0
+    ),
+    presupuestos_mes AS (
+        SELECT p.categoria_id, c.nombre AS categoria, p.monto, p.monto_actual
+        FROM presupuestos p
+        JOIN categorias c ON c.id = p.categoria_id
+        WHERE p.usuario_id = :usuario_id AND p.mes = :mes AND p.anio = :anio
+    ),
+    pagos AS (
+        SELECT pf.id, c.nombre AS categoria, pf.monto, pf.categoria_id
+        FROM pagos_fijos pf
+        JOIN categorias c ON c.id = pf.categoria_id
+        WHERE pf.usuario_id = :usuario_id AND pf.activo = 1
+    )
+    SELECT 'grafica' AS seccion, categoria_id AS orden, categoria, tipo AS etiqueta,
+           total AS monto, NULL AS monto_actual
+    FROM grafica
+    UNION ALL
+    SELECT 'alerta', categoria_id, categoria, NULL, monto, monto_actual
+    FROM presupuestos_mes
+    WHERE monto_actual > monto
+    UNION ALL
+    SELECT 'pago_fijo', pg.id, pg.categoria,
+           CASE
+               WHEN pm.categoria_id IS NULL THEN 'sin presupuesto definido'
+               WHEN pm.monto - pm.monto_actual >= pg.monto THEN 'cubierto'
+               ELSE 'excede presupuesto'
+           END,
+           pg.monto, NULL
+    FROM pagos pg
+    LEFT JOIN presupuestos_mes pm ON pm.categoria_id = pg.categoria_id
+    ORDER BY seccion, orden
+""")
+
+
+def _armar(filas) -> dict:
+    grafica = {"ingresos": [], "egresos": []}
+    alertas = []
+    pagos = []
+    for f in filas:
+        if f.seccion == "grafica":
+            item = {"categoria": f.categoria, "total": float(f.monto)}
+            if f.etiqueta == "ingreso":
+                grafica["ingresos"].append(item)
+            else:
+                grafica["egresos"].append(item)
+        elif f.seccion == "alerta":
+            alertas.append({
+                "categoria": f.categoria,
+                "presupuesto": float(f.monto),
+                "gastado": float(f.monto_actual),
+                "exceso": round(float(f.monto_actual) - float(f.monto), 2)
+            })
+        else:
+            pagos.append({
+                "categoria": f.categoria,
+                "pago_fijo_monto": float(f.monto),
+                "estado": f.etiqueta
+            })
+
+    return {
+        "grafica": grafica,
+        "presupuesto_alerta": {
+            "alertas_exceso": alertas,
+            "mensaje": "Hay exceso en algunas categorías" if alertas else "Todo está dentro del presupuesto"
+        },
+        "pagos_fijos": {"validacion_pagos_fijos": pagos} if pagos else {"mensaje": "No hay pagos fijos programados."},
+    }
+
+
+# 🔹 Resumen de la pantalla de inicio en una sola consulta
+@routerDashboard.get("/dashboard/{usuario_id}", tags=["Grafica"])
+async def obtener_dashboard(usuario_id: int, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Totales por categoría, excesos de presupuesto del mes y cobertura de pagos fijos:
+    las respuestas de /grafica, /presupuesto-alerta y /pagos-fijos/validar-presupuesto
+    bajo `grafica`, `presupuesto_alerta` y `pagos_fijos`. Se guarda por usuario hasta
+    su siguiente escritura (ver servicios/cache_usuario.py).
+    """
+    now = datetime.now()
+
+    async def calcular():
+        try:
+            filas = (await db.execute(SQL_DASHBOARD, {"usuario_id": usuario_id, "mes": now.month, "anio": now.year})).all()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al armar el dashboard: {str(e)}")
+        return _armar(filas)
+
+    return await responder(_cache_dashboard, usuario_id, (now.year, now.month), calcular)
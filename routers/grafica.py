@@ -1,28 +1,174 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from datetime import date, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from DB.conexion import get_db
+from DB.conexion import get_async_db_lectura
+from DB.dialecto import como_fecha, nombre_dialecto, siguiente_cubeta, truncar_fecha
+from servicios.cache_usuario import Cache, responder
 
 routerGrafica = APIRouter()
 
-@routerGrafica.get("/grafica/{usuario_id}", tags=["Grafica"]) 
-def obtener_grafica_por_categoria(usuario_id: int, db: Session = Depends(get_db)):
-    resultados = db.execute(text("""
-        SELECT c.nombre AS nombre, c.tipo AS tipo, SUM(t.monto) AS total
+_cache_grafica = Cache("grafica")
+_cache_serie = Cache("grafica_serie")
+
+# Lee el agregado mensual (servicios/resumen_mensual.py) en lugar del ledger completo
+SQL_GRAFICA = text("""
+    SELECT c.nombre AS nombre, c.tipo AS tipo, SUM(r.total) AS total
+    FROM resumen_mensual r
+    JOIN categorias c ON r.categoria_id = c.id
+    WHERE r.usuario_id = :usuario_id
+    GROUP BY c.id, c.nombre, c.tipo
+    HAVING SUM(r.num_transacciones) > 0
+""")
+
+# cte_max_recursion_depth de MySQL es 1000 por defecto
+MAXIMO_CUBETAS = 1000
+
+# `cubetas` genera todas las cubetas del rango (serie densa); `movimientos` agrega
+# en la base por cubeta y categoría; el LEFT JOIN rellena con ceros y la ventana
+# lleva el acumulado. Sin actividad queda una fila por cubeta con categoría NULL.
+_PLANTILLA_SERIE = """
+    WITH RECURSIVE cubetas (inicio) AS (
+        SELECT {primera}
+        UNION ALL
+        SELECT {siguiente} FROM cubetas WHERE {siguiente} <= :hasta
+    ),
+    movimientos AS (
+        SELECT {truncada} AS cubeta, t.categoria_id, SUM(t.monto) AS total
         FROM transacciones t
-        JOIN categorias c ON t.categoria_id = c.id
-        WHERE t.usuario_id = :usuario_id
-        GROUP BY c.id, c.nombre, c.tipo
-    """), {"usuario_id": usuario_id})
+        WHERE t.usuario_id = :usuario_id AND t.fecha BETWEEN :desde AND :hasta
+        GROUP BY {truncada}, t.categoria_id
+    ),
+    activas AS (
+        SELECT DISTINCT m.categoria_id, c.nombre, c.tipo
+        FROM movimientos m
+        JOIN categorias c ON c.id = m.categoria_id
+    )
+    SELECT b.inicio, a.categoria_id, a.nombre, a.tipo,
+           COALESCE(m.total, 0) AS total,
+           SUM(COALESCE(m.total, 0)) OVER (
+               PARTITION BY a.categoria_id ORDER BY b.inicio ROWS UNBOUNDED PRECEDING
+           ) AS acumulado
+    FROM cubetas b
+    LEFT JOIN activas a ON 1 = 1
+    LEFT JOIN movimientos m ON m.cubeta = b.inicio AND m.categoria_id = a.categoria_id
+    ORDER BY a.categoria_id, b.inicio
+"""
+
+_SQL_SERIE = {}
+_SIN_FILAS = object()
+
+
+def sql_serie(dialecto: str, cubeta: str):
+    clave = (dialecto, cubeta)
+    if clave not in _SQL_SERIE:
+        _SQL_SERIE[clave] = text(_PLANTILLA_SERIE.format(
+            primera=como_fecha(dialecto, ":primera"),
+            siguiente=siguiente_cubeta(dialecto, "inicio", cubeta),
+            truncada=truncar_fecha(dialecto, "t.fecha", cubeta),
+        ))
+    return _SQL_SERIE[clave]
+
+
+def inicio_cubeta(fecha: date, cubeta: str) -> date:
+    if cubeta == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if cubeta == "mes":
+        return fecha.replace(day=1)
+    if cubeta == "anio":
+        return date(fecha.year, 1, 1)
+    return fecha
+
+
+def contar_cubetas(desde: date, hasta: date, cubeta: str) -> int:
+    if cubeta == "semana":
+        return (inicio_cubeta(hasta, cubeta) - inicio_cubeta(desde, cubeta)).days // 7 + 1
+    if cubeta == "mes":
+        return (hasta.year * 12 + hasta.month) - (desde.year * 12 + desde.month) + 1
+    if cubeta == "anio":
+        return hasta.year - desde.year + 1
+    return (hasta - desde).days + 1
+
+
+@routerGrafica.get("/grafica/{usuario_id}", tags=["Grafica"]) 
+async def obtener_grafica_por_categoria(usuario_id: int, db: AsyncSession = Depends(get_async_db_lectura)):
+    async def calcular():
+        resultados = await db.execute(SQL_GRAFICA, {"usuario_id": usuario_id})
+
+        data = {"ingresos": [], "egresos": []}
+
+        for row in resultados:
+            item = {"categoria": row.nombre, "total": float(row.total)}
+            if row.tipo == "ingreso":
+                data["ingresos"].append(item)
+            else:
+                data["egresos"].append(item)
+
+        return data
+
+    return await responder(_cache_grafica, usuario_id, (), calcular)
+
+
+# 🔹 Serie por cubetas de tiempo (día, semana, mes, año) por categoría
+@routerGrafica.get("/grafica/{usuario_id}/serie", tags=["Grafica"])
+async def obtener_serie_por_categoria(
+    usuario_id: int,
+    desde: Optional[date] = Query(None, description="Fecha inicial (inclusive); por defecto, 11 meses antes de `hasta`"),
+    hasta: Optional[date] = Query(None, description="Fecha final (inclusive); por defecto, hoy"),
+    cubeta: Literal["dia", "semana", "mes", "anio"] = Query("mes", description="Tamaño de cada periodo"),
+    db: AsyncSession = Depends(get_async_db_lectura),
+):
+    """
+    Totales por categoría en cada periodo del rango, con ceros donde no hubo
+    movimientos, y su acumulado. `periodos` trae la fecha de inicio de cada cubeta
+    (las semanas empiezan en lunes); `totales[i]` y `acumulado[i]` corresponden a
+    `periodos[i]`. La primera y la última cubeta solo cuentan fechas dentro del rango.
+    """
+    hasta = hasta or date.today()
+    if desde is None:
+        anio, mes = divmod(hasta.year * 12 + hasta.month - 1 - 11, 12)
+        desde = date(anio, mes + 1, 1)
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="`desde` debe ser anterior o igual a `hasta`")
+    if contar_cubetas(desde, hasta, cubeta) > MAXIMO_CUBETAS:
+        raise HTTPException(status_code=400, detail=f"El rango genera más de {MAXIMO_CUBETAS} periodos; usa una cubeta mayor")
+
+    async def calcular():
+        try:
+            filas = (await db.execute(sql_serie(nombre_dialecto(db), cubeta), {
+                "usuario_id": usuario_id,
+                "desde": desde.isoformat(),
+                "hasta": hasta.isoformat(),
+                "primera": inicio_cubeta(desde, cubeta).isoformat(),
+            })).all()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al calcular la serie: {str(e)}")
+
+        data = {"cubeta": cubeta, "desde": desde.isoformat(), "hasta": hasta.isoformat(),
+                "periodos": [], "ingresos": [], "egresos": []}
 
-    data = {"ingresos": [], "egresos": []}
+        # Filas ordenadas por categoría y periodo; todas las categorías comparten los periodos
+        series = {}
+        primera = _SIN_FILAS
+        for row in filas:
+            if primera is _SIN_FILAS:
+                primera = row.categoria_id
+            if row.categoria_id == primera:
+                data["periodos"].append(str(row.inicio))
+            if row.categoria_id is None:
+                continue
+            serie = series.get(row.categoria_id)
+            if serie is None:
+                serie = series[row.categoria_id] = {
+                    "categoria_id": row.categoria_id, "categoria": row.nombre, "totales": [], "acumulado": []
+                }
+                data["ingresos" if row.tipo == "ingreso" else "egresos"].append(serie)
+            serie["totales"].append(float(row.total))
+            serie["acumulado"].append(float(row.acumulado))
 
-    for row in resultados:
-        item = {"categoria": row.nombre, "total": float(row.total)}
-        if row.tipo == "ingreso":
-            data["ingresos"].append(item)
-        else:
-            data["egresos"].append(item)
+        return data
 
-    return data
+    return await responder(_cache_serie, usuario_id, (desde, hasta, cubeta), calcular)
@@ -0,0 +1,12 @@
+# 📂 routers/metricas.py
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from servicios import metricas
+
+routerMetricas = APIRouter()
+
+# 🔹 Métricas del proceso en formato de texto de Prometheus
+@routerMetricas.get("/metrics", tags=["Metricas"], include_in_schema=False)
+def exponer_metricas():
+    return Response(content=metricas.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,23 +1,50 @@
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime
-from sqlalchemy import text
-from DB.conexion import get_db
+from sqlalchemy import text, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from DB.conexion import get_db, get_db_lectura, get_async_db_lectura
 from models.modelsDB import Presupuesto
-from modelsPydantic import Presupuesto as PresupuestoPydantic
+from modelsPydantic import Presupuesto as PresupuestoPydantic, PresupuestoClonar, PresupuestoLote
+from servicios import presupuestos as gasto_presupuestos
+from servicios.cache_usuario import Cache, responder
+from servicios.serializacion import Serializador
 
 routerPresupuestos = APIRouter()
 
+LOTE_MAXIMO = 1000
+
+_serializador = Serializador(PresupuestoPydantic)
+_cache_alertas = Cache("presupuesto_alerta")
+
+SQL_ALERTA_PRESUPUESTO = text("""
+    SELECT c.nombre AS categoria, p.monto, p.monto_actual
+    FROM presupuestos p
+    JOIN categorias c ON c.id = p.categoria_id
+    WHERE p.usuario_id = :usuario_id AND p.mes = :mes AND p.anio = :anio
+""")
+
+_YA_EXISTE = "Ya existe un presupuesto para esa categoría, mes y año"
+
+
+def _duplicado(e: IntegrityError) -> bool:
+    # uq_presupuestos_usuario_periodo (MySQL: "Duplicate entry", SQLite/PostgreSQL: "UNIQUE"/"unique")
+    mensaje = str(e.orig).lower()
+    return "duplicate" in mensaje or "unique" in mensaje
+
+
 # Obtener todos los presupuestos
 @routerPresupuestos.get("/presupuestos", response_model=List[PresupuestoPydantic], tags=["Presupuestos"]) 
-def get_presupuestos(db: Session = Depends(get_db)):
-    return db.query(Presupuesto).all()
+async def get_presupuestos(db: AsyncSession = Depends(get_async_db_lectura)):
+    filas = (await db.execute(select(*_serializador.columnas(Presupuesto)))).all()
+    return Response(content=_serializador.json(filas), media_type="application/json")
 
 # Obtener por ID
 @routerPresupuestos.get("/presupuestos/{id}", response_model=PresupuestoPydantic, tags=["Presupuestos"]) 
-def get_presupuesto(id: int, db: Session = Depends(get_db)):
+def get_presupuesto(id: int, db: Session = Depends(get_db_lectura)):
     presupuesto = db.query(Presupuesto).filter(Presupuesto.id == id).first()
     if not presupuesto:
         raise HTTPException(status_code=404, detail="Presupuesto no encontrado")
@@ -38,15 +65,76 @@ def crear_presupuesto(data: PresupuestoPydantic, db: Session = Depends(get_db)):
             actualizado_en=datetime.now()
         )
         db.add(nuevo)
+        db.flush()
+        # Lo ya gastado ese mes en la categoría sale del ledger, no del cliente
+        gasto_presupuestos.recalcular(db, usuario_id=nuevo.usuario_id, categoria_id=nuevo.categoria_id,
+                                      mes=nuevo.mes, anio=nuevo.anio)
         db.commit()
         db.refresh(nuevo)
         return nuevo
+    except IntegrityError as e:
+        db.rollback()
+        if _duplicado(e):
+            raise HTTPException(status_code=409, detail=_YA_EXISTE)
+        raise HTTPException(status_code=500, detail=f"Error al crear presupuesto: {str(e)}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error al crear presupuesto: {str(e)}")
     finally:
         db.close()
 
+# Crear o actualizar varios en una sola sentencia
+@routerPresupuestos.post("/presupuestos/lote", response_model=List[PresupuestoPydantic], tags=["Presupuestos"])
+def guardar_presupuestos(data: List[PresupuestoLote], db: Session = Depends(get_db)):
+    """
+    Upsert por (usuario_id, categoria_id, mes, anio): los existentes cambian su monto
+    y los nuevos se crean con lo ya gastado en el mes. Devuelve los presupuestos escritos.
+    """
+    if len(data) > LOTE_MAXIMO:
+        raise HTTPException(status_code=400, detail=f"Máximo {LOTE_MAXIMO} presupuestos por petición")
+    try:
+        claves = gasto_presupuestos.guardar_lote(db, [p.model_dump() for p in data])
+        filas = []
+        if claves:
+            columnas = [Presupuesto.usuario_id, Presupuesto.anio, Presupuesto.mes, Presupuesto.categoria_id]
+            filas = db.execute(
+                select(*_serializador.columnas(Presupuesto)).where(tuple_(*columnas).in_(claves))
+            ).all()
+        db.commit()
+        return Response(content=_serializador.json(filas), media_type="application/json")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al guardar presupuestos: {str(e)}")
+    finally:
+        db.close()
+
+# Clonar los presupuestos de un mes a otro (de un usuario o de todos)
+@routerPresupuestos.post("/presupuestos/clonar", tags=["Presupuestos"])
+def clonar_presupuestos(data: PresupuestoClonar, db: Session = Depends(get_db)):
+    """
+    Un solo INSERT ... SELECT. Sin usuario_id clona los de todos los usuarios (cierre
+    de mes); sin destino, al mes siguiente. Los que ya existen en el destino se
+    conservan salvo con `sobrescribir`.
+    """
+    if (data.mes_destino is None) != (data.anio_destino is None):
+        raise HTTPException(status_code=400, detail="Indica mes_destino y anio_destino juntos")
+    if data.mes_destino is None:
+        mes_destino, anio_destino = gasto_presupuestos.mes_siguiente(data.mes, data.anio)
+    else:
+        mes_destino, anio_destino = data.mes_destino, data.anio_destino
+    if (mes_destino, anio_destino) == (data.mes, data.anio):
+        raise HTTPException(status_code=400, detail="El mes de destino debe ser distinto del de origen")
+    try:
+        n = gasto_presupuestos.clonar(db, data.mes, data.anio, mes_destino, anio_destino,
+                                      usuario_id=data.usuario_id, sobrescribir=data.sobrescribir)
+        db.commit()
+        return {"presupuestos": n, "mes": mes_destino, "anio": anio_destino}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al clonar presupuestos: {str(e)}")
+    finally:
+        db.close()
+
 # Actualizar
 @routerPresupuestos.put("/presupuestos/{id}", response_model=PresupuestoPydantic, tags=["Presupuestos"]) 
 def actualizar_presupuesto(id: int, data: PresupuestoPydantic, db: Session = Depends(get_db)):
@@ -60,12 +148,22 @@ def actualizar_presupuesto(id: int, data: PresupuestoPydantic, db: Session = Dep
         presupuesto.mes = data.mes
         presupuesto.anio = data.anio
         presupuesto.monto = data.monto
-        presupuesto.monto_actual = data.monto_actual or 0
         presupuesto.actualizado_en = datetime.now()
-
+        db.flush()
+        # monto_actual lo mantiene el ledger: se ignora el del cliente y se recalcula
+        # (la categoría o el periodo pueden haber cambiado)
+        gasto_presupuestos.recalcular(db, usuario_id=presupuesto.usuario_id, categoria_id=presupuesto.categoria_id,
+                                      mes=presupuesto.mes, anio=presupuesto.anio)
         db.commit()
         db.refresh(presupuesto)
         return presupuesto
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        db.rollback()
+        if _duplicado(e):
+            raise HTTPException(status_code=409, detail=_YA_EXISTE)
+        raise HTTPException(status_code=500, detail=f"Error al actualizar presupuesto: {str(e)}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error al actualizar presupuesto: {str(e)}")
@@ -91,19 +189,17 @@ def eliminar_presupuesto(id: int, db: Session = Depends(get_db)):
 
 # Alertas de exceso (mes/año actual)
 @routerPresupuestos.get("/presupuesto-alerta/{usuario_id}", tags=["Presupuestos"]) 
-def verificar_exceso_presupuesto(usuario_id: int, db: Session = Depends(get_db)):
+async def verificar_exceso_presupuesto(usuario_id: int, db: AsyncSession = Depends(get_async_db_lectura)):
     now = datetime.now()
     mes = now.month
     anio = now.year
 
-    sql = text("""
-        SELECT c.nombre AS categoria, p.monto, p.monto_actual
-        FROM presupuestos p
-        JOIN categorias c ON c.id = p.categoria_id
-        WHERE p.usuario_id = :usuario_id AND p.mes = :mes AND p.anio = :anio
-    """)
+    return await responder(_cache_alertas, usuario_id, (anio, mes),
+                           lambda: _alertas(db, usuario_id, anio, mes))
+
 
-    resultados = db.execute(sql, {"usuario_id": usuario_id, "mes": mes, "anio": anio}).fetchall()
+async def _alertas(db, usuario_id, anio, mes):
+    resultados = (await db.execute(SQL_ALERTA_PRESUPUESTO, {"usuario_id": usuario_id, "mes": mes, "anio": anio})).fetchall()
 
     alertas = []
     for r in resultados:
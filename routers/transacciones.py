@@ -1,29 +1,362 @@
 # 📂 routers/transacciones.py
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, and_, or_, func, text, type_coerce, Float, Integer
+from sqlalchemy.exc import DBAPIError
+from pydantic import ValidationError
+from typing import List, Optional, Literal
 from datetime import datetime, date
+import base64
+import codecs
+import csv
+import json
+import re
 
-from DB.conexion import get_db
+from DB.conexion import get_db, get_async_db, get_db_lectura, get_async_db_lectura, AsyncSession as AsyncSessionLocal
 from models.modelsDB import Transaccion
+from servicios.movimientos import movimiento, aplicar_movimientos
 from modelsPydantic import TransaccionCreate, TransaccionUpdate, TransaccionOut
+from servicios.serializacion import Serializador, codificar
 
 routerTransacciones = APIRouter()
 
-# 🔹 Obtener todas las transacciones
+LIMITE_MAXIMO = 1000
+FILAS_POR_LOTE = 1000
+LOTE_IMPORTACION_MAXIMO = 10000
+MAXIMO_TERMINOS = 8
+
+# Lectura sin ORM: tuplas de Core en el orden de TransaccionOut, serializadas directo a JSON
+_serializador = Serializador(TransaccionOut)
+_COLUMNAS_TRANSACCION = tuple(_serializador.columnas(Transaccion))
+
+
+# ---------------- Cursor keyset (fecha, id) ----------------
+
+def _codificar_cursor(fecha: date, id: int) -> str:
+    crudo = json.dumps([fecha.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def _decodificar_cursor(cursor: str):
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        fecha, id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return date.fromisoformat(fecha), int(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _filtrar_transacciones(consulta, usuario_id, desde, hasta, tipo, categoria_id, cursor):
+    if usuario_id is not None:
+        consulta = consulta.where(Transaccion.usuario_id == usuario_id)
+    if desde is not None:
+        consulta = consulta.where(Transaccion.fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Transaccion.fecha <= hasta)
+    if tipo is not None:
+        consulta = consulta.where(Transaccion.tipo == tipo)
+    if categoria_id is not None:
+        consulta = consulta.where(Transaccion.categoria_id == categoria_id)
+    if cursor is not None:
+        fecha, id = _decodificar_cursor(cursor)
+        # Continuar justo después de la última fila entregada
+        consulta = consulta.where(or_(
+            Transaccion.fecha < fecha,
+            and_(Transaccion.fecha == fecha, Transaccion.id < id),
+        ))
+    return consulta.order_by(Transaccion.fecha.desc(), Transaccion.id.desc())
+
+
+# ---------------- Búsqueda por descripción ----------------
+
+# SQLite: tabla FTS5 mantenida por triggers (ver models/modelsDB.py)
+_SQL_COINCIDENCIAS_FTS = text(
+    "SELECT rowid AS id, round(-bm25(transacciones_fts, 0.0, 1.0), 6) AS puntaje "
+    "FROM transacciones_fts WHERE transacciones_fts MATCH :expresion"
+).columns(id=Integer, puntaje=Float)
+
+
+def _terminos(q: str) -> list:
+    """Palabras de la búsqueda, sin operadores: cada una se busca como prefijo."""
+    return re.findall(r"\w+", q.lower())[:MAXIMO_TERMINOS]
+
+
+def _codificar_cursor_busqueda(puntaje: float, id: int) -> str:
+    crudo = json.dumps([puntaje, id]).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def _decodificar_cursor_busqueda(cursor: str):
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        puntaje, id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return float(puntaje), int(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def consulta_busqueda(dialecto: str, usuario_id: int, terminos: list, cursor=None):
+    """
+    Transacciones del usuario cuya descripción contiene todas las palabras (como
+    prefijo), de mayor a menor relevancia y luego por id descendente: MATCH ... AGAINST
+    en MySQL, bm25 de FTS5 en SQLite.
+    """
+    if dialecto == "sqlite":
+        prefijos = " AND ".join(f'"{t}"*' for t in terminos)
+        expresion = f'usuario : "u{int(usuario_id)}" AND texto : ({prefijos})'
+        coincidencias = _SQL_COINCIDENCIAS_FTS.bindparams(expresion=expresion).subquery("coincidencias")
+        puntaje = coincidencias.c.puntaje
+        consulta = select(*_COLUMNAS_TRANSACCION, puntaje).join(coincidencias, coincidencias.c.id == Transaccion.id)
+    else:
+        coincide = Transaccion.descripcion.match(" ".join(f"+{t}*" for t in terminos))
+        puntaje = func.round(type_coerce(coincide, Float), 6)
+        consulta = select(*_COLUMNAS_TRANSACCION, puntaje.label("puntaje")).where(coincide)
+
+    consulta = consulta.where(Transaccion.usuario_id == usuario_id)
+    if cursor is not None:
+        ultimo_puntaje, ultimo_id = _decodificar_cursor_busqueda(cursor)
+        consulta = consulta.where(or_(
+            puntaje < ultimo_puntaje,
+            and_(puntaje == ultimo_puntaje, Transaccion.id < ultimo_id),
+        ))
+    return consulta.order_by(puntaje.desc(), Transaccion.id.desc())
+
+
+async def _transmitir_ndjson(consulta, motor):
+    # Sesión propia (en el engine que eligió la dependencia): la de Depends se cierra antes de enviar el cuerpo
+    async with AsyncSessionLocal(bind=motor) as db:
+        filas = await db.stream(consulta.execution_options(yield_per=FILAS_POR_LOTE))
+        async for bloque in filas.partitions(FILAS_POR_LOTE):
+            yield b"".join(codificar(d) + b"\n" for d in _serializador.dicts(bloque))
+
+# ---------------- Importación masiva ----------------
+
+async def _lineas(request: Request):
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    pendiente = ""
+    async for trozo in request.stream():
+        pendiente += decodificador.decode(trozo)
+        *lineas, pendiente = pendiente.split("\n")
+        for linea in lineas:
+            yield linea.rstrip("\r")
+    pendiente += decodificador.decode(b"", final=True)
+    if pendiente:
+        yield pendiente.rstrip("\r")
+
+
+# Los generadores de registros no lanzan errores de formato: si lo hicieran quedarían
+# cerrados y se perderían las filas siguientes. Entregan el error como un registro
+# más (una instancia de ValueError) y el handler lo anota en su fila.
+
+async def _registros_csv(lineas):
+    encabezado = None
+    acumulado = None
+    async for linea in lineas:
+        acumulado = linea if acumulado is None else f"{acumulado}\n{linea}"
+        # Comillas abiertas: el campo continúa en la siguiente línea
+        if acumulado.count('"') % 2:
+            continue
+        try:
+            valores = next(csv.reader([acumulado]), [])
+        except csv.Error as e:
+            if encabezado is None:
+                raise ValueError(f"Encabezado CSV inválido: {e}")
+            yield ValueError(f"CSV inválido: {e}")
+            continue
+        finally:
+            acumulado = None
+        if encabezado is None:
+            encabezado = [v.strip() for v in valores]
+        elif any(v.strip() for v in valores):
+            yield dict(zip(encabezado, (v if v.strip() != "" else None for v in valores)))
+
+
+async def _registros_ndjson(lineas):
+    async for linea in lineas:
+        if linea.strip():
+            try:
+                yield json.loads(linea)
+            except ValueError as e:
+                yield ValueError(f"JSON inválido: {e}")
+
+
+def _insertar_lote(db, filas):
+    """
+    Inserta el lote con un solo executemany (INSERT multi-fila en PyMySQL).
+    Si la base lo rechaza, reintenta fila por fila para aislar las que fallan.
+    """
+    try:
+        with db.begin_nested():
+            db.execute(insert(Transaccion), [valores for _, valores in filas])
+            aplicar_movimientos(db, [{**valores, "signo": 1} for _, valores in filas])
+        return len(filas), []
+    except DBAPIError:
+        pass
+
+    insertadas, errores = 0, []
+    for numero, valores in filas:
+        try:
+            with db.begin_nested():
+                db.execute(insert(Transaccion), [valores])
+                aplicar_movimientos(db, [{**valores, "signo": 1}])
+            insertadas += 1
+        except DBAPIError as e:
+            errores.append({"fila": numero, "errores": [{"campo": None, "mensaje": str(e.orig)}]})
+    return insertadas, errores
+
+
+# 🔹 Obtener transacciones (filtradas, paginadas por cursor o en streaming NDJSON)
 @routerTransacciones.get("/transacciones", response_model=List[TransaccionOut], tags=["Transacciones"])
-def get_transacciones(db: Session = Depends(get_db)):
+async def get_transacciones(
+    usuario_id: Optional[int] = Query(None, description="Filtra por usuario"),
+    desde: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    tipo: Optional[Literal["ingreso", "egreso", "transferencia"]] = Query(None, description="Filtra por tipo"),
+    categoria_id: Optional[int] = Query(None, description="Filtra por categoría"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en X-Siguiente-Cursor"),
+    limite: int = Query(100, ge=1, le=LIMITE_MAXIMO, description="Tamaño de página"),
+    formato: Literal["json", "ndjson"] = Query("json", description="'ndjson' transmite todas las filas"),
+    db: AsyncSession = Depends(get_async_db_lectura),
+):
+    """
+    Lista transacciones ordenadas por (fecha, id) descendente.
+    En formato 'json' devuelve una página y, si hay más filas, el cursor de la
+    siguiente en la cabecera X-Siguiente-Cursor. En formato 'ndjson' transmite
+    todas las filas desde un cursor del servidor con memoria constante.
+    """
     try:
-        return db.query(Transaccion).order_by(Transaccion.id.desc()).all()
+        consulta = _filtrar_transacciones(
+            select(*_COLUMNAS_TRANSACCION),
+            usuario_id, desde, hasta, tipo, categoria_id, cursor,
+        )
+
+        if formato == "ndjson":
+            return StreamingResponse(_transmitir_ndjson(consulta, db.bind), media_type="application/x-ndjson")
+
+        filas = (await db.execute(consulta.limit(limite + 1))).all()
+        cabeceras = {}
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            cabeceras["X-Siguiente-Cursor"] = _codificar_cursor(ultima.fecha, ultima.id)
+        return Response(content=_serializador.json(filas), media_type="application/json", headers=cabeceras)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al listar transacciones: {str(e)}")
-    finally:
-        db.close()
+
+# 🔹 Importar transacciones en bloque (CSV o NDJSON en streaming)
+@routerTransacciones.post("/transacciones/bulk", tags=["Transacciones"])
+async def importar_transacciones(
+    request: Request,
+    usuario_id: Optional[int] = Query(None, description="Usuario para las filas que no lo indiquen"),
+    lote: int = Query(FILAS_POR_LOTE, ge=1, le=LOTE_IMPORTACION_MAXIMO, description="Filas por INSERT"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Recibe un CSV con encabezado (Content-Type: text/csv) o una transacción JSON
+    por línea (application/x-ndjson). Cada fila se valida con TransaccionCreate; las
+    válidas se insertan por lotes y se confirman lote a lote. Las filas inválidas o
+    rechazadas por la base se devuelven en `errores` sin detener la importación.
+    """
+    tipo_contenido = request.headers.get("content-type", "").split(";")[0].strip()
+    if tipo_contenido in ("text/csv", "application/csv"):
+        registros = _registros_csv(_lineas(request))
+    elif tipo_contenido in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        registros = _registros_ndjson(_lineas(request))
+    else:
+        raise HTTPException(status_code=415, detail="Usa text/csv o application/x-ndjson")
+
+    insertadas, errores, pendientes = 0, [], []
+    hoy, ahora = date.today(), datetime.now()
+
+    async def confirmar():
+        nonlocal insertadas
+        n, errores_lote = await db.run_sync(_insertar_lote, pendientes)
+        await db.commit()
+        insertadas += n
+        errores.extend(errores_lote)
+        pendientes.clear()
+
+    numero = 0
+    try:
+        while True:
+            numero += 1
+            try:
+                registro = await registros.__anext__()
+                if isinstance(registro, ValueError):
+                    raise registro
+                if not isinstance(registro, dict):
+                    raise ValueError("Se esperaba un objeto JSON")
+                data = TransaccionCreate.model_validate(registro)
+            except StopAsyncIteration:
+                break
+            except ValidationError as e:
+                errores.append({"fila": numero, "errores": [
+                    {"campo": ".".join(str(p) for p in err["loc"]), "mensaje": err["msg"]} for err in e.errors()
+                ]})
+                continue
+            except ValueError as e:
+                errores.append({"fila": numero, "errores": [{"campo": None, "mensaje": str(e)}]})
+                continue
+
+            pendientes.append((numero, {
+                "usuario_id": data.usuario_id if data.usuario_id is not None else (usuario_id or 1),
+                "cuenta_id": data.cuenta_id,
+                "categoria_id": data.categoria_id,
+                "monto": data.monto,
+                "tipo": data.tipo,
+                "descripcion": data.descripcion,
+                "fecha": data.fecha or hoy,
+                "creado_en": ahora,
+            }))
+            if len(pendientes) >= lote:
+                await confirmar()
+
+        if pendientes:
+            await confirmar()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al importar transacciones: {str(e)}")
+
+    return {"insertadas": insertadas, "rechazadas": len(errores), "errores": errores}
+
+# 🔹 Buscar transacciones de un usuario por descripción (antes de /transacciones/{id})
+@routerTransacciones.get("/transacciones/buscar", response_model=List[TransaccionOut], tags=["Transacciones"])
+async def buscar_transacciones(
+    usuario_id: int = Query(..., description="Usuario dueño de las transacciones"),
+    q: str = Query(..., min_length=1, description="Palabras a buscar; cada una vale como prefijo"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en X-Siguiente-Cursor"),
+    limite: int = Query(50, ge=1, le=LIMITE_MAXIMO, description="Tamaño de página"),
+    db: AsyncSession = Depends(get_async_db_lectura),
+):
+    """
+    Ordenadas por relevancia. Usa el índice de texto (FULLTEXT en MySQL, FTS5 en
+    SQLite), que la base mantiene al crear, editar o borrar transacciones. Si hay más
+    resultados, X-Siguiente-Cursor trae el cursor (relevancia, id) de la siguiente página.
+    """
+    terminos = _terminos(q)
+    if not terminos:
+        raise HTTPException(status_code=400, detail="La búsqueda debe tener al menos una palabra")
+    try:
+        consulta = consulta_busqueda(db.bind.dialect.name, usuario_id, terminos, cursor)
+        filas = (await db.execute(consulta.limit(limite + 1))).all()
+        cabeceras = {}
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            cabeceras["X-Siguiente-Cursor"] = _codificar_cursor_busqueda(ultima.puntaje, ultima.id)
+        return Response(content=_serializador.json(filas), media_type="application/json", headers=cabeceras)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al buscar transacciones: {str(e)}")
 
 # 🔹 Obtener transacción por ID
 @routerTransacciones.get("/transacciones/{id}", response_model=TransaccionOut, tags=["Transacciones"])
-def get_transaccion(id: int, db: Session = Depends(get_db)):
+def get_transaccion(id: int, db: Session = Depends(get_db_lectura)):
     try:
         transaccion = db.query(Transaccion).filter(Transaccion.id == id).first()
         if not transaccion:
@@ -53,6 +386,7 @@ def crear_transaccion(data: TransaccionCreate, db: Session = Depends(get_db)):
             creado_en=datetime.now()
         )
         db.add(nueva)
+        aplicar_movimientos(db, [movimiento(nueva, 1)])
         db.commit()
         db.refresh(nueva)
         return nueva
@@ -70,6 +404,8 @@ def actualizar_transaccion(id: int, data: TransaccionUpdate, db: Session = Depen
         if not transaccion:
             raise HTTPException(status_code=404, detail="Transacción no encontrada")
 
+        anterior = movimiento(transaccion, -1)
+
         if data.usuario_id is not None:
             transaccion.usuario_id = data.usuario_id
         if data.cuenta_id is not None:
@@ -85,6 +421,7 @@ def actualizar_transaccion(id: int, data: TransaccionUpdate, db: Session = Depen
         if data.fecha is not None:
             transaccion.fecha = data.fecha
 
+        aplicar_movimientos(db, [anterior, movimiento(transaccion, 1)])
         db.commit()
         db.refresh(transaccion)
         return transaccion
@@ -102,6 +439,7 @@ def eliminar_transaccion(id: int, db: Session = Depends(get_db)):
         if not transaccion:
             raise HTTPException(status_code=404, detail="Transacción no encontrada")
         db.delete(transaccion)
+        aplicar_movimientos(db, [movimiento(transaccion, -1)])
         db.commit()
         return JSONResponse(content={"message": "Transacción eliminada exitosamente"})
     except Exception as e:
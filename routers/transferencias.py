@@ -0,0 +1,86 @@
+from datetime import date, datetime
+from typing import List, Union
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from DB.conexion import get_db, marcar_escritura
+from DB.dialecto import insertar_con_ids
+from models.modelsDB import Cuenta, Transaccion, Transferencia
+from modelsPydantic import Transferencia as TransferenciaPydantic, TransferenciaCreate
+from servicios.movimientos import aplicar_movimientos
+
+routerTransferencias = APIRouter()
+
+LOTE_MAXIMO = 1000
+
+
+def _validar_cuentas(db, datos, usuarios):
+    ids = {d.cuenta_origen_id for d in datos} | {d.cuenta_destino_id for d in datos}
+    duenos = dict(db.execute(select(Cuenta.id, Cuenta.usuario_id).where(Cuenta.id.in_(ids))).all())
+    for numero, (d, usuario_id) in enumerate(zip(datos, usuarios)):
+        if d.cuenta_origen_id == d.cuenta_destino_id:
+            raise HTTPException(status_code=400, detail=f"Transferencia {numero}: las cuentas de origen y destino deben ser distintas")
+        for cuenta_id in (d.cuenta_origen_id, d.cuenta_destino_id):
+            if duenos.get(cuenta_id) != usuario_id:
+                raise HTTPException(status_code=404, detail=f"Transferencia {numero}: cuenta {cuenta_id} no encontrada")
+
+
+def _piernas(d, usuario_id, fecha, ahora):
+    """Las dos transacciones de una transferencia: sale -monto del origen y entra +monto al destino."""
+    return [
+        {"usuario_id": usuario_id, "cuenta_id": cuenta_id, "categoria_id": None, "monto": monto,
+         "tipo": "transferencia", "descripcion": d.descripcion, "fecha": fecha, "creado_en": ahora}
+        for cuenta_id, monto in ((d.cuenta_origen_id, -d.monto), (d.cuenta_destino_id, d.monto))
+    ]
+
+
+# 🔹 Crear una transferencia o un lote (todo o nada, en una sola transacción)
+@routerTransferencias.post(
+    "/transferencias",
+    response_model=Union[TransferenciaPydantic, List[TransferenciaPydantic]],
+    tags=["Transferencias"],
+)
+def crear_transferencias(data: Union[TransferenciaCreate, List[TransferenciaCreate]], db: Session = Depends(get_db)):
+    """
+    Acepta un objeto o una lista (hasta LOTE_MAXIMO) y responde con la misma forma.
+    Cada transferencia genera dos transacciones tipo 'transferencia' (monto negativo
+    en el origen, positivo en el destino) y su fila en transferencias. Todas las
+    transacciones van en un INSERT multi-fila y todas las transferencias en otro;
+    los saldos de las cuentas se actualizan en el mismo commit.
+    """
+    datos = data if isinstance(data, list) else [data]
+    if not datos:
+        raise HTTPException(status_code=400, detail="No hay transferencias que crear")
+    if len(datos) > LOTE_MAXIMO:
+        raise HTTPException(status_code=400, detail=f"Máximo {LOTE_MAXIMO} transferencias por petición")
+    try:
+        # si no mandan usuario_id desde el cliente, asigna 1 por defecto (hasta que haya login real)
+        usuarios = [d.usuario_id if d.usuario_id is not None else 1 for d in datos]
+        _validar_cuentas(db, datos, usuarios)
+
+        hoy, ahora = date.today(), datetime.now()
+        fechas = [d.fecha or hoy for d in datos]
+        piernas = [p for d, u, f in zip(datos, usuarios, fechas) for p in _piernas(d, u, f, ahora)]
+        ids = insertar_con_ids(db, Transaccion.__table__, piernas)
+
+        transferencias = [
+            {"usuario_id": u, "transaccion_origen_id": ids[2 * i], "transaccion_destino_id": ids[2 * i + 1],
+             "monto": d.monto, "fecha": f}
+            for i, (d, u, f) in enumerate(zip(datos, usuarios, fechas))
+        ]
+        for t, id in zip(transferencias, insertar_con_ids(db, Transferencia.__table__, transferencias)):
+            t["id"] = id
+        aplicar_movimientos(db, [{**p, "signo": 1} for p in piernas])
+        # Los INSERT multi-fila llevan los valores en la sentencia y no en los parámetros
+        marcar_escritura(db, *set(usuarios))
+        db.commit()
+        return transferencias if isinstance(data, list) else transferencias[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al crear transferencias: {str(e)}")
+    finally:
+        db.close()
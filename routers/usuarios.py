@@ -1,29 +1,54 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from datetime import datetime
-from DB.conexion import get_db
+from typing import Literal
+from DB.conexion import get_async_db, get_async_db_lectura
 from models.modelsDB import Usuario
 from modelsPydantic import Usuario as UsuarioPydantic
 from modelsPydantic import UsuarioLogin
+from servicios import exportacion, hashing
 
 routerUsuarios = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _servicio_saturado():
+    return HTTPException(
+        status_code=503,
+        detail="Demasiadas solicitudes de autenticación, intenta de nuevo",
+        headers={"Retry-After": "1"},
+    )
 
 
 @routerUsuarios.post("/login", tags=["Login"])
-def login(usuario: UsuarioLogin, db: Session = Depends(get_db)):
+async def login(usuario: UsuarioLogin, db: AsyncSession = Depends(get_async_db)):
     # Buscar al usuario por correo
-    user = db.query(Usuario).filter(Usuario.correo_electronico == usuario.correo_electronico).first()
+    user = (await db.execute(
+        select(Usuario).where(Usuario.correo_electronico == usuario.correo_electronico)
+    )).scalars().first()
 
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    # Comparar contraseña ingresada con la hashada en BD
-    if not pwd_context.verify(usuario.contrasena_hash, user.contrasena_hash):
+    # Comparar contraseña ingresada con la hashada en BD (en el pool de hashing)
+    try:
+        valida, nuevo_hash = await hashing.verificar(usuario.contrasena_hash, user.contrasena_hash)
+    except hashing.ColaLlena:
+        raise _servicio_saturado()
+
+    if not valida:
         raise HTTPException(status_code=401, detail="Contraseña incorrecta")
 
+    # El hash usa otro costo/esquema/prefijo: se reemplaza aprovechando la contraseña en claro
+    if nuevo_hash is not None:
+        try:
+            user.contrasena_hash = nuevo_hash
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            print(" No se pudo actualizar el hash:", str(e))
+
     return JSONResponse(content={
         "mensaje": " Inicio de sesión exitoso",
         "id": user.id,
@@ -35,15 +60,20 @@ def login(usuario: UsuarioLogin, db: Session = Depends(get_db)):
 
 #endpoint de registro
 @routerUsuarios.post("/usuarios", tags=["Usuarios"])
-def crear_usuario(usuario: UsuarioPydantic, db: Session = Depends(get_db)):
+async def crear_usuario(usuario: UsuarioPydantic, db: AsyncSession = Depends(get_async_db)):
     try:
         # Verificar si ya existe el correo
-        existente = db.query(Usuario).filter(Usuario.correo_electronico == usuario.correo_electronico).first()
+        existente = (await db.execute(
+            select(Usuario.id).where(Usuario.correo_electronico == usuario.correo_electronico)
+        )).first()
         if existente:
             raise HTTPException(status_code=400, detail="El correo ya está registrado")
 
-        # Hashear la contraseña (reemplazo opcional para Laravel)
-        hashed_password = pwd_context.hash(usuario.contrasena_hash).replace("$2b$", "$2y$")
+        # Hashear la contraseña (prefijo $2y$ para Laravel, ver BCRYPT_IDENT)
+        try:
+            hashed_password = await hashing.hashear(usuario.contrasena_hash)
+        except hashing.ColaLlena:
+            raise _servicio_saturado()
 
         # Si se envía creado_en o actualizado_en desde el frontend, se usa; si no, se genera con datetime.now()
         creado = usuario.creado_en if usuario.creado_en else datetime.now()
@@ -60,8 +90,7 @@ def crear_usuario(usuario: UsuarioPydantic, db: Session = Depends(get_db)):
         )
 
         db.add(nuevo_usuario)
-        db.commit()
-        db.refresh(nuevo_usuario)
+        await db.commit()
 
         return JSONResponse(content={
             "message": " Usuario creado correctamente",
@@ -69,11 +98,47 @@ def crear_usuario(usuario: UsuarioPydantic, db: Session = Depends(get_db)):
         })
 
 
+    except HTTPException:
+        raise
+
     except Exception as e:
 
-        db.rollback()
+        await db.rollback()
 
         print(" ERROR AL CREAR USUARIO:", str(e))  # 👈 esto te dirá el error exacto en la terminal
 
         raise HTTPException(status_code=500, detail=f"Error al crear usuario: {str(e)}")
 
+
+@routerUsuarios.get("/hashing/metricas", tags=["Login"])
+def metricas_hashing():
+    return hashing.metricas()
+
+
+# Exportar historial completo del usuario (streaming)
+@routerUsuarios.get("/usuarios/{id}/export", tags=["Usuarios"])
+async def exportar_historial(
+    id: int,
+    formato: Literal["csv", "parquet"] = Query("csv", description="csv o parquet (columnar)"),
+    comprimir: bool = Query(True, description="Comprime el CSV con gzip al vuelo"),
+    db: AsyncSession = Depends(get_async_db_lectura),
+):
+    existe = (await db.execute(select(Usuario.id).where(Usuario.id == id))).first()
+    if not existe:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    if formato == "parquet":
+        if not exportacion.parquet_disponible():
+            raise HTTPException(status_code=501, detail="Exportación parquet no disponible: falta pyarrow")
+        return StreamingResponse(
+            exportacion.exportar_parquet(id),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f'attachment; filename="transacciones_{id}.parquet"'},
+        )
+
+    nombre = f"transacciones_{id}.csv" + (".gz" if comprimir else "")
+    return StreamingResponse(
+        exportacion.exportar_csv(id, comprimir),
+        media_type="application/gzip" if comprimir else "text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
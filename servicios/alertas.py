@@ -0,0 +1,190 @@
+"""
+Generación por lotes de historial_alertas para todos los usuarios.
+
+    python -m servicios.alertas [--desde-cero]
+
+Pensado para un cron frecuente (cada pocos minutos). Cada tipo de alerta es una
+sola consulta sobre todos los usuarios más inserciones por lotes, sin recorrer
+usuario por usuario:
+
+- exceso_presupuesto: presupuestos con monto_actual > monto, modificados desde
+  la marca de agua (actualizado_en cambia con cada delta de servicios/presupuestos).
+- saldo_bajo: cuentas (salvo tarjetas de crédito) con saldo_actual por debajo de
+  ALERTAS_SALDO_MINIMO, modificadas desde la marca de agua.
+- pago_proximo: pagos fijos activos que vencen en los próximos ALERTAS_DIAS_PAGO
+  días. Depende de la fecha y no de cambios, así que no usa la marca: es un rango
+  sobre ix_pagos_fijos_activo_proxima_fecha.
+
+La marca de agua es la hora de la base al empezar la corrida anterior, menos un
+margen para transacciones que confirmaron tarde. Reprocesar es inofensivo: cada
+alerta lleva una `clave` única por usuario (p. ej. 'exceso:12:2024-06') y las
+repetidas se omiten al insertar. Todo se confirma junto con la nueva marca.
+"""
+import argparse
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from DB.dialecto import insertar_sin_duplicados, upsert
+from models.modelsDB import Categoria, Cuenta, HistorialAlerta, MarcaAgua, PagoFijo, Presupuesto
+
+NOMBRE_MARCA = "alertas"
+DIAS_PAGO = int(os.getenv("ALERTAS_DIAS_PAGO", "3"))
+SALDO_MINIMO = Decimal(os.getenv("ALERTAS_SALDO_MINIMO", "500"))
+MARGEN = timedelta(seconds=float(os.getenv("ALERTAS_MARGEN_SEGUNDOS", "60")))
+LOTE = 1000
+
+_alertas = HistorialAlerta.__table__
+_marcas = MarcaAgua.__table__
+
+
+def _como_datetime(valor):
+    # SQLite devuelve CURRENT_TIMESTAMP como texto
+    return valor if isinstance(valor, datetime) or valor is None else datetime.fromisoformat(str(valor))
+
+
+def consulta_excesos(desde):
+    consulta = (
+        select(Presupuesto.id, Presupuesto.usuario_id, Presupuesto.anio, Presupuesto.mes,
+               Presupuesto.monto, Presupuesto.monto_actual, Categoria.nombre.label("categoria"))
+        .join(Categoria, Categoria.id == Presupuesto.categoria_id)
+        .where(Presupuesto.monto_actual > Presupuesto.monto)
+    )
+    if desde is not None:
+        consulta = consulta.where(Presupuesto.actualizado_en >= desde)
+    return consulta
+
+
+def consulta_saldos_bajos(desde):
+    consulta = (
+        select(Cuenta.id, Cuenta.usuario_id, Cuenta.nombre, Cuenta.saldo_actual, Cuenta.moneda)
+        .where(Cuenta.saldo_actual < SALDO_MINIMO, Cuenta.tipo != "tarjeta_credito")
+    )
+    if desde is not None:
+        consulta = consulta.where(Cuenta.actualizado_en >= desde)
+    return consulta
+
+
+def consulta_pagos_proximos(hoy):
+    return (
+        select(PagoFijo.id, PagoFijo.usuario_id, PagoFijo.descripcion, PagoFijo.monto, PagoFijo.proxima_fecha)
+        .where(PagoFijo.activo.is_(True),
+               PagoFijo.proxima_fecha.between(hoy, hoy + timedelta(days=DIAS_PAGO)))
+    )
+
+
+def _excesos(db, desde):
+    for p in db.execute(consulta_excesos(desde)).all():
+        yield {
+            "usuario_id": p.usuario_id,
+            "tipo_alerta": "exceso_presupuesto",
+            "clave": f"exceso:{p.id}:{p.anio}-{p.mes:02d}",
+            "mensaje": f"Exceso de presupuesto en {p.categoria} ({p.mes:02d}/{p.anio}): "
+                       f"gastado {p.monto_actual} de {p.monto}",
+        }
+
+
+def _saldos_bajos(db, desde, hoy):
+    for c in db.execute(consulta_saldos_bajos(desde)).all():
+        yield {
+            "usuario_id": c.usuario_id,
+            "tipo_alerta": "saldo_bajo",
+            "clave": f"saldo:{c.id}:{hoy.isoformat()}",
+            "mensaje": f"Saldo bajo en {c.nombre}: {c.saldo_actual} {c.moneda or 'MXN'}",
+        }
+
+
+def _pagos_proximos(db, hoy):
+    for p in db.execute(consulta_pagos_proximos(hoy)).all():
+        yield {
+            "usuario_id": p.usuario_id,
+            "tipo_alerta": "pago_proximo",
+            "clave": f"pago:{p.id}:{p.proxima_fecha.isoformat()}",
+            "mensaje": f"El pago fijo '{p.descripcion}' de {p.monto} vence el {p.proxima_fecha.isoformat()}",
+        }
+
+
+def consulta_existentes(pares):
+    # Superconjunto de los pares pedidos; (usuario_id, clave) IN (...) recorrería el índice en SQLite
+    return (
+        select(HistorialAlerta.usuario_id, HistorialAlerta.clave)
+        .where(HistorialAlerta.usuario_id.in_({u for u, _ in pares}),
+               HistorialAlerta.clave.in_({c for _, c in pares}))
+    )
+
+
+def _insertar_lote(db, stmt, lote) -> int:
+    """
+    Inserta las alertas del lote cuya (usuario_id, clave) no existe y devuelve cuántas.
+    No se usa rowcount: con CLIENT.FOUND_ROWS (el de los drivers MySQL de SQLAlchemy)
+    ON DUPLICATE KEY UPDATE cuenta también las repetidas. `stmt` sigue omitiendo las
+    que otra corrida inserte entre la consulta y el INSERT.
+    """
+    existentes = set(db.execute(consulta_existentes({(a["usuario_id"], a["clave"]) for a in lote})).all())
+    nuevas = {}
+    for alerta in lote:
+        par = (alerta["usuario_id"], alerta["clave"])
+        if par not in existentes:
+            nuevas.setdefault(par, alerta)
+    if nuevas:
+        db.execute(stmt, list(nuevas.values()))
+    return len(nuevas)
+
+
+def _insertar(db, alertas) -> tuple:
+    """Inserta por lotes omitiendo claves repetidas; devuelve (evaluadas, insertadas)."""
+    stmt = insertar_sin_duplicados(db, _alertas, ["usuario_id", "clave"])
+    evaluadas = insertadas = 0
+    lote = []
+    for alerta in alertas:
+        lote.append({**alerta, "leida": False})
+        if len(lote) >= LOTE:
+            insertadas += _insertar_lote(db, stmt, lote)
+            evaluadas += len(lote)
+            lote = []
+    if lote:
+        insertadas += _insertar_lote(db, stmt, lote)
+        evaluadas += len(lote)
+    return evaluadas, insertadas
+
+
+def generar(db, hoy: date = None, desde_cero: bool = False) -> dict:
+    """Evalúa las tres condiciones y guarda la nueva marca de agua. El commit queda a cargo de quien llama."""
+    hoy = hoy or date.today()
+    inicio = _como_datetime(db.execute(select(func.current_timestamp())).scalar())
+    marca = None if desde_cero else _como_datetime(
+        db.execute(select(MarcaAgua.marca).where(MarcaAgua.nombre == NOMBRE_MARCA)).scalar()
+    )
+    desde = marca - MARGEN if marca is not None else None
+
+    resultado = {"desde": desde.isoformat(sep=" ") if desde else None}
+    for tipo, alertas in (
+        ("exceso_presupuesto", _excesos(db, desde)),
+        ("saldo_bajo", _saldos_bajos(db, desde, hoy)),
+        ("pago_proximo", _pagos_proximos(db, hoy)),
+    ):
+        evaluadas, insertadas = _insertar(db, alertas)
+        resultado[tipo] = {"evaluadas": evaluadas, "insertadas": insertadas}
+
+    db.execute(upsert(db, _marcas, ["nombre"], lambda nueva: {"marca": nueva.marca}),
+               {"nombre": NOMBRE_MARCA, "marca": inicio})
+    resultado["marca"] = inicio.isoformat(sep=" ")
+    return resultado
+
+
+if __name__ == "__main__":
+    from DB.conexion import Session
+
+    parser = argparse.ArgumentParser(description="Genera historial_alertas para todos los usuarios")
+    parser.add_argument("--desde-cero", action="store_true", help="Ignora la marca de agua y evalúa todo")
+    parser.add_argument("--hoy", type=date.fromisoformat, default=None, help="Fecha de referencia (AAAA-MM-DD)")
+    args = parser.parse_args()
+
+    db = Session()
+    try:
+        print(generar(db, args.hoy, args.desde_cero))
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,131 @@
+"""
+Caché en memoria de categorías, por (tipo, usuario_id).
+
+Cada entrada guarda la lista ya serializada y el árbol padre/hijo armado con
+categoria_padre_id. Las escrituras incrementan `versiones_cache['categorias']`
+dentro de su propia transacción; cada worker compara esa versión con la de sus
+entradas como mucho cada CACHE_CATEGORIAS_REVISION segundos (1 por defecto) y
+descarta todo si cambió. Ese intervalo es lo más que otro worker puede servir
+datos viejos; el worker que hizo la escritura los descarta de inmediato.
+
+Las entradas son un LRU de hasta CACHE_CATEGORIAS_MAXIMO (tipo, usuario_id).
+"""
+import os
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select, or_
+
+from DB.dialecto import upsert
+from models.modelsDB import Categoria as CategoriaDB, VersionCache
+from modelsPydantic import Categoria as CategoriaOut
+from servicios.serializacion import Serializador, codificar
+
+NOMBRE = "categorias"
+INTERVALO_REVISION = float(os.getenv("CACHE_CATEGORIAS_REVISION", "1"))
+MAXIMO = int(os.getenv("CACHE_CATEGORIAS_MAXIMO", "5000"))
+
+_serializador = Serializador(CategoriaOut)
+_tabla_versiones = VersionCache.__table__
+
+_version = None
+_revisado_en = 0.0
+_entradas = OrderedDict()
+
+
+class Entrada:
+    __slots__ = ("version", "categorias", "cuerpo", "arbol", "cuerpo_arbol")
+
+    def __init__(self, version, categorias, cuerpo, arbol, cuerpo_arbol):
+        self.version = version
+        self.categorias = categorias
+        self.cuerpo = cuerpo
+        self.arbol = arbol
+        self.cuerpo_arbol = cuerpo_arbol
+
+
+# ---------------- Escrituras (sesión síncrona, antes del commit) ----------------
+
+def incrementar_version(db):
+    db.execute(upsert(db, _tabla_versiones, ["nombre"], lambda nueva: {
+        "version": _tabla_versiones.c.version + 1,
+    }), {"nombre": NOMBRE, "version": 1})
+
+
+def descartar_local():
+    """Tras el commit: vacía la caché del worker y fuerza releer la versión."""
+    global _version, _revisado_en
+    _entradas.clear()
+    _version = None
+    _revisado_en = 0.0
+
+
+# ---------------- Lecturas (AsyncSession) ----------------
+
+async def version_actual(db) -> int:
+    global _version, _revisado_en
+    ahora = time.monotonic()
+    if _version is None or ahora - _revisado_en >= INTERVALO_REVISION:
+        leida = (await db.execute(
+            select(VersionCache.version).where(VersionCache.nombre == NOMBRE)
+        )).scalar() or 0
+        if leida != _version:
+            _entradas.clear()
+        _version, _revisado_en = leida, ahora
+    return _version
+
+
+def etag(version: int, tipo, usuario_id, recurso: str = "categorias") -> str:
+    return f'W/"{recurso}-{version}-{tipo or "todas"}-{usuario_id if usuario_id is not None else "todos"}"'
+
+
+def coincide(if_none_match, etag_actual: str) -> bool:
+    if not if_none_match:
+        return False
+    return any(v.strip() in (etag_actual, "*") for v in if_none_match.split(","))
+
+
+def _armar_arbol(categorias):
+    nodos = {c["id"]: {**c, "subcategorias": []} for c in categorias}
+    raices = []
+    for nodo in nodos.values():
+        padre_id = nodo["categoria_padre_id"]
+        padre = nodos.get(padre_id) if padre_id != nodo["id"] else None
+        (padre["subcategorias"] if padre else raices).append(nodo)
+    return raices
+
+
+async def obtener(db, tipo=None, usuario_id=None) -> Entrada:
+    version = await version_actual(db)
+    clave = (tipo, usuario_id)
+    entrada = _entradas.get(clave)
+    if entrada is not None and entrada.version == version:
+        _entradas.move_to_end(clave)
+        return entrada
+
+    consulta = select(*_serializador.columnas(CategoriaDB))
+    if tipo is not None:
+        consulta = consulta.where(CategoriaDB.tipo == tipo)
+    if usuario_id is not None:
+        # Las del usuario más las de sistema / globales
+        consulta = consulta.where(or_(
+            CategoriaDB.usuario_id == usuario_id,
+            CategoriaDB.usuario_id.is_(None),
+            CategoriaDB.es_sistema.is_(True),
+        ))
+    filas = (await db.execute(consulta.order_by(CategoriaDB.id.desc()))).all()
+
+    categorias = _serializador.dicts(filas)
+    arbol = _armar_arbol(categorias)
+    entrada = Entrada(
+        version=version,
+        categorias=categorias,
+        cuerpo=codificar(categorias),
+        arbol=arbol,
+        cuerpo_arbol=codificar(arbol),
+    )
+    _entradas[clave] = entrada
+    _entradas.move_to_end(clave)
+    while len(_entradas) > MAXIMO:
+        _entradas.popitem(last=False)
+    return entrada
@@ -0,0 +1,269 @@
+"""
+Caché de respuestas calculadas por usuario (gráfica, alertas, pagos fijos,
+dashboard), con el cuerpo JSON ya codificado.
+
+Cada `Cache(espacio)` es un LRU en memoria del proceso con TTL y un máximo de
+entradas. Una entrada se invalida con el commit que toque datos de su usuario
+(DB.conexion.al_confirmar_escrituras, que sigue los usuario_id escritos en cada
+transacción) o al vencer su TTL.
+
+Con CACHE_COMPARTIDO_URL (redis://...) se agrega un nivel compartido entre
+workers: cada usuario tiene un número de versión que los commits incrementan, y
+las entradas (locales y compartidas) llevan la versión con la que se leyeron, así
+que una escritura en cualquier proceso invalida en todos. `Memoria` implementa
+lo poco que se usa del cliente de Redis (get/set/mget/incr) y lo sustituye en
+pruebas o en un solo proceso: CACHE_COMPARTIDO_URL=memoria.
+
+El cliente de Redis es síncrono: desde el event loop (responder() y los commits
+de AsyncSession) sus llamadas van al threadpool para no bloquearlo.
+
+Sin nivel compartido, escrituras de otro worker o de los jobs (cron, CLI) solo
+se reflejan al vencer el TTL.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Response
+from starlette.concurrency import run_in_threadpool
+
+from DB.conexion import TODOS, al_confirmar_escrituras
+from servicios.metricas import Familia, Medidor
+from servicios.serializacion import codificar
+
+TTL = float(os.getenv("CACHE_USUARIO_TTL", "60"))
+MAXIMO = int(os.getenv("CACHE_USUARIO_MAXIMO", "5000"))
+URL_COMPARTIDO = os.getenv("CACHE_COMPARTIDO_URL", "")
+PREFIJO = os.getenv("CACHE_COMPARTIDO_PREFIJO", "lana")
+
+aciertos = Familia("lana_cache_aciertos_total", "Lecturas servidas desde la caché", ("cache", "nivel"),
+                   tipo="counter")
+fallos = Familia("lana_cache_fallos_total", "Lecturas que tuvieron que calcularse", ("cache",), tipo="counter")
+desalojos = Familia("lana_cache_desalojos_total", "Entradas locales descartadas", ("cache", "motivo"),
+                    tipo="counter")
+
+_caches = []
+
+
+class Memoria:
+    """Sustituto local del cliente de Redis: mismo subconjunto de la API, en memoria."""
+
+    def __init__(self):
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            valor, expira = self._datos.get(clave, (None, None))
+            if expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            return valor
+
+    def mget(self, claves):
+        return [self.get(c) for c in claves]
+
+    def set(self, clave, valor, ex=None):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ex if ex else None)
+        return True
+
+    def incr(self, clave):
+        with self._lock:
+            valor = int(self._datos.get(clave, (0, None))[0]) + 1
+            self._datos[clave] = (str(valor).encode(), None)
+            return valor
+
+
+def _crear_compartido(url: str):
+    if not url:
+        return None
+    if url == "memoria":
+        return Memoria()
+    import redis  # opcional: solo si se configura un Redis compartido
+    return redis.Redis.from_url(url)
+
+
+_compartido = _crear_compartido(URL_COMPARTIDO)
+
+
+def configurar_compartido(cliente):
+    """Cambia el nivel compartido (p. ej. por Memoria() en pruebas) y vacía los niveles locales."""
+    global _compartido
+    _compartido = cliente
+    for cache in _caches:
+        cache.vaciar()
+
+
+def _remoto() -> bool:
+    # Memoria no hace red: no vale la pena pasar por el threadpool
+    return _compartido is not None and not isinstance(_compartido, Memoria)
+
+
+def _clave_version(usuario_id) -> str:
+    return f"{PREFIJO}:version:{usuario_id}"
+
+
+def _versiones(usuario_id) -> tuple:
+    if _compartido is None:
+        return ()
+    todos, usuario = _compartido.mget([_clave_version(TODOS), _clave_version(usuario_id)])
+    return int(todos or 0), int(usuario or 0)
+
+
+class Cache:
+    def __init__(self, espacio: str, ttl: float = TTL, maximo: int = MAXIMO):
+        self.espacio = espacio
+        self.ttl = ttl
+        self.maximo = maximo
+        # (usuario_id, clave) -> (ficha, expira, cuerpo)
+        self._entradas = OrderedDict()
+        self._por_usuario = {}
+        # Se incrementan al descartar: una lectura que empezó antes no guarda su resultado
+        self._generaciones = {}
+        self._generacion_global = 0
+        self._lock = threading.Lock()
+        self._aciertos_local = aciertos.con(espacio, "local")
+        self._aciertos_compartido = aciertos.con(espacio, "compartido")
+        self._fallos = fallos.con(espacio)
+        _caches.append(self)
+
+    def _clave_compartida(self, usuario_id, clave, versiones) -> str:
+        return f"{PREFIJO}:{self.espacio}:{usuario_id}:{'.'.join(map(str, versiones))}:{'|'.join(map(str, clave))}"
+
+    def _quitar(self, llave, motivo: str):
+        del self._entradas[llave]
+        claves = self._por_usuario.get(llave[0])
+        if claves is not None:
+            claves.discard(llave[1])
+            if not claves:
+                del self._por_usuario[llave[0]]
+        desalojos.con(self.espacio, motivo).incrementar()
+
+    def leer(self, usuario_id: int, clave: tuple = ()):
+        """
+        Devuelve (cuerpo, ficha). Si cuerpo es None hay que calcularlo y pasar la
+        misma ficha a guardar(): así no se guarda algo leído antes de una escritura.
+        """
+        versiones = _versiones(usuario_id)
+        llave = (usuario_id, clave)
+        with self._lock:
+            ficha = (self._generacion_global, self._generaciones.get(usuario_id, 0), versiones)
+            entrada = self._entradas.get(llave)
+            if entrada is not None:
+                guardada, expira, cuerpo = entrada
+                if guardada[2] != versiones:
+                    self._quitar(llave, "invalidada")
+                elif expira < time.monotonic():
+                    self._quitar(llave, "vencida")
+                else:
+                    self._entradas.move_to_end(llave)
+                    self._aciertos_local.incrementar()
+                    return cuerpo, ficha
+
+        if _compartido is not None:
+            cuerpo = _compartido.get(self._clave_compartida(usuario_id, clave, versiones))
+            if cuerpo is not None:
+                self._aciertos_compartido.incrementar()
+                self._guardar_local(llave, ficha, cuerpo)
+                return cuerpo, ficha
+
+        self._fallos.incrementar()
+        return None, ficha
+
+    def guardar(self, usuario_id: int, clave: tuple, cuerpo: bytes, ficha: tuple):
+        if self.ttl <= 0:
+            return
+        if self._guardar_local((usuario_id, clave), ficha, cuerpo) and _compartido is not None:
+            _compartido.set(self._clave_compartida(usuario_id, clave, ficha[2]), cuerpo, ex=max(int(self.ttl), 1))
+
+    def _guardar_local(self, llave, ficha, cuerpo) -> bool:
+        with self._lock:
+            if ficha[:2] != (self._generacion_global, self._generaciones.get(llave[0], 0)):
+                return False
+            self._entradas[llave] = (ficha, time.monotonic() + self.ttl, cuerpo)
+            self._entradas.move_to_end(llave)
+            self._por_usuario.setdefault(llave[0], set()).add(llave[1])
+            while len(self._entradas) > self.maximo:
+                self._quitar(next(iter(self._entradas)), "capacidad")
+            return True
+
+    def descartar_local(self, usuarios):
+        with self._lock:
+            if TODOS in usuarios or len(self._generaciones) > self.maximo * 10:
+                # Descartar a todos también acota la memoria de generaciones
+                self._vaciar()
+                return
+            for usuario_id in usuarios:
+                usuario_id = int(usuario_id)
+                self._generaciones[usuario_id] = self._generaciones.get(usuario_id, 0) + 1
+                for clave in list(self._por_usuario.get(usuario_id, ())):
+                    self._quitar((usuario_id, clave), "invalidada")
+
+    def _vaciar(self):
+        for llave in list(self._entradas):
+            self._quitar(llave, "invalidada")
+        self._generaciones.clear()
+        self._generacion_global += 1
+
+    def vaciar(self):
+        with self._lock:
+            self._vaciar()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+# Incrementos de versión lanzados al threadpool desde el event loop y aún sin terminar
+_incrementos_pendientes = set()
+
+
+def _incrementar_versiones(usuarios):
+    for usuario_id in usuarios:
+        _compartido.incr(_clave_version(usuario_id))
+
+
+@al_confirmar_escrituras
+def descartar(usuarios):
+    """Tras cada commit: invalida en este proceso y, si hay nivel compartido, en todos."""
+    for cache in _caches:
+        cache.descartar_local(usuarios)
+    if _compartido is None:
+        return
+    try:
+        loop = asyncio.get_running_loop() if _remoto() else None
+    except RuntimeError:
+        loop = None
+    if loop is None:
+        # Sesión sync (handler en el threadpool, jobs) o Memoria
+        _incrementar_versiones(usuarios)
+        return
+    # Commit de una AsyncSession: el incr va al threadpool y responder() lo espera
+    futuro = loop.run_in_executor(None, _incrementar_versiones, list(usuarios))
+    _incrementos_pendientes.add(futuro)
+    futuro.add_done_callback(_incrementos_pendientes.discard)
+
+
+Medidor("lana_cache_entradas", "Entradas en la caché local de cada espacio", ("cache",),
+        lambda: [((c.espacio,), len(c)) for c in _caches])
+
+
+async def responder(cache: Cache, usuario_id: int, clave: tuple, calcular):
+    """Response con el JSON en caché o, si no está, el de `await calcular()` (que se guarda)."""
+    if not _remoto():
+        cuerpo, ficha = cache.leer(usuario_id, clave)
+        if cuerpo is None:
+            cuerpo = codificar(await calcular())
+            cache.guardar(usuario_id, clave, cuerpo, ficha)
+        return Response(content=cuerpo, media_type="application/json")
+
+    if _incrementos_pendientes:
+        # Una escritura de este proceso todavía no sube su versión: se leería lo anterior
+        await asyncio.gather(*list(_incrementos_pendientes), return_exceptions=True)
+    cuerpo, ficha = await run_in_threadpool(cache.leer, usuario_id, clave)
+    if cuerpo is None:
+        cuerpo = codificar(await calcular())
+        await run_in_threadpool(cache.guardar, usuario_id, clave, cuerpo, ficha)
+    return Response(content=cuerpo, media_type="application/json")
@@ -0,0 +1,142 @@
+"""
+Exportación en streaming del historial de un usuario (transacciones + categorías + cuentas).
+
+Las filas se leen de un cursor del servidor en bloques de FILAS_POR_BLOQUE y cada
+bloque se serializa, comprime y entrega antes de leer el siguiente, así que la
+memoria no depende del tamaño del historial.
+
+    csv      CSV UTF-8, opcionalmente comprimido con gzip al vuelo
+    parquet  Parquet (un row group por bloque, compresión zstd); requiere pyarrow
+"""
+import csv
+import io
+import zlib
+
+from sqlalchemy import text, Date, DateTime, Numeric
+
+from DB.conexion import AsyncSessionLectura
+
+# pyarrow (requirements.txt) solo lo usa formato=parquet y es pesado: se importa al primer uso
+pa = pq = None
+
+FILAS_POR_BLOQUE = 5000
+
+COLUMNAS = [
+    "id", "fecha", "tipo", "monto", "descripcion",
+    "categoria_id", "categoria", "cuenta_id", "cuenta", "moneda", "creado_en",
+]
+
+SQL_EXPORTACION = text("""
+    SELECT t.id, t.fecha, t.tipo, t.monto, t.descripcion,
+           t.categoria_id, c.nombre AS categoria,
+           t.cuenta_id, cu.nombre AS cuenta, cu.moneda,
+           t.creado_en
+    FROM transacciones t
+    LEFT JOIN categorias c ON c.id = t.categoria_id
+    LEFT JOIN cuentas cu ON cu.id = t.cuenta_id
+    WHERE t.usuario_id = :usuario_id
+    ORDER BY t.fecha, t.id
+""").columns(fecha=Date, monto=Numeric(15, 2), creado_en=DateTime)
+
+
+def parquet_disponible() -> bool:
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            return False
+    return True
+
+
+async def _bloques(usuario_id: int):
+    # Sesión propia: el cuerpo se envía después de cerrar la sesión de la dependencia
+    async with AsyncSessionLectura(usuario_id) as db:
+        resultado = await db.stream(
+            SQL_EXPORTACION.execution_options(yield_per=FILAS_POR_BLOQUE),
+            {"usuario_id": usuario_id},
+        )
+        async for bloque in resultado.partitions(FILAS_POR_BLOQUE):
+            yield bloque
+
+
+async def exportar_csv(usuario_id: int, comprimir: bool = True):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None  # wbits=31: formato gzip
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+
+    async for bloque in _bloques(usuario_id):
+        escritor.writerows(bloque)
+        datos = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        salida = compresor.compress(datos) if compresor else datos
+        if salida:
+            yield salida
+
+    datos = buffer.getvalue().encode("utf-8")
+    if compresor:
+        yield compresor.compress(datos) + compresor.flush()
+    elif datos:
+        yield datos
+
+
+class _Sumidero(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que se drenan."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def drenar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def _esquema_parquet():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("fecha", pa.date32()),
+        ("tipo", pa.string()),
+        ("monto", pa.decimal128(15, 2)),
+        ("descripcion", pa.string()),
+        ("categoria_id", pa.int64()),
+        ("categoria", pa.string()),
+        ("cuenta_id", pa.int64()),
+        ("cuenta", pa.string()),
+        ("moneda", pa.string()),
+        ("creado_en", pa.timestamp("s")),
+    ])
+
+
+async def exportar_parquet(usuario_id: int):
+    esquema = _esquema_parquet()
+    sumidero = _Sumidero()
+    escritor = pq.ParquetWriter(sumidero, esquema, compression="zstd")
+
+    async for bloque in _bloques(usuario_id):
+        columnas = list(zip(*bloque))
+        escritor.write_table(pa.Table.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+            schema=esquema,
+        ))
+        datos = sumidero.drenar()
+        if datos:
+            yield datos
+
+    escritor.close()
+    yield sumidero.drenar()
@@ -0,0 +1,163 @@
+"""
+Hashing de contraseñas fuera del event loop.
+
+bcrypt se ejecuta en un ProcessPoolExecutor. Un semáforo limita cuántos hashes
+se calculan a la vez y, si ya hay HASH_MAX_COLA peticiones esperando turno,
+las nuevas se rechazan con `ColaLlena` (los routers responden 503).
+
+Configuración por entorno:
+    HASH_PROCESOS          procesos del pool (por defecto, núcleos disponibles)
+    HASH_MAX_CONCURRENTES  hashes simultáneos (por defecto, HASH_PROCESOS)
+    HASH_MAX_COLA          peticiones en espera antes de rechazar (64)
+    BCRYPT_ROUNDS          costo de bcrypt (12)
+    BCRYPT_IDENT           prefijo generado; '2y' mantiene compatibilidad con Laravel
+    HASH_CALENTAR          1 para levantar los procesos del pool al arrancar (por defecto)
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from servicios.metricas import Histograma, Valor
+
+PROCESOS = int(os.getenv("HASH_PROCESOS", os.cpu_count() or 1))
+MAX_CONCURRENTES = int(os.getenv("HASH_MAX_CONCURRENTES", PROCESOS))
+MAX_COLA = int(os.getenv("HASH_MAX_COLA", "64"))
+ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+IDENT = os.getenv("BCRYPT_IDENT", "2y")
+CALENTAR = os.getenv("HASH_CALENTAR", "1") == "1"
+
+latencia_hash = Histograma()
+espera_cola = Histograma()
+contadores = {"rechazados": 0, "rehash": 0}
+
+Valor("lana_hash_segundos", "Duración de hash/verificación bcrypt en el pool", "histogram", latencia_hash)
+Valor("lana_hash_espera_cola_segundos", "Espera por un turno del pool de hashing", "histogram", espera_cola)
+Valor("lana_hash_en_espera", "Peticiones esperando turno de hashing", "gauge", lambda: _en_espera)
+Valor("lana_hash_rechazados_total", "Peticiones rechazadas por cola llena", "counter",
+      lambda: contadores["rechazados"])
+Valor("lana_hash_rehash_total", "Hashes reemplazados al iniciar sesión", "counter", lambda: contadores["rehash"])
+
+
+class ColaLlena(Exception):
+    """Hay demasiadas peticiones esperando al pool de hashing."""
+
+
+# ---------------- Lado del proceso hijo ----------------
+
+_contexto = None
+
+
+def _crypt_context():
+    global _contexto
+    if _contexto is None:
+        from passlib.context import CryptContext
+        _contexto = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__ident=IDENT,
+            # Solo un mínimo: bcrypt__rounds fijaría también el máximo y un costo mayor se rehashearía a la baja
+            bcrypt__default_rounds=ROUNDS, bcrypt__min_desired_rounds=ROUNDS,
+        )
+    return _contexto
+
+
+def _necesita_actualizar(hash_guardado: str) -> bool:
+    # needs_update no marca un ident distinto ($2b$ con IDENT=2y): se revisa el prefijo
+    return _crypt_context().needs_update(hash_guardado) or not hash_guardado.startswith(f"${IDENT}$")
+
+
+def _preparar():
+    _crypt_context()
+
+
+def _hashear(contrasena: str) -> str:
+    return _crypt_context().hash(contrasena)
+
+
+def _verificar(contrasena: str, hash_guardado: str):
+    contexto = _crypt_context()
+    if not contexto.verify(contrasena, hash_guardado):
+        return False, None
+    if _necesita_actualizar(hash_guardado):
+        return True, contexto.hash(contrasena)
+    return True, None
+
+
+# ---------------- Lado del event loop ----------------
+
+_pool = None
+_semaforo = None
+_en_espera = 0
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PROCESOS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def _ejecutar(funcion, *args):
+    global _semaforo, _en_espera
+    if _semaforo is None:
+        _semaforo = asyncio.Semaphore(MAX_CONCURRENTES)
+    if _en_espera >= MAX_COLA:
+        contadores["rechazados"] += 1
+        raise ColaLlena()
+
+    _en_espera += 1
+    inicio = time.perf_counter()
+    try:
+        await _semaforo.acquire()
+    finally:
+        _en_espera -= 1
+    espera_cola.observar(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_obtener_pool(), funcion, *args)
+    finally:
+        latencia_hash.observar(time.perf_counter() - inicio)
+        _semaforo.release()
+
+
+async def hashear(contrasena: str) -> str:
+    return await _ejecutar(_hashear, contrasena)
+
+
+async def verificar(contrasena: str, hash_guardado: str):
+    """
+    Devuelve (valida, nuevo_hash). nuevo_hash no es None cuando la contraseña es
+    correcta pero el hash guardado usa otro esquema, prefijo o costo y debe reemplazarse.
+    """
+    valida, nuevo_hash = await _ejecutar(_verificar, contrasena, hash_guardado)
+    if nuevo_hash is not None:
+        contadores["rehash"] += 1
+    return valida, nuevo_hash
+
+
+async def calentar():
+    """Levanta los procesos del pool (spawn + passlib) antes del primer login."""
+    if not CALENTAR:
+        return
+    loop = asyncio.get_running_loop()
+    pool = _obtener_pool()
+    await asyncio.gather(*(loop.run_in_executor(pool, _preparar) for _ in range(PROCESOS)))
+
+
+def metricas() -> dict:
+    return {
+        "en_espera": _en_espera,
+        "max_cola": MAX_COLA,
+        "max_concurrentes": MAX_CONCURRENTES,
+        **contadores,
+        "latencia_hash_segundos": latencia_hash.resumen(),
+        "espera_cola_segundos": espera_cola.resumen(),
+    }
+
+
+def cerrar():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
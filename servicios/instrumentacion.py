@@ -0,0 +1,185 @@
+"""
+Instrumentación por petición: latencia, sentencias SQL, tiempo en la base y
+espera por una conexión del pool, agrupados por método y ruta (la plantilla de
+FastAPI, p. ej. /transacciones/{id}, no la URL concreta).
+
+`MiddlewareMetricas` abre una `Medicion` en un ContextVar; los hooks
+before/after_cursor_execute de los engines y los pools `*Medido` suman en ella
+(el contexto llega tanto al threadpool de los handlers síncronos como a los
+greenlets de AsyncSession). Al terminar la respuesta se vuelca una sola vez a
+las familias de servicios/metricas.py. Las sentencias fuera de una petición
+(CLI, cron) no se registran.
+
+Además, cada pool registrado con `registrar_pool` expone su ocupación (en uso,
+libres, desborde), su capacidad, la espera por conexión y los timeouts, con la
+etiqueta `pool` (escritura_sync, lectura_async_0, ...).
+"""
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from servicios.metricas import Familia, Medidor
+
+CORTES_SENTENCIAS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+latencia = Familia("lana_http_peticion_segundos", "Duración de la petición hasta enviar el último byte",
+                   ("metodo", "ruta"))
+peticiones = Familia("lana_http_peticiones_total", "Peticiones atendidas", ("metodo", "ruta", "estado"),
+                     tipo="counter")
+sentencias = Familia("lana_sql_sentencias_por_peticion", "Sentencias SQL ejecutadas por petición",
+                     ("metodo", "ruta"), cortes=CORTES_SENTENCIAS)
+sentencias_total = Familia("lana_sql_sentencias_total", "Sentencias SQL ejecutadas", ("metodo", "ruta"),
+                           tipo="counter")
+tiempo_sql = Familia("lana_sql_segundos", "Tiempo en la base por petición", ("metodo", "ruta"))
+espera_pool = Familia("lana_pool_espera_segundos", "Espera por una conexión del pool por petición",
+                      ("metodo", "ruta"))
+espera_por_pool = Familia("lana_pool_checkout_segundos", "Espera por una conexión en cada checkout", ("pool",))
+pool_agotado = Familia("lana_pool_timeouts_total", "Checkouts que agotaron pool_timeout", ("pool",),
+                       tipo="counter")
+
+
+class Medicion:
+    __slots__ = ("sentencias", "sql_segundos", "espera_pool")
+
+    def __init__(self):
+        self.sentencias = 0
+        self.sql_segundos = 0.0
+        self.espera_pool = 0.0
+
+
+_actual: ContextVar = ContextVar("medicion_peticion", default=None)
+
+
+# ---------------- Engine y pool ----------------
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_inicios_sql", []).append(time.perf_counter())
+
+
+def _terminar(conn):
+    inicios = conn.info.get("_inicios_sql")
+    if not inicios:
+        return
+    inicio = inicios.pop()
+    medicion = _actual.get()
+    if medicion is not None:
+        medicion.sentencias += 1
+        medicion.sql_segundos += time.perf_counter() - inicio
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    _terminar(conn)
+
+
+def _al_fallar(contexto):
+    # Una sentencia que falla no llega a after_cursor_execute: sin esto su inicio
+    # quedaría en la conexión del pool y no se contaría
+    if contexto.connection is not None:
+        _terminar(contexto.connection)
+
+
+def instrumentar(engine):
+    """Registra los hooks de ejecución en un Engine (o en `.sync_engine` de un AsyncEngine)."""
+    event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+    event.listen(engine, "handle_error", _al_fallar)
+
+
+class _EsperaMedida:
+    nombre_metricas = "sin_nombre"
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            pool_agotado.con(self.nombre_metricas).incrementar()
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            espera_por_pool.con(self.nombre_metricas).observar(espera)
+            medicion = _actual.get()
+            if medicion is not None:
+                medicion.espera_pool += espera
+
+    def recreate(self):
+        # engine.dispose() reemplaza el pool: el nuevo conserva su nombre en /metrics
+        nuevo = super().recreate()
+        nuevo.nombre_metricas = self.nombre_metricas
+        return nuevo
+
+
+class QueuePoolMedido(_EsperaMedida, QueuePool):
+    pass
+
+
+class AsyncQueuePoolMedido(_EsperaMedida, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines = {}
+
+
+def registrar_pool(nombre: str, engine):
+    """Nombra el pool de `engine` (Engine o `.sync_engine`) y lo incluye en las métricas de ocupación."""
+    engine.pool.nombre_metricas = nombre
+    _engines[nombre] = engine
+
+
+def _ocupacion():
+    for nombre, engine in list(_engines.items()):
+        pool = engine.pool  # se lee en cada scrape: dispose() lo reemplaza
+        yield (nombre, "en_uso"), pool.checkedout()
+        yield (nombre, "libres"), pool.checkedin()
+        yield (nombre, "desborde"), max(pool.overflow(), 0)
+
+
+def _capacidad():
+    for nombre, engine in list(_engines.items()):
+        pool = engine.pool
+        yield (nombre, "pool_size"), pool.size()
+        yield (nombre, "max_overflow"), pool._max_overflow
+
+
+Medidor("lana_pool_conexiones", "Conexiones de cada pool por estado", ("pool", "estado"), _ocupacion)
+Medidor("lana_pool_capacidad", "Tamaño configurado de cada pool", ("pool", "limite"), _capacidad)
+
+
+# ---------------- Middleware ASGI ----------------
+
+class MiddlewareMetricas:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            _actual.reset(token)
+            # APIRoute deja la ruta que coincidió en el scope
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            metodo = scope["method"]
+            latencia.con(metodo, ruta).observar(duracion)
+            peticiones.con(metodo, ruta, str(estado)).incrementar()
+            sentencias.con(metodo, ruta).observar(medicion.sentencias)
+            sentencias_total.con(metodo, ruta).incrementar(medicion.sentencias)
+            tiempo_sql.con(metodo, ruta).observar(medicion.sql_segundos)
+            espera_pool.con(metodo, ruta).observar(medicion.espera_pool)
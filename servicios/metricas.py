@@ -0,0 +1,149 @@
+"""
+Métricas en memoria del proceso: contadores e histogramas acumulativos
+(mismos cortes que usa Prometheus por defecto).
+
+Registrar solo suma en memoria; el texto para Prometheus se arma en `exponer()`,
+es decir, únicamente cuando alguien consulta /metrics. Con varios workers cada
+proceso expone lo suyo.
+"""
+import bisect
+import threading
+
+CORTES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRO = []
+
+
+class Histograma:
+    def __init__(self, cortes=CORTES_SEGUNDOS):
+        self.cortes = cortes
+        self.cubetas = [0] * (len(cortes) + 1)
+        self.cuenta = 0
+        self.suma = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        i = bisect.bisect_left(self.cortes, valor)
+        with self._lock:
+            self.cubetas[i] += 1
+            self.cuenta += 1
+            self.suma += valor
+
+    def resumen(self) -> dict:
+        acumulado, cubetas = 0, {}
+        for corte, n in zip(self.cortes, self.cubetas):
+            acumulado += n
+            cubetas[str(corte)] = acumulado
+        cubetas["+Inf"] = self.cuenta
+        return {"cuenta": self.cuenta, "suma": round(self.suma, 6), "cubetas": cubetas}
+
+    def lineas(self, nombre: str, etiquetas: str = "") -> list:
+        with self._lock:
+            cubetas, cuenta, suma = list(self.cubetas), self.cuenta, self.suma
+        separador = "," if etiquetas else ""
+        lineas, acumulado = [], 0
+        for corte, n in zip(self.cortes, cubetas):
+            acumulado += n
+            lineas.append(f'{nombre}_bucket{{{etiquetas}{separador}le="{corte}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{etiquetas}{separador}le="+Inf"}} {cuenta}')
+        lineas.append(f"{nombre}_sum{_llaves(etiquetas)} {suma}")
+        lineas.append(f"{nombre}_count{_llaves(etiquetas)} {cuenta}")
+        return lineas
+
+
+class Contador:
+    def __init__(self):
+        self.valor = 0
+        self._lock = threading.Lock()
+
+    def incrementar(self, n=1):
+        with self._lock:
+            self.valor += n
+
+    def lineas(self, nombre: str, etiquetas: str = "") -> list:
+        return [f"{nombre}{_llaves(etiquetas)} {self.valor}"]
+
+
+class Familia:
+    """Una métrica con etiquetas: crea un Histograma o Contador por combinación de valores."""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=(), tipo: str = "histogram", cortes=CORTES_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.tipo = tipo
+        self.cortes = cortes
+        self._hijos = {}
+        self._lock = threading.Lock()
+        _REGISTRO.append(self)
+
+    def con(self, *valores):
+        hijo = self._hijos.get(valores)
+        if hijo is None:
+            with self._lock:
+                hijo = self._hijos.get(valores)
+                if hijo is None:
+                    hijo = Histograma(self.cortes) if self.tipo == "histogram" else Contador()
+                    self._hijos[valores] = hijo
+        return hijo
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for valores, hijo in sorted(self._hijos.items()):
+            etiquetas = ",".join(f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, valores))
+            lineas.extend(hijo.lineas(self.nombre, etiquetas))
+        return lineas
+
+
+class Valor:
+    """Métrica sin etiquetas leída al exponer: un Histograma/Contador existente o una función."""
+
+    def __init__(self, nombre: str, ayuda: str, tipo: str, fuente):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self.fuente = fuente
+        _REGISTRO.append(self)
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        if callable(self.fuente):
+            lineas.append(f"{self.nombre} {self.fuente()}")
+        else:
+            lineas.extend(self.fuente.lineas(self.nombre))
+        return lineas
+
+
+class Medidor:
+    """Métrica con etiquetas leída al exponer: `fuente()` devuelve pares (valores de etiquetas, número)."""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas, fuente, tipo: str = "gauge"):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.tipo = tipo
+        self.fuente = fuente
+        _REGISTRO.append(self)
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for valores, numero in sorted(self.fuente()):
+            etiquetas = ",".join(f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, valores))
+            lineas.append(f"{self.nombre}{_llaves(etiquetas)} {numero}")
+        return lineas
+
+
+def exponer() -> str:
+    """Todas las métricas registradas en formato de texto de Prometheus (0.0.4)."""
+    lineas = []
+    for metrica in list(_REGISTRO):
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+
+def _llaves(etiquetas: str) -> str:
+    return f"{{{etiquetas}}}" if etiquetas else ""
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,35 @@
+"""
+Efectos de dar de alta (+1) o de baja (-1) transacciones sobre las tablas derivadas.
+
+Todos los caminos de escritura del ledger llaman a `aplicar_movimientos` con la
+misma sesión y antes del commit, así que los derivados cambian en la misma
+transacción que las filas de `transacciones` (y el índice en memoria de
+servicios/sugerencias, solo si esa transacción confirma).
+"""
+from decimal import Decimal
+
+from servicios import presupuestos, resumen_mensual, saldos, sugerencias
+
+
+def movimiento(transaccion, signo: int) -> dict:
+    """Describe una transacción (objeto ORM) como movimiento con el signo indicado."""
+    return {
+        "usuario_id": transaccion.usuario_id,
+        "cuenta_id": transaccion.cuenta_id,
+        "fecha": transaccion.fecha,
+        "categoria_id": transaccion.categoria_id,
+        "tipo": transaccion.tipo,
+        "descripcion": transaccion.descripcion,
+        "monto": Decimal(transaccion.monto),
+        "signo": signo,
+    }
+
+
+def aplicar_movimientos(db, movimientos):
+    movimientos = list(movimientos)
+    if not movimientos:
+        return
+    resumen_mensual.registrar_movimientos(db, movimientos)
+    presupuestos.registrar_movimientos(db, movimientos)
+    saldos.registrar_movimientos(db, movimientos)
+    sugerencias.registrar_movimientos(db, movimientos)
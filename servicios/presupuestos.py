@@ -0,0 +1,212 @@
+"""
+Mantenimiento de presupuestos.monto_actual (lo gastado en la categoría ese mes).
+
+Los handlers de transacciones aplican deltas atómicos (`monto_actual + :delta`)
+a la fila (usuario_id, categoria_id, mes, anio) correspondiente antes de su commit.
+Solo cuentan los egresos. Para reparar deriva de todos los usuarios a la vez:
+
+    python -m servicios.presupuestos recalcular [--usuario ID]
+
+Altas masivas en una sentencia, con la clave única (usuario_id, anio, mes, categoria_id):
+`guardar_lote` (upsert de N presupuestos) y `clonar` (INSERT ... SELECT de un mes a
+otro). El cierre de mes de todos los usuarios es una sola consulta:
+
+    python -m servicios.presupuestos clonar [--mes M --anio A] [--usuario ID] [--sobrescribir]
+"""
+import argparse
+from collections import defaultdict
+from decimal import Decimal
+
+from datetime import date
+
+from sqlalchemy import bindparam, extract, func, literal, select, text, tuple_, update
+
+from DB.conexion import marcar_escritura
+from DB.dialecto import insertar_sin_duplicados, nombre_dialecto, upsert
+from models.modelsDB import Presupuesto, ResumenMensual, Transaccion
+
+_tabla = Presupuesto.__table__
+_CLAVES = ["usuario_id", "anio", "mes", "categoria_id"]
+
+_SQL_DELTA = (
+    update(_tabla)
+    .where(
+        _tabla.c.usuario_id == bindparam("u"),
+        _tabla.c.categoria_id == bindparam("c"),
+        _tabla.c.mes == bindparam("m"),
+        _tabla.c.anio == bindparam("a"),
+    )
+    .values(monto_actual=func.coalesce(_tabla.c.monto_actual, 0) + bindparam("delta"))
+)
+
+
+def registrar_movimientos(db, movimientos):
+    deltas = defaultdict(Decimal)
+    for m in movimientos:
+        if m["tipo"] != "egreso" or m["categoria_id"] is None:
+            continue
+        deltas[(m["usuario_id"], m["categoria_id"], m["fecha"].month, m["fecha"].year)] += m["monto"] * m["signo"]
+
+    # Orden fijo de claves: dos escrituras concurrentes bloquean las filas en el mismo orden
+    filas = [
+        {"u": u, "c": c, "m": mes, "a": anio, "delta": delta}
+        for (u, c, mes, anio), delta in sorted(deltas.items())
+        if delta
+    ]
+    if filas:
+        db.execute(_SQL_DELTA, filas)
+
+
+def recalcular(db, usuario_id=None, categoria_id=None, mes=None, anio=None) -> int:
+    """
+    Recalcula monto_actual desde el ledger en una sola sentencia para todos los
+    presupuestos que cumplan los filtros. Devuelve las filas alcanzadas.
+    """
+    filtros = {"usuario_id": usuario_id, "categoria_id": categoria_id, "mes": mes, "anio": anio}
+    filtros = {k: v for k, v in filtros.items() if v is not None}
+    marcar_escritura(db, *([usuario_id] if usuario_id is not None else []))
+
+    if nombre_dialecto(db) == "mysql":
+        # UPDATE ... JOIN contra el agregado: un solo recorrido del ledger
+        where_p = "".join(f" AND p.{k} = :{k}" for k in filtros)
+        where_t = " AND usuario_id = :usuario_id" if "usuario_id" in filtros else ""
+        resultado = db.execute(text(f"""
+            UPDATE presupuestos p
+            LEFT JOIN (
+                SELECT usuario_id, categoria_id, YEAR(fecha) AS anio, MONTH(fecha) AS mes, SUM(monto) AS total
+                FROM transacciones
+                WHERE tipo = 'egreso' AND categoria_id IS NOT NULL{where_t}
+                GROUP BY usuario_id, categoria_id, YEAR(fecha), MONTH(fecha)
+            ) g ON g.usuario_id = p.usuario_id AND g.categoria_id = p.categoria_id
+               AND g.anio = p.anio AND g.mes = p.mes
+            SET p.monto_actual = COALESCE(g.total, 0)
+            WHERE 1 = 1{where_p}
+        """), filtros)
+        return resultado.rowcount
+
+    gastado = (
+        select(func.coalesce(func.sum(Transaccion.monto), 0))
+        .where(
+            Transaccion.usuario_id == _tabla.c.usuario_id,
+            Transaccion.categoria_id == _tabla.c.categoria_id,
+            Transaccion.tipo == "egreso",
+            extract("year", Transaccion.fecha) == _tabla.c.anio,
+            extract("month", Transaccion.fecha) == _tabla.c.mes,
+        )
+        .scalar_subquery()
+    )
+    stmt = update(_tabla).values(monto_actual=gastado)
+    for columna, valor in filtros.items():
+        stmt = stmt.where(_tabla.c[columna] == valor)
+    return db.execute(stmt).rowcount
+
+
+def _gastado_resumen(usuario_id, anio, mes, categoria_id):
+    """Egresos del mes en la categoría según resumen_mensual (búsqueda por su clave primaria)."""
+    return func.coalesce(
+        select(ResumenMensual.total)
+        .where(ResumenMensual.usuario_id == usuario_id, ResumenMensual.anio == anio,
+               ResumenMensual.mes == mes, ResumenMensual.categoria_id == categoria_id,
+               ResumenMensual.tipo == "egreso")
+        .scalar_subquery(),
+        0,
+    )
+
+
+def _actualizar_monto(nueva):
+    # El upsert no aplica onupdate: actualizado_en se fija aquí (lo sigue servicios/alertas)
+    return {"monto": nueva.monto, "actualizado_en": func.current_timestamp()}
+
+
+def mes_siguiente(mes: int, anio: int) -> tuple:
+    return (1, anio + 1) if mes == 12 else (mes + 1, anio)
+
+
+def consulta_clonar(mes, anio, mes_destino, anio_destino, usuario_id=None):
+    """Filas (en el orden de _CLAVES + monto, monto_actual) que `clonar` inserta en el destino."""
+    origen = _tabla.alias("origen")
+    filas = select(
+        origen.c.usuario_id,
+        literal(anio_destino),
+        literal(mes_destino),
+        origen.c.categoria_id,
+        origen.c.monto,
+        _gastado_resumen(origen.c.usuario_id, anio_destino, mes_destino, origen.c.categoria_id),
+    ).where(origen.c.mes == mes, origen.c.anio == anio)
+    if usuario_id is not None:
+        filas = filas.where(origen.c.usuario_id == usuario_id)
+    return filas
+
+
+def clonar(db, mes, anio, mes_destino, anio_destino, usuario_id=None, sobrescribir=False) -> int:
+    """
+    Copia los presupuestos de (mes, anio) a (mes_destino, anio_destino) con un solo
+    INSERT ... SELECT, para un usuario o para todos. Los que ya existen en el destino
+    se conservan, o con `sobrescribir` toman el monto del origen. monto_actual de los
+    nuevos sale de resumen_mensual. Devuelve las filas que reporta la base.
+    """
+    filas = consulta_clonar(mes, anio, mes_destino, anio_destino, usuario_id)
+    if sobrescribir:
+        stmt = upsert(db, _tabla, _CLAVES, _actualizar_monto)
+    else:
+        stmt = insertar_sin_duplicados(db, _tabla, _CLAVES)
+    marcar_escritura(db, *([usuario_id] if usuario_id is not None else []))
+    return db.execute(stmt.from_select(_CLAVES + ["monto", "monto_actual"], filas)).rowcount
+
+
+def guardar_lote(db, presupuestos) -> list:
+    """
+    Upsert de N presupuestos (dicts con usuario_id, categoria_id, mes, anio, monto) en
+    una sola sentencia: los existentes cambian su monto, los nuevos toman monto_actual
+    de resumen_mensual. Devuelve las claves escritas (usuario_id, anio, mes, categoria_id).
+    """
+    # Si una clave se repite gana la última; orden fijo de claves, como en los deltas
+    por_clave = {tuple(p[c] for c in _CLAVES): p["monto"] for p in presupuestos}
+    claves = sorted(por_clave)
+    if not claves:
+        return []
+
+    resumen = ResumenMensual.__table__
+    columnas = [resumen.c[c] for c in _CLAVES]
+    gastado = dict(
+        (tuple(fila[:-1]), fila[-1])
+        for fila in db.execute(
+            select(*columnas, resumen.c.total)
+            .where(tuple_(*columnas).in_(claves), resumen.c.tipo == "egreso")
+        )
+    )
+    filas = [
+        {**dict(zip(_CLAVES, clave)), "monto": por_clave[clave], "monto_actual": gastado.get(clave, 0)}
+        for clave in claves
+    ]
+    db.execute(upsert(db, _tabla, _CLAVES, _actualizar_monto), filas)
+    return claves
+
+
+if __name__ == "__main__":
+    from DB.conexion import Session
+    from servicios import cache_usuario  # noqa: F401 (el commit invalida el nivel compartido de caché)
+
+    parser = argparse.ArgumentParser(description="Recalcula monto_actual o clona presupuestos de un mes al siguiente")
+    parser.add_argument("accion", choices=["recalcular", "clonar"])
+    parser.add_argument("--usuario", type=int, default=None)
+    parser.add_argument("--mes", type=int, default=None, help="Mes de origen al clonar (por defecto, el actual)")
+    parser.add_argument("--anio", type=int, default=None)
+    parser.add_argument("--sobrescribir", action="store_true", help="Al clonar, actualiza el monto de los que ya existen")
+    args = parser.parse_args()
+
+    db = Session()
+    try:
+        if args.accion == "clonar":
+            hoy = date.today()
+            mes, anio = args.mes or hoy.month, args.anio or hoy.year
+            destino = mes_siguiente(mes, anio)
+            n = clonar(db, mes, anio, *destino, usuario_id=args.usuario, sobrescribir=args.sobrescribir)
+            db.commit()
+            print(f"{n} presupuestos clonados de {mes:02d}/{anio} a {destino[0]:02d}/{destino[1]}")
+        else:
+            n = recalcular(db, usuario_id=args.usuario)
+            db.commit()
+            print(f"{n} presupuestos recalculados")
+    finally:
+        db.close()
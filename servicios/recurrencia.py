@@ -0,0 +1,92 @@
+"""
+Aritmética de fechas para las series de PagoFijo y TransaccionRecurrente.
+
+Las series por días se generan como rangos de ordinales (sin iterar fecha por
+fecha) y las mensuales como índices de mes; en ambos casos los conteos por mes
+salen de una fórmula cerrada, así que su costo depende de los meses del
+horizonte y no de cuántas ocurrencias haya.
+"""
+import calendar
+from datetime import date
+
+# tipo_recurrencia -> (unidad, paso)
+PASOS = {
+    "diaria": ("dias", 1),
+    "semanal": ("dias", 7),
+    "quincenal": ("dias", 15),
+    "mensual": ("meses", 1),
+    "bimestral": ("meses", 2),
+    "trimestral": ("meses", 3),
+    "semestral": ("meses", 6),
+    "anual": ("meses", 12),
+}
+
+
+def _indice_mes(fecha: date) -> int:
+    return fecha.year * 12 + fecha.month - 1
+
+
+def _fecha_de_indice(indice: int, dia: int) -> date:
+    anio, mes = divmod(indice, 12)
+    mes += 1
+    return date(anio, mes, min(dia, calendar.monthrange(anio, mes)[1]))
+
+
+def ocurrencias(tipo: str, primera: date, hasta: date, dia_ancla: int = None):
+    """
+    Fechas de la serie que empieza en `primera` (incluida) hasta `hasta` inclusive,
+    y la primera fecha posterior a `hasta`. En las series mensuales el día se
+    ancla a `dia_ancla` (p. ej. el de fecha_inicio) y se recorta a fin de mes.
+    """
+    unidad, paso = PASOS[tipo]
+    if primera > hasta:
+        return [], primera
+
+    if unidad == "dias":
+        ordinales = range(primera.toordinal(), hasta.toordinal() + 1, paso)
+        return [date.fromordinal(o) for o in ordinales], date.fromordinal(ordinales[-1] + paso)
+
+    dia = dia_ancla or primera.day
+    base = _indice_mes(primera)
+    indices = range(base, _indice_mes(hasta) + 1, paso)
+    fechas = [primera] + [_fecha_de_indice(i, dia) for i in indices[1:]]
+    if fechas[-1] > hasta:
+        fechas.pop()
+    return fechas, _fecha_de_indice(base + len(fechas) * paso, dia)
+
+
+def conteo_por_mes(tipo: str, primera: date, desde: date, hasta: date, dia_ancla: int = None) -> dict:
+    """
+    {(anio, mes): ocurrencias} de la serie que empieza en `primera`, contando solo
+    las fechas dentro de [desde, hasta]. No genera las fechas: O(meses del rango).
+    """
+    unidad, paso = PASOS[tipo]
+    conteo = {}
+    desde = max(desde, primera)
+    if desde > hasta:
+        return conteo
+
+    if unidad == "dias":
+        origen = primera.toordinal()
+        for i in range(_indice_mes(desde), _indice_mes(hasta) + 1):
+            anio, mes = divmod(i, 12)
+            inicio = max(date(anio, mes + 1, 1), desde).toordinal()
+            fin = min(date(anio, mes + 1, calendar.monthrange(anio, mes + 1)[1]), hasta).toordinal()
+            # k tales que origen + k*paso cae en [inicio, fin]
+            primero = -((origen - inicio) // paso)
+            ultimo = (fin - origen) // paso
+            n = ultimo - primero + 1
+            if n > 0:
+                conteo[(anio, mes + 1)] = n
+        return conteo
+
+    dia = dia_ancla or primera.day
+    base = _indice_mes(primera)
+    for i in range(_indice_mes(desde), _indice_mes(hasta) + 1):
+        k = i - base
+        if k < 0 or k % paso:
+            continue
+        fecha = primera if k == 0 else _fecha_de_indice(i, dia)
+        if desde <= fecha <= hasta:
+            conteo[(fecha.year, fecha.month)] = 1
+    return conteo
@@ -0,0 +1,144 @@
+"""
+Materializa en `transacciones` las ocurrencias vencidas de pagos_fijos y
+transacciones_recurrentes, y avanza su proxima_fecha.
+
+    python -m servicios.recurrentes [--hasta AAAA-MM-DD] [--lote 1000]
+
+Pensado para un cron diario. Cada lote (inserción de transacciones, derivados y
+avance de proxima_fecha) se confirma en una sola transacción, y el avance solo
+se aplica si proxima_fecha sigue siendo la que se leyó: si una corrida se cae o
+dos corren a la vez, volver a ejecutar retoma donde quedó sin duplicar nada.
+"""
+import argparse
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, insert, select, update
+
+from models.modelsDB import PagoFijo, Transaccion, TransaccionRecurrente
+from servicios.movimientos import aplicar_movimientos
+from servicios.recurrencia import ocurrencias
+
+LOTE = 1000
+
+
+class ConflictoDeAvance(Exception):
+    """Otra corrida avanzó alguno de los programas del lote."""
+
+
+def _pagos_fijos(db, hasta, despues_de, lote):
+    # Usa ix_pagos_fijos_activo_proxima_fecha
+    return db.execute(
+        select(
+            PagoFijo.id, PagoFijo.usuario_id, PagoFijo.cuenta_id, PagoFijo.categoria_id,
+            PagoFijo.descripcion, PagoFijo.monto, PagoFijo.tipo_recurrencia,
+            PagoFijo.fecha_inicio, PagoFijo.proxima_fecha,
+        )
+        .where(PagoFijo.activo.is_(True), PagoFijo.proxima_fecha <= hasta, PagoFijo.id > despues_de)
+        .order_by(PagoFijo.id)
+        .limit(lote)
+    ).all()
+
+
+def _recurrentes(db, hasta, despues_de, lote):
+    # Usa ix_transacciones_recurrentes_activa_proxima_fecha
+    return db.execute(
+        select(
+            TransaccionRecurrente.id, TransaccionRecurrente.usuario_id, TransaccionRecurrente.cuenta_id,
+            TransaccionRecurrente.categoria_id, TransaccionRecurrente.descripcion, TransaccionRecurrente.monto,
+            TransaccionRecurrente.tipo, TransaccionRecurrente.tipo_recurrencia,
+            TransaccionRecurrente.fecha_inicio, TransaccionRecurrente.fecha_fin,
+            TransaccionRecurrente.proxima_fecha,
+        )
+        .where(
+            TransaccionRecurrente.activa.is_(True),
+            TransaccionRecurrente.proxima_fecha <= hasta,
+            TransaccionRecurrente.tipo_recurrencia.isnot(None),
+            TransaccionRecurrente.cuenta_id.isnot(None),
+            TransaccionRecurrente.id > despues_de,
+        )
+        .order_by(TransaccionRecurrente.id)
+        .limit(lote)
+    ).all()
+
+
+def _avanzar(db, tabla, columna_activa, avances):
+    if not avances:
+        return
+    stmt = (
+        update(tabla)
+        .where(tabla.c.id == bindparam("_id"), tabla.c.proxima_fecha == bindparam("_anterior"))
+        .values({"proxima_fecha": bindparam("_siguiente"), columna_activa: bindparam("_activo")})
+    )
+    resultado = db.execute(stmt, avances)
+    if 0 <= resultado.rowcount < len(avances):
+        raise ConflictoDeAvance()
+
+
+def _procesar_lote(db, programas, tabla, columna_activa, hasta, ahora):
+    filas, avances = [], []
+    for p in programas:
+        tope = min(hasta, p.fecha_fin) if getattr(p, "fecha_fin", None) else hasta
+        fechas, siguiente = ocurrencias(p.tipo_recurrencia, p.proxima_fecha, tope, p.fecha_inicio.day)
+        tipo = getattr(p, "tipo", "egreso")
+        filas.extend({
+            "usuario_id": p.usuario_id,
+            "cuenta_id": p.cuenta_id,
+            "categoria_id": p.categoria_id,
+            "monto": p.monto,
+            "tipo": tipo,
+            "descripcion": p.descripcion,
+            "fecha": fecha,
+            "creado_en": ahora,
+        } for fecha in fechas)
+        terminado = getattr(p, "fecha_fin", None) is not None and siguiente > p.fecha_fin
+        avances.append({"_id": p.id, "_anterior": p.proxima_fecha, "_siguiente": siguiente, "_activo": not terminado})
+
+    if filas:
+        db.execute(insert(Transaccion), filas)
+        aplicar_movimientos(db, ({**f, "signo": 1} for f in filas))
+    _avanzar(db, tabla, columna_activa, avances)
+    return len(filas)
+
+
+def materializar(crear_sesion, hasta: date = None, lote: int = LOTE) -> dict:
+    hasta = hasta or date.today()
+    resumen = {"programas": 0, "transacciones": 0, "lotes_en_conflicto": 0}
+
+    fuentes = (
+        (_pagos_fijos, PagoFijo.__table__, "activo"),
+        (_recurrentes, TransaccionRecurrente.__table__, "activa"),
+    )
+    for leer, tabla, columna_activa in fuentes:
+        ultimo_id = 0
+        while True:
+            db = crear_sesion()
+            try:
+                programas = leer(db, hasta, ultimo_id, lote)
+                if not programas:
+                    break
+                ultimo_id = programas[-1].id
+                try:
+                    creadas = _procesar_lote(db, programas, tabla, columna_activa, hasta, datetime.now())
+                    db.commit()
+                except ConflictoDeAvance:
+                    # Otra corrida ya los procesó; se descarta el lote completo
+                    db.rollback()
+                    resumen["lotes_en_conflicto"] += 1
+                    continue
+                resumen["programas"] += len(programas)
+                resumen["transacciones"] += creadas
+            finally:
+                db.close()
+    return resumen
+
+
+if __name__ == "__main__":
+    from DB.conexion import Session
+    from servicios import cache_usuario  # noqa: F401 (el commit invalida el nivel compartido de caché)
+
+    parser = argparse.ArgumentParser(description="Genera las transacciones de pagos fijos y recurrentes vencidos")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None, help="Fecha de corte (hoy por defecto)")
+    parser.add_argument("--lote", type=int, default=LOTE)
+    args = parser.parse_args()
+
+    print(materializar(Session, args.hasta, args.lote))
@@ -0,0 +1,142 @@
+"""
+Mantenimiento de la tabla resumen_mensual (totales por usuario, mes, categoría y tipo).
+
+Se actualiza desde servicios/movimientos.py dentro de la transacción de cada
+escritura del ledger, antes del commit. Para reparar o auditar la tabla:
+
+    python -m servicios.resumen_mensual verificar [--usuario ID]
+    python -m servicios.resumen_mensual reconstruir [--usuario ID]
+"""
+import argparse
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import select, delete, insert, extract, func, and_
+
+from DB.conexion import marcar_escritura
+from DB.dialecto import upsert
+from models.modelsDB import ResumenMensual, Transaccion
+
+_tabla = ResumenMensual.__table__
+_CLAVES = ["usuario_id", "anio", "mes", "categoria_id", "tipo"]
+
+
+def registrar_movimientos(db, movimientos):
+    """Acumula los movimientos por clave y los aplica con un único upsert por lotes."""
+    deltas = defaultdict(lambda: [Decimal(0), 0])
+    for m in movimientos:
+        if m["categoria_id"] is None:
+            continue
+        clave = (m["usuario_id"], m["fecha"].year, m["fecha"].month, m["categoria_id"], m["tipo"])
+        deltas[clave][0] += m["monto"] * m["signo"]
+        deltas[clave][1] += m["signo"]
+
+    filas = [
+        dict(zip(_CLAVES, clave), total=total, num_transacciones=cantidad)
+        for clave, (total, cantidad) in deltas.items()
+        if total or cantidad
+    ]
+    if not filas:
+        return
+
+    stmt = upsert(db, _tabla, _CLAVES, lambda nueva: {
+        "total": _tabla.c.total + nueva.total,
+        "num_transacciones": _tabla.c.num_transacciones + nueva.num_transacciones,
+    })
+    db.execute(stmt, filas)
+
+
+def _agregado_ledger(usuario_id=None):
+    anio = extract("year", Transaccion.fecha)
+    mes = extract("month", Transaccion.fecha)
+    consulta = (
+        select(
+            Transaccion.usuario_id.label("usuario_id"),
+            anio.label("anio"),
+            mes.label("mes"),
+            Transaccion.categoria_id.label("categoria_id"),
+            Transaccion.tipo.label("tipo"),
+            func.sum(Transaccion.monto).label("total"),
+            func.count().label("num_transacciones"),
+        )
+        .where(Transaccion.categoria_id.isnot(None))
+        .group_by(Transaccion.usuario_id, anio, mes, Transaccion.categoria_id, Transaccion.tipo)
+    )
+    if usuario_id is not None:
+        consulta = consulta.where(Transaccion.usuario_id == usuario_id)
+    return consulta
+
+
+def reconstruir(db, usuario_id=None):
+    """Recalcula la tabla desde cero a partir de transacciones (INSERT ... SELECT)."""
+    marcar_escritura(db, *([usuario_id] if usuario_id is not None else []))
+    borrar = delete(_tabla)
+    if usuario_id is not None:
+        borrar = borrar.where(_tabla.c.usuario_id == usuario_id)
+    db.execute(borrar)
+    db.execute(insert(_tabla).from_select(_CLAVES + ["total", "num_transacciones"], _agregado_ledger(usuario_id)))
+
+
+def verificar(db, usuario_id=None):
+    """
+    Compara la tabla con el ledger y devuelve las claves que difieren como
+    (clave, (total, num) esperado, (total, num) almacenado).
+    """
+    esperado = _agregado_ledger(usuario_id).subquery()
+    almacenado = select(_tabla)
+    if usuario_id is not None:
+        almacenado = almacenado.where(_tabla.c.usuario_id == usuario_id)
+    almacenado = almacenado.subquery()
+
+    def mismas_claves(a, b):
+        return and_(*(a.c[c] == b.c[c] for c in _CLAVES))
+
+    # Sin FULL OUTER JOIN en MySQL: se revisan ambos lados con LEFT JOIN
+    faltantes_o_distintas = (
+        select(esperado, almacenado.c.total.label("total_tabla"), almacenado.c.num_transacciones.label("num_tabla"))
+        .select_from(esperado.outerjoin(almacenado, mismas_claves(esperado, almacenado)))
+        .where((almacenado.c.total.is_(None))
+               | (almacenado.c.total != esperado.c.total)
+               | (almacenado.c.num_transacciones != esperado.c.num_transacciones))
+    )
+    sobrantes = (
+        select(almacenado)
+        .select_from(almacenado.outerjoin(esperado, mismas_claves(esperado, almacenado)))
+        .where(esperado.c.usuario_id.is_(None))
+        .where((almacenado.c.total != 0) | (almacenado.c.num_transacciones != 0))
+    )
+
+    diferencias = []
+    for r in db.execute(faltantes_o_distintas):
+        clave = tuple(r._mapping[c] for c in _CLAVES)
+        diferencias.append((clave, (r.total, r.num_transacciones), (r.total_tabla, r.num_tabla)))
+    for r in db.execute(sobrantes):
+        clave = tuple(r._mapping[c] for c in _CLAVES)
+        diferencias.append((clave, (Decimal(0), 0), (r.total, r.num_transacciones)))
+    return diferencias
+
+
+if __name__ == "__main__":
+    from DB.conexion import Session
+    from servicios import cache_usuario  # noqa: F401 (el commit invalida el nivel compartido de caché)
+
+    parser = argparse.ArgumentParser(description="Verifica o reconstruye resumen_mensual")
+    parser.add_argument("accion", choices=["verificar", "reconstruir"])
+    parser.add_argument("--usuario", type=int, default=None)
+    args = parser.parse_args()
+
+    db = Session()
+    try:
+        diferencias = verificar(db, args.usuario)
+        for clave, esperado, almacenado in diferencias:
+            print(f"deriva {clave}: ledger={esperado} tabla={almacenado}")
+        print(f"{len(diferencias)} claves con deriva")
+
+        if args.accion == "reconstruir":
+            reconstruir(db, args.usuario)
+            db.commit()
+            print("resumen_mensual reconstruida")
+        elif diferencias:
+            raise SystemExit(1)
+    finally:
+        db.close()
@@ -0,0 +1,224 @@
+"""
+Saldos de las cuentas a partir del ledger (ingreso suma, egreso resta,
+transferencia suma su monto con signo) más cuentas.saldo_inicial, el saldo de
+apertura que no tiene transacciones detrás.
+
+- cuentas.saldo_actual: los handlers de transacciones aplican deltas atómicos
+  (`saldo_actual + :delta`) desde servicios/movimientos, en orden de cuenta_id, así
+  que dos escrituras concurrentes bloquean las mismas filas en el mismo orden.
+- saldos_corte: saldo de cada cuenta al cierre de una fecha. Un job periódico los
+  crea; una transacción con fecha anterior a cortes existentes les aplica su delta.
+- saldo_en(): último corte hasta la fecha (o saldo_inicial si no hay) + movimientos
+  de la cuenta desde ese corte, así que el costo depende de la actividad reciente y no de toda la historia.
+
+    python -m servicios.saldos cortar [--fecha AAAA-MM-DD]   # por defecto, fin del mes anterior
+    python -m servicios.saldos verificar                     # exit 1 si hay deriva
+    python -m servicios.saldos reparar
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, bindparam, case, delete, func, insert, literal, select, union_all, update
+
+from DB.conexion import marcar_escritura
+from models.modelsDB import Cuenta, SaldoCorte, Transaccion
+
+_cuentas = Cuenta.__table__
+_cortes = SaldoCorte.__table__
+
+# Diferencia menor a un centavo: SQLite suma DECIMAL como REAL
+TOLERANCIA = Decimal("0.005")
+
+efecto = case((Transaccion.tipo == "egreso", -Transaccion.monto), else_=Transaccion.monto)
+
+_SQL_SALDO = (
+    update(_cuentas)
+    .where(_cuentas.c.id == bindparam("c"))
+    .values(saldo_actual=_cuentas.c.saldo_actual + bindparam("delta"))
+)
+
+_SQL_CORTES = (
+    update(_cortes)
+    .where(_cortes.c.cuenta_id == bindparam("c"), _cortes.c.fecha >= bindparam("f"))
+    .values(saldo=_cortes.c.saldo + bindparam("delta"))
+)
+
+
+def _efecto(m) -> Decimal:
+    return m["monto"] * m["signo"] * (-1 if m["tipo"] == "egreso" else 1)
+
+
+def registrar_movimientos(db, movimientos):
+    por_cuenta = defaultdict(Decimal)
+    por_fecha = defaultdict(Decimal)
+    for m in movimientos:
+        if m["cuenta_id"] is None:
+            continue
+        delta = _efecto(m)
+        por_cuenta[m["cuenta_id"]] += delta
+        por_fecha[(m["cuenta_id"], m["fecha"])] += delta
+
+    saldos = [{"c": c, "delta": delta} for c, delta in sorted(por_cuenta.items()) if delta]
+    if not saldos:
+        return
+    db.execute(_SQL_SALDO, saldos)
+    # Casi siempre la fecha es posterior al último corte y no alcanza ninguna fila
+    cortes = [{"c": c, "f": f, "delta": delta} for (c, f), delta in sorted(por_fecha.items()) if delta]
+    if cortes:
+        db.execute(_SQL_CORTES, cortes)
+
+
+def consulta_corte(cuenta_id, fecha):
+    return (
+        select(SaldoCorte.fecha, SaldoCorte.saldo)
+        .where(SaldoCorte.cuenta_id == cuenta_id, SaldoCorte.fecha <= fecha)
+        .order_by(SaldoCorte.fecha.desc())
+        .limit(1)
+    )
+
+
+def consulta_movimientos(cuenta_id, desde, hasta):
+    """Suma de los movimientos de la cuenta con fecha en (desde, hasta]; desde None = sin corte."""
+    consulta = select(func.coalesce(func.sum(efecto), 0)).where(
+        Transaccion.cuenta_id == cuenta_id, Transaccion.fecha <= hasta
+    )
+    if desde is not None:
+        consulta = consulta.where(Transaccion.fecha > desde)
+    return consulta
+
+
+async def saldo_en(db, cuenta_id: int, fecha: date) -> dict:
+    """Saldo al cierre de `fecha` (sesión async) y la fecha del corte del que partió."""
+    corte = (await db.execute(consulta_corte(cuenta_id, fecha))).first()
+    if corte:
+        desde, base = corte.fecha, Decimal(corte.saldo)
+    else:
+        inicial = (await db.execute(select(Cuenta.saldo_inicial).where(Cuenta.id == cuenta_id))).scalar()
+        desde, base = None, Decimal(inicial or 0)
+    suma = (await db.execute(consulta_movimientos(cuenta_id, desde, fecha))).scalar()
+    return {"saldo": base + Decimal(suma), "corte": desde}
+
+
+def cortar(db, fecha: date) -> int:
+    """
+    Crea (o rehace) el corte de `fecha` para todas las cuentas en una sola sentencia:
+    corte anterior (o saldo_inicial) + movimientos entre ambos. Devuelve las filas insertadas.
+    """
+    anterior = (
+        select(func.max(_cortes.c.fecha))
+        .where(_cortes.c.cuenta_id == _cuentas.c.id, _cortes.c.fecha < fecha)
+        .scalar_subquery()
+    )
+    base = _cortes.alias("base")
+    movimientos = (
+        select(func.coalesce(func.sum(efecto), 0))
+        .where(
+            Transaccion.cuenta_id == _cuentas.c.id,
+            Transaccion.fecha <= fecha,
+            (base.c.fecha.is_(None)) | (Transaccion.fecha > base.c.fecha),
+        )
+        .scalar_subquery()
+    )
+    nuevos = select(
+        _cuentas.c.id, literal(fecha, SaldoCorte.fecha.type), func.coalesce(base.c.saldo, _cuentas.c.saldo_inicial) + movimientos
+    ).select_from(_cuentas.outerjoin(base, and_(base.c.cuenta_id == _cuentas.c.id, base.c.fecha == anterior)))
+
+    db.execute(delete(_cortes).where(_cortes.c.fecha == fecha))
+    return db.execute(insert(_cortes).from_select(["cuenta_id", "fecha", "saldo"], nuevos)).rowcount
+
+
+def verificar(db) -> list:
+    """
+    Compara saldo_actual y cada corte con saldo_inicial + ledger. Un solo recorrido de
+    transacciones: suma acumulada por cuenta y día (con los días de corte
+    agregados en cero) cruzada con los cortes. Devuelve
+    (cuenta_id, fecha o None para saldo_actual, esperado, almacenado).
+    """
+    diferencias = []
+
+    ledger = (
+        select(Transaccion.cuenta_id, func.sum(efecto).label("total"))
+        .group_by(Transaccion.cuenta_id)
+        .subquery()
+    )
+    esperado = _cuentas.c.saldo_inicial + func.coalesce(ledger.c.total, 0)
+    for r in db.execute(
+        select(_cuentas.c.id, esperado.label("esperado"), _cuentas.c.saldo_actual)
+        .select_from(_cuentas.outerjoin(ledger, ledger.c.cuenta_id == _cuentas.c.id))
+        .where(func.abs(_cuentas.c.saldo_actual - esperado) >= TOLERANCIA)
+    ):
+        diferencias.append((r.id, None, r.esperado, r.saldo_actual))
+
+    dias = union_all(
+        select(Transaccion.cuenta_id, Transaccion.fecha, efecto.label("efecto")),
+        select(_cortes.c.cuenta_id, _cortes.c.fecha, literal(0).label("efecto")),
+    ).subquery()
+    acumulado = (
+        select(
+            dias.c.cuenta_id,
+            dias.c.fecha,
+            func.sum(func.sum(dias.c.efecto)).over(partition_by=dias.c.cuenta_id, order_by=dias.c.fecha)
+            .label("acumulado"),
+        )
+        .group_by(dias.c.cuenta_id, dias.c.fecha)
+        .subquery()
+    )
+    esperado = _cuentas.c.saldo_inicial + acumulado.c.acumulado
+    for r in db.execute(
+        select(_cortes.c.cuenta_id, _cortes.c.fecha, esperado.label("esperado"), _cortes.c.saldo)
+        .join(acumulado, and_(acumulado.c.cuenta_id == _cortes.c.cuenta_id, acumulado.c.fecha == _cortes.c.fecha))
+        .join(_cuentas, _cuentas.c.id == _cortes.c.cuenta_id)
+        .where(func.abs(_cortes.c.saldo - esperado) >= TOLERANCIA)
+    ):
+        diferencias.append((r.cuenta_id, r.fecha, r.esperado, r.saldo))
+    return diferencias
+
+
+def reparar(db):
+    """Recalcula saldo_actual y todos los cortes desde saldo_inicial + ledger; saldo_inicial no se toca."""
+    marcar_escritura(db)
+    db.execute(update(_cuentas).values(saldo_actual=_cuentas.c.saldo_inicial + (
+        select(func.coalesce(func.sum(efecto), 0))
+        .where(Transaccion.cuenta_id == _cuentas.c.id)
+        .scalar_subquery()
+    )))
+    inicial = select(_cuentas.c.saldo_inicial).where(_cuentas.c.id == _cortes.c.cuenta_id).scalar_subquery()
+    db.execute(update(_cortes).values(saldo=inicial + (
+        select(func.coalesce(func.sum(efecto), 0))
+        .where(Transaccion.cuenta_id == _cortes.c.cuenta_id, Transaccion.fecha <= _cortes.c.fecha)
+        .scalar_subquery()
+    )))
+
+
+if __name__ == "__main__":
+    from DB.conexion import Session
+
+    parser = argparse.ArgumentParser(description="Cortes de saldo y conciliación de cuentas contra el ledger")
+    parser.add_argument("accion", choices=["cortar", "verificar", "reparar"])
+    parser.add_argument("--fecha", type=date.fromisoformat, default=None,
+                        help="Fecha del corte (AAAA-MM-DD); por defecto, el último día del mes anterior")
+    args = parser.parse_args()
+
+    db = Session()
+    try:
+        if args.accion == "cortar":
+            fecha = args.fecha or date.today().replace(day=1) - timedelta(days=1)
+            n = cortar(db, fecha)
+            db.commit()
+            print(f"{n} cortes al {fecha.isoformat()}")
+        else:
+            diferencias = verificar(db)
+            for cuenta_id, fecha, esperado, almacenado in diferencias:
+                print(f"deriva cuenta {cuenta_id} {fecha or 'saldo_actual'}: esperado={esperado} tabla={almacenado}")
+            print(f"{len(diferencias)} saldos con deriva")
+
+            if args.accion == "reparar":
+                reparar(db)
+                db.commit()
+                print("saldos reparados")
+            elif diferencias:
+                raise SystemExit(1)
+    finally:
+        db.close()
@@ -0,0 +1,84 @@
+"""
+Serialización directa de filas de SQLAlchemy Core a JSON, sin ORM ni validación
+de Pydantic por fila.
+
+`Serializador(Modelo)` lee una sola vez los campos del modelo de respuesta y
+genera una función que convierte cada tupla (en el orden de esos campos) en un
+dict con las mismas conversiones que haría FastAPI: Decimal -> str y constr con
+strip_whitespace recortado. El JSON resultante es idéntico, byte a byte, al de
+`response_model` + JSONResponse (compacto, UTF-8 sin escapar, fechas ISO 8601).
+
+orjson se usa si está instalado; si no, json de la biblioteca estándar con los
+mismos separadores.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import get_args
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: solo acelera la codificación
+    orjson = None
+
+
+def _contiene(anotacion, condicion) -> bool:
+    """Busca recursivamente en Optional/Annotated/constr una parte que cumpla `condicion`."""
+    if condicion(anotacion):
+        return True
+    partes = list(get_args(anotacion)) + list(getattr(anotacion, "__metadata__", ()))
+    return any(_contiene(p, condicion) for p in partes if p is not anotacion)
+
+
+def _es_decimal(anotacion) -> bool:
+    return _contiene(anotacion, lambda t: t is Decimal)
+
+
+def _recorta(anotacion, metadatos) -> bool:
+    recorta = lambda t: getattr(t, "strip_whitespace", None) is True
+    return any(recorta(m) for m in metadatos) or _contiene(anotacion, recorta)
+
+
+def _iso(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"{type(valor).__name__} no es serializable a JSON")
+
+
+def codificar(contenido) -> bytes:
+    """Mismo resultado que JSONResponse.render, más rápido con orjson."""
+    if orjson is not None:
+        return orjson.dumps(contenido)
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_iso).encode("utf-8")
+
+
+class Serializador:
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.campos = tuple(modelo.model_fields)
+
+        expresiones = []
+        for i, (nombre, campo) in enumerate(modelo.model_fields.items()):
+            valor = f"f[{i}]"
+            if _es_decimal(campo.annotation):
+                valor = f"(None if f[{i}] is None else str(f[{i}]))"
+            elif _recorta(campo.annotation, campo.metadata):
+                valor = f"(None if f[{i}] is None else f[{i}].strip())"
+            expresiones.append(f"{nombre!r}: {valor}")
+
+        # Una función generada por modelo: sin bucles ni búsquedas por campo en cada fila
+        codigo = f"def fila_a_dict(f):\n    return {{{', '.join(expresiones)}}}\n"
+        espacio = {}
+        exec(compile(codigo, f"<serializador {modelo.__name__}>", "exec"), espacio)
+        self.fila_a_dict = espacio["fila_a_dict"]
+
+    def columnas(self, tabla):
+        """Columnas del modelo ORM `tabla` en el orden de los campos de respuesta."""
+        return [getattr(tabla, campo) for campo in self.campos]
+
+    def dicts(self, filas) -> list:
+        fila_a_dict = self.fila_a_dict
+        return [fila_a_dict(f) for f in filas]
+
+    def json(self, filas) -> bytes:
+        return codificar(self.dicts(filas))
@@ -0,0 +1,209 @@
+"""
+Sugerencia de categoría a partir de la descripción de una transacción.
+
+Por usuario se guarda en memoria un índice palabra -> {categoria_id: veces}
+armado con una consulta agregada sobre sus transacciones. Sugerir cuesta
+O(palabras de la descripción) y no toca la base si el usuario ya está cargado.
+
+Los usuarios se guardan en un LRU (SUGERENCIAS_MAXIMO_USUARIOS) y su índice
+se rearma al vencer SUGERENCIAS_TTL. Las escrituras del ledger de este proceso
+(servicios/movimientos) lo actualizan en caliente al confirmar su transacción;
+las de otros workers se ven al vencer el TTL. Cambiar o borrar una
+categoría propia descarta el índice de su dueño; una escritura que marca TODOS
+(categorías de sistema, jobs masivos) descarta todos.
+"""
+import itertools
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session as _SesionORM
+
+from DB.conexion import TODOS, al_confirmar_escrituras
+from models.modelsDB import Categoria, Transaccion
+from servicios.cache_usuario import aciertos, desalojos, fallos
+
+TTL = float(os.getenv("SUGERENCIAS_TTL", "600"))
+MAXIMO_USUARIOS = int(os.getenv("SUGERENCIAS_MAXIMO_USUARIOS", "10000"))
+ESPACIO = "sugerencias"
+
+_aciertos = aciertos.con(ESPACIO, "local")
+_fallos = fallos.con(ESPACIO)
+
+
+def palabras(texto) -> set:
+    """Palabras sin acentos ni mayúsculas; se ignoran las de una letra y los números."""
+    if not texto:
+        return set()
+    plano = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower()
+    return {p for p in re.findall(r"[a-z0-9]+", plano) if len(p) > 1 and not p.isdigit()}
+
+
+class Indice:
+    __slots__ = ("por_palabra", "totales", "tipos", "expira")
+
+    def __init__(self):
+        self.por_palabra = defaultdict(Counter)
+        self.totales = Counter()
+        self.tipos = {}
+        self.expira = time.monotonic() + TTL
+
+    def sumar(self, descripcion, categoria_id, tipo, veces: int):
+        self.tipos[categoria_id] = tipo
+        self.totales[categoria_id] += veces
+        if self.totales[categoria_id] <= 0:
+            del self.totales[categoria_id]
+        for palabra in palabras(descripcion):
+            conteo = self.por_palabra[palabra]
+            conteo[categoria_id] += veces
+            if conteo[categoria_id] <= 0:
+                del conteo[categoria_id]
+                if not conteo:
+                    del self.por_palabra[palabra]
+
+    def sugerir(self, descripcion, tipo=None, limite: int = 5) -> list:
+        """
+        Cada palabra conocida reparte un voto entre las categorías en que aparece,
+        en proporción a sus veces; `confianza` es la fracción de votos. Si ninguna
+        palabra se conoce, las categorías más usadas con confianza 0.
+        """
+        conocidas = [self.por_palabra[p] for p in palabras(descripcion) if p in self.por_palabra]
+        if conocidas:
+            votos = Counter()
+            for conteo in conocidas:
+                total = sum(conteo.values())
+                for categoria_id, veces in conteo.items():
+                    votos[categoria_id] += veces / total
+            ranking = [(c, round(v / len(conocidas), 4))
+                       for c, v in sorted(votos.items(), key=lambda cv: (-cv[1], cv[0]))]
+        else:
+            ranking = [(c, 0.0) for c, _ in self.totales.most_common()]
+
+        sugerencias = []
+        for categoria_id, confianza in ranking:
+            if tipo is not None and self.tipos.get(categoria_id) != tipo:
+                continue
+            sugerencias.append({"categoria_id": categoria_id, "confianza": confianza})
+            if len(sugerencias) >= limite:
+                break
+        return sugerencias
+
+
+_indices = OrderedDict()
+# Se incrementan al aplicar una escritura: un índice armado antes no se guarda
+_generaciones = Counter()
+_generacion_global = 0
+_lock = threading.Lock()
+
+
+def consulta_historial(usuario_id):
+    return (
+        select(Transaccion.descripcion, Transaccion.categoria_id, Transaccion.tipo, func.count())
+        .where(Transaccion.usuario_id == usuario_id,
+               Transaccion.categoria_id.isnot(None),
+               Transaccion.descripcion.isnot(None))
+        .group_by(Transaccion.descripcion, Transaccion.categoria_id, Transaccion.tipo)
+    )
+
+
+async def indice(db, usuario_id: int) -> Indice:
+    """Índice del usuario desde memoria o, si no está o venció, desde sus transacciones (AsyncSession)."""
+    with _lock:
+        actual = _indices.get(usuario_id)
+        if actual is not None:
+            if actual.expira >= time.monotonic():
+                _indices.move_to_end(usuario_id)
+                _aciertos.incrementar()
+                return actual
+            del _indices[usuario_id]
+            desalojos.con(ESPACIO, "vencida").incrementar()
+        generacion = (_generacion_global, _generaciones[usuario_id])
+    _fallos.incrementar()
+
+    nuevo = Indice()
+    for descripcion, categoria_id, tipo, veces in (await db.execute(consulta_historial(usuario_id))).all():
+        nuevo.sumar(descripcion, categoria_id, tipo, veces)
+
+    with _lock:
+        if (_generacion_global, _generaciones[usuario_id]) == generacion:
+            _indices[usuario_id] = nuevo
+            while len(_indices) > MAXIMO_USUARIOS:
+                _indices.popitem(last=False)
+                desalojos.con(ESPACIO, "capacidad").incrementar()
+    return nuevo
+
+
+# ---------------- Escrituras (desde servicios/movimientos, antes del commit) ----------------
+
+def registrar_movimientos(db, movimientos):
+    """Guarda en la sesión lo que cambia en los índices; se aplica solo si la transacción confirma."""
+    pendientes = db.info.setdefault("sugerencias_pendientes", [])
+    pendientes.extend(
+        (m["usuario_id"], m.get("descripcion"), m["categoria_id"], m["tipo"], m["signo"])
+        for m in movimientos
+        if m["categoria_id"] is not None and m.get("descripcion")
+    )
+
+
+def _vaciar():
+    global _generacion_global
+    _indices.clear()
+    _generaciones.clear()
+    _generacion_global += 1
+
+
+def _anotar_categorias(sesion, contexto):
+    # Dueños (el actual y, si cambió, el anterior) de categorías cambiadas o borradas
+    duenos = set()
+    for objeto in itertools.chain(sesion.dirty, sesion.deleted):
+        if isinstance(objeto, Categoria):
+            historial = inspect(objeto).attrs.usuario_id.history
+            duenos.update(historial.added or historial.unchanged or ())
+            duenos.update(historial.deleted or ())
+    duenos.discard(None)
+    if duenos:
+        sesion.info.setdefault("sugerencias_categorias", set()).update(duenos)
+
+
+def _aplicar(sesion):
+    pendientes = sesion.info.pop("sugerencias_pendientes", None)
+    duenos = sesion.info.pop("sugerencias_categorias", None)
+    if not pendientes and not duenos:
+        return
+    with _lock:
+        for usuario_id in duenos or ():
+            # Una categoría propia borrada o cambiada de tipo: su índice se rearma al pedirlo
+            _generaciones[usuario_id] += 1
+            _indices.pop(usuario_id, None)
+        for usuario_id, descripcion, categoria_id, tipo, signo in pendientes or ():
+            _generaciones[usuario_id] += 1
+            actual = _indices.get(usuario_id)
+            if actual is not None:
+                actual.sumar(descripcion, categoria_id, tipo, signo)
+        if len(_generaciones) > MAXIMO_USUARIOS * 10:
+            # Vaciar también acota la memoria de generaciones
+            _vaciar()
+
+
+def _descartar(sesion, anterior):
+    # Revertir un SAVEPOINT no deshace lo registrado fuera de él
+    if not anterior.nested:
+        sesion.info.pop("sugerencias_pendientes", None)
+        sesion.info.pop("sugerencias_categorias", None)
+
+
+event.listen(_SesionORM, "after_flush", _anotar_categorias)
+event.listen(_SesionORM, "after_commit", _aplicar)
+event.listen(_SesionORM, "after_soft_rollback", _descartar)
+
+
+@al_confirmar_escrituras
+def _descartar_por_categorias(usuarios):
+    # Categorías de sistema o escrituras masivas: se rearma todo al pedirlo
+    if TODOS in usuarios:
+        with _lock:
+            _vaciar()
@@ -0,0 +1,49 @@
+"""
+Las pruebas corren contra una base SQLite temporal (el sustituto local de MySQL)
+llenada con benchmarks.datos. La configuración va en el entorno antes de importar
+la app, porque DB.conexion la lee al importarse.
+"""
+import asyncio
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+
+_CARPETA = Path(tempfile.mkdtemp(prefix="lana_pruebas_"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_CARPETA / 'lana.db'}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("DATABASE_LECTURA_URLS", None)
+os.environ.pop("CACHE_COMPARTIDO_URL", None)
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest  # noqa: E402
+
+# Fija los datos generados: las pruebas no dependen del mes en curso
+REFERENCIA = date(2025, 1, 1)
+
+
+@pytest.fixture(scope="session")
+def base():
+    """Esquema creado con los modelos y datos de benchmarks.datos (5 usuarios)."""
+    from benchmarks.datos import generar
+    from DB.conexion import Session, cerrar, engine
+    from models.modelsDB import Base
+
+    Base.metadata.create_all(engine)
+    db = Session()
+    try:
+        conteos = generar(db, usuarios=5, transacciones=200, referencia=REFERENCIA)
+        db.commit()
+    finally:
+        db.close()
+    yield conteos
+    asyncio.run(cerrar())
+
+
+@pytest.fixture(scope="session")
+def cliente(base):
+    # Sin `with`: el lifespan levantaría el pool de hashing y calentaría conexiones
+    from fastapi.testclient import TestClient
+    import main
+
+    return TestClient(main.crear_app())
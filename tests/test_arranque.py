@@ -0,0 +1,11 @@
+from benchmarks import arranque
+
+
+def test_arranque_en_frio_dentro_del_presupuesto():
+    # Cada medición es un proceso nuevo: import main + crear_app() sin conexiones.
+    # Se compara la más rápida: en una máquina compartida el ruido solo suma tiempo
+    resultado = arranque.medir(5)
+
+    assert resultado["minimo_ms"] <= arranque.PRESUPUESTO_MS, resultado
+    assert not resultado["engines_creados"], "el arranque creó un engine"
+    assert resultado["cargados"] == [], f"módulos que deberían cargarse al usarse: {resultado['cargados']}"
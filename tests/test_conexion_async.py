@@ -0,0 +1,64 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from DB import conexion
+from models.modelsDB import Base, Cuenta
+
+
+@pytest.fixture
+def replica(base, monkeypatch):
+    """Una réplica SQLite vacía: lo que se lea de ella no trae filas."""
+    url = f"sqlite:///{Path(conexion.DATABASE_URL.split(':///', 1)[1]).with_name('replica.db')}"
+    motor = create_engine(url)
+    Base.metadata.create_all(motor)
+    motor.dispose()
+
+    monkeypatch.setattr(conexion, "URLS_LECTURA", [url])
+    monkeypatch.setattr(conexion, "_lectura", None)
+    monkeypatch.setattr(conexion, "_lectura_async", None)
+    monkeypatch.setattr(conexion, "_escrituras_recientes", {})
+    # Sin réplicas al importar, el registro de lecturas pegajosas no se suscribió
+    monkeypatch.setattr(conexion, "_suscriptores", [*conexion._suscriptores, conexion._marcar_pegajosos])
+    yield url
+    for motor in conexion._lectura or ():
+        motor.dispose()
+    for motor in conexion._lectura_async or ():
+        asyncio.run(motor.dispose())
+
+
+def _ids(respuesta):
+    assert respuesta.status_code == 200, respuesta.text
+    return [t["id"] for t in respuesta.json()]
+
+
+def test_engine_async_usa_aiosqlite(cliente):
+    assert conexion.ASYNC_DATABASE_URL.startswith("sqlite+aiosqlite://")
+    # Endpoint async: la sesión sale de obtener_async_engine()
+    assert _ids(cliente.get("/transacciones", params={"usuario_id": 1, "limite": 5}))
+    assert conexion._async_engine.dialect.driver == "aiosqlite"
+
+
+def test_lecturas_van_al_primario_tras_escribir(cliente, replica):
+    with conexion.Session() as db:
+        cuenta = db.execute(select(Cuenta.id).where(Cuenta.usuario_id == 3)).scalars().first()
+
+    # Sin escrituras recientes la lectura va a la réplica (vacía)
+    assert _ids(cliente.get("/transacciones", params={"usuario_id": 3, "limite": 5})) == []
+    # El cliente puede forzar el primario
+    fuerte = cliente.get("/transacciones", params={"usuario_id": 3, "limite": 5},
+                         headers={"X-Consistencia": "fuerte"})
+    assert _ids(fuerte)
+
+    creada = cliente.post("/transacciones", json={
+        "usuario_id": 3, "cuenta_id": cuenta, "categoria_id": 1, "monto": "12.00",
+        "tipo": "egreso", "descripcion": "lee lo que escribiste", "fecha": "2030-01-01",
+    })
+    assert creada.status_code == 200, creada.text
+
+    # Tras su commit, el usuario 3 lee del primario y ve su transacción; el 4 sigue en la réplica
+    assert _ids(cliente.get("/transacciones", params={"usuario_id": 3, "limite": 5}))[0] == creada.json()["id"]
+    assert _ids(cliente.get("/transacciones", params={"usuario_id": 4, "limite": 5})) == []
+    assert [m.url.drivername for m in conexion._async_engines_lectura()] == ["sqlite+aiosqlite"]
@@ -0,0 +1,53 @@
+import csv
+
+from sqlalchemy import func, select
+
+from DB.conexion import Session
+from models.modelsDB import Cuenta, Transaccion
+
+
+def _cuenta(usuario_id):
+    with Session() as db:
+        return db.execute(select(Cuenta.id).where(Cuenta.usuario_id == usuario_id)).scalars().first()
+
+
+def _contar(descripcion):
+    with Session() as db:
+        return db.execute(
+            select(func.count()).select_from(Transaccion).where(Transaccion.descripcion == descripcion)
+        ).scalar()
+
+
+def test_ndjson_con_linea_invalida_importa_las_siguientes(cliente):
+    cuenta = _cuenta(1)
+    fila = '{"usuario_id": 1, "cuenta_id": %d, "categoria_id": 1, "monto": "10.50", "tipo": "egreso", "descripcion": "import ndjson"}' % cuenta
+    cuerpo = "\n".join([fila, '{"usuario_id": 1, "monto": ', fila, fila]) + "\n"
+
+    r = cliente.post("/transacciones/bulk", content=cuerpo, headers={"content-type": "application/x-ndjson"})
+
+    assert r.status_code == 200
+    resultado = r.json()
+    assert resultado["insertadas"] == 3
+    assert [e["fila"] for e in resultado["errores"]] == [2]
+    assert _contar("import ndjson") == 3
+
+
+def test_csv_con_linea_invalida_importa_las_siguientes(cliente):
+    cuenta = _cuenta(2)
+    fila = f"2,{cuenta},1,25.00,ingreso,import csv"
+    cuerpo = "\n".join([
+        "usuario_id,cuenta_id,categoria_id,monto,tipo,descripcion",
+        fila,
+        # Campo mayor que csv.field_size_limit(): csv.Error, no ValueError
+        f"2,{cuenta},1,10,egreso,{'x' * (csv.field_size_limit() + 1)}",
+        "2,,1,no-es-monto,egreso,import csv",
+        fila,
+    ]) + "\n"
+
+    r = cliente.post("/transacciones/bulk", content=cuerpo, headers={"content-type": "text/csv"})
+
+    assert r.status_code == 200
+    resultado = r.json()
+    assert resultado["insertadas"] == 2
+    assert [e["fila"] for e in resultado["errores"]] == [2, 3]
+    assert _contar("import csv") == 2
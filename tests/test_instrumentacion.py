@@ -0,0 +1,24 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from servicios import instrumentacion
+
+
+def test_sentencias_fallidas_se_cuentan_y_no_quedan_en_la_conexion():
+    motor = create_engine("sqlite://")
+    instrumentacion.instrumentar(motor)
+    medicion = instrumentacion.Medicion()
+    token = instrumentacion._actual.set(medicion)
+    try:
+        with motor.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM no_existe"))
+            assert conn.info["_inicios_sql"] == []
+    finally:
+        instrumentacion._actual.reset(token)
+        motor.dispose()
+
+    assert medicion.sentencias == 4
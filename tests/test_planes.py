@@ -0,0 +1,6 @@
+from DB import planes
+
+
+def test_consultas_calientes_usan_indices(base, capsys):
+    fallidas = planes.revisar()
+    assert fallidas == 0, capsys.readouterr().out